@@ -0,0 +1,405 @@
+"""
+asyncio执行引擎
+在一个事件循环中同时运行多个宏，每个宏是一个协程任务，复用执行器的事件流（MacroStream等），
+不再为每个宏创建调度线程。等待时先用事件循环的定时器粗粒度睡眠，最后一个定时器周期在计时线程中
+分段高精度睡眠，只有最后 spin_threshold 秒以 sleep(0) 协作式自旋命中截止时间，期间其它宏仍可运行。
+出队、落后跳过、计时统计与发送和执行器共用 StreamQueue；会阻塞的后端（如win32）在单独的发送线程中调用。
+每个宏可单独启动、暂停、继续、停止、热替换，并各自记录计时统计
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from input_backend import InputBackend, create_backend
+from module.Humanize import DelaySampler, UniformDelay
+from module.Program import MacroProgram
+from module.Timeline import MacroTimeline
+from scheduler import FINE_SLICE, TIMER_RESOLUTION, TimingStats, LATE_CATCHUP, LATE_SKIP
+from streams import (MacroStream, SourceStream, ProgramStream, HoldStream, StreamQueue,
+                     check_supported, reload_latency)
+
+# 宏的状态
+STATE_READY = 'ready'        # 已添加，尚未启动
+STATE_RUNNING = 'running'
+STATE_PAUSED = 'paused'
+STATE_STOPPED = 'stopped'    # 被手动停止
+STATE_FINISHED = 'finished'  # 按循环次数或时长正常结束
+
+
+class AsyncMacro:
+    """引擎中的一个宏，控制方法均可在任意线程调用"""
+
+    def __init__(self, engine, name, streams, backend, metrics=None):
+        self.engine = engine
+        self.name = name
+        self.streams = streams
+        self.backend = backend
+        self.metrics = metrics  # 计时指标（TimingMetrics），为None时不记录
+        self.state = STATE_READY
+        self.started = False     # 是否已请求启动
+        self.stream_stats = {stream.name: stream.stats for stream in streams}
+        self.events = 0          # 已发送的事件数
+        self.wakeups = 0         # 唤醒次数
+        self.reloads = 0         # 运行中替换宏的次数
+        self.last_reload = None  # 最近一次替换的耗时：解析、等待循环边界与总计（秒）
+        self.start_time = None
+        self.end_time = None
+        self.done = threading.Event()  # 宏结束时置位，便于其它线程等待
+        self._wake = None        # 当前等待中的 Future，控制操作通过它提前唤醒
+        self._task = None
+        if streams and isinstance(streams[0], (MacroStream, SourceStream, ProgramStream)):
+            streams[0].on_swap = self._on_swap
+
+    @property
+    def timing_stats(self):
+        """按键宏事件流的计时统计"""
+        return self.streams[0].stats if self.streams else TimingStats()
+
+    def start(self):
+        self.started = True
+        self.engine.call(self.engine._start_macro, self)
+
+    def pause(self):
+        self.engine.call(self._set_state, STATE_PAUSED)
+
+    def resume(self):
+        self.engine.call(self._set_state, STATE_RUNNING)
+
+    def stop(self):
+        self.engine.call(self._set_state, STATE_STOPPED)
+
+    def reload(self, macro, detected=None, compiled=None):
+        """替换宏内容，可在任意线程调用，在下一个循环边界生效，循环计数、时长与计时不会重置
+        新宏的类型（时间轴、控制流宏或流式来源）必须与原来相同，循环参数保持不变。
+        detected/compiled 为检测到修改与编译完成的时间，用于统计替换延迟
+        """
+        if isinstance(macro, MacroProgram):
+            stream_type = ProgramStream
+            timeline = macro.timeline
+        elif isinstance(macro, MacroTimeline):
+            stream_type = MacroStream
+            timeline = macro
+        else:
+            stream_type = SourceStream
+            timeline = None
+        if not self.streams or not isinstance(self.streams[0], stream_type):
+            raise ValueError("不能在时间轴、控制流宏与流式宏之间切换")
+        if timeline is not None:
+            if len(timeline) == 0:
+                raise ValueError("新的宏没有步骤")
+            check_supported(self.backend, timeline)
+        self.streams[0].swap(macro, detected, compiled)
+
+    def _on_swap(self, stream, detected, compiled, now):
+        """在循环边界替换宏后记录延迟"""
+        self.reloads += 1
+        self.last_reload = latency = reload_latency(detected, compiled, now)
+        print(f"[{self.name}] 第{stream.loops}轮开始时替换宏, 解析{latency['parse'] * 1000:.1f}ms, "
+              f"等待循环边界{latency['wait'] * 1000:.1f}ms")
+
+    def _set_state(self, state):
+        """在事件循环线程中修改状态并唤醒等待"""
+        if self.state not in (STATE_RUNNING, STATE_PAUSED):
+            if state == STATE_STOPPED and self.state == STATE_READY:
+                self.state = STATE_STOPPED
+                self.done.set()
+            return
+        self.state = state
+        if self._wake is not None and not self._wake.done():
+            self._wake.set_result(None)
+
+    def elapsed(self):
+        """运行时长（秒）"""
+        if self.start_time is None:
+            return 0.0
+        end = self.end_time if self.end_time is not None else self.engine.clock()
+        return end - self.start_time
+
+    def summary(self):
+        """返回本宏的统计结果字典"""
+        elapsed = self.elapsed()
+        return {
+            'state': self.state,
+            'elapsed': elapsed,
+            'events': self.events,
+            'wakeups': self.wakeups,
+            'reloads': self.reloads,
+            'events_per_second': self.events / elapsed if elapsed > 0 else 0.0,
+            'streams': {name: stats.summary() for name, stats in self.stream_stats.items()},
+        }
+
+
+class AsyncMacroEngine:
+    """在一个asyncio事件循环中运行多个宏
+
+    可以在后台线程中运行（start/shutdown），也可以在当前线程中运行到所有宏结束（run）。
+    spin_threshold 为截止时间前改为协作式自旋的时间（秒），为0时只依赖事件循环的定时器；
+    事件循环的定时器可能晚醒一个系统定时器周期，因此再提前 timer_resolution 秒唤醒，
+    这段时间与 DeadlineScheduler 一样以 FINE_SLICE 分段高精度睡眠（在计时线程中调用 time.sleep），不占用事件循环。
+    late_policy/max_lag 与执行器相同，为 LATE_SKIP 时落后超过 max_lag 的事件被跳过
+    """
+
+    def __init__(self, backend=None, clock=time.perf_counter, spin_threshold=0.002,
+                 precise=True, timer_resolution=TIMER_RESOLUTION, late_policy=LATE_CATCHUP,
+                 max_lag=0.05):
+        self.backend = backend  # 默认输入后端（名称或实例），各宏可单独指定
+        self.clock = clock
+        self.spin_threshold = spin_threshold
+        self.timer_resolution = timer_resolution  # 事件循环定时器的粒度，定时器提前这么多唤醒
+        self.precise = precise  # 是否按绝对截止时间推进，与执行器的精确定时一致
+        self.late_policy = late_policy  # 落后时的处理策略
+        self.max_lag = max_lag  # skip策略下允许的最大落后时间（秒）
+        self.macros = []
+        self.loop = None
+        self.thread = None
+        self._backends = {}
+        self._ready = threading.Event()
+        self._loop_thread_id = None  # 运行事件循环的线程
+        self._send_pool = None  # 会阻塞的后端的发送线程，按需创建，所有宏的阻塞调用按顺序执行
+        self._timer_pool = None  # 分段高精度睡眠的计时线程，按需创建
+
+    def add_macro(self, macro, name=None, loop_count=None, loop_time=None, backend=None,
+                  distribution=None, seed=None, autostart=True, metrics=None):
+        """添加一个宏，macro 为 MacroTimeline、MacroProgram 或流式来源（如 JsonlSource），返回 AsyncMacro
+        循环参数为None时使用宏中记录的值；autostart 为真且引擎已在运行时立即启动；
+        metrics 为本宏的计时指标（TimingMetrics）。后端不支持宏中的按键时抛出ValueError
+        """
+        if loop_count is None:
+            loop_count = macro.loop_count
+        if loop_time is None:
+            loop_time = macro.loop_time
+        backend = self._resolve_backend(backend)
+        sampler = DelaySampler(distribution or UniformDelay(), seed)
+        if isinstance(macro, (MacroProgram, MacroTimeline)):
+            check_supported(backend, macro.timeline if isinstance(macro, MacroProgram) else macro)
+        if isinstance(macro, MacroProgram):
+            streams = [ProgramStream(macro, sampler, absolute=self.precise,
+                                     loop_count=loop_count, loop_time=loop_time)]
+        elif isinstance(macro, MacroTimeline):
+            streams = [MacroStream(macro, sampler, absolute=self.precise,
+                                   loop_count=loop_count, loop_time=loop_time)] if len(macro) else []
+        else:
+            streams = [SourceStream(macro, sampler, absolute=self.precise,
+                                    loop_count=loop_count, loop_time=loop_time,
+                                    supports=backend.supports)]
+        if streams:
+            # 组合键与按住的步骤由释放事件流按时释放
+            streams[0].holds = HoldStream()
+            streams.append(streams[0].holds)
+        handle = AsyncMacro(self, name or f'macro{len(self.macros) + 1}', streams, backend, metrics)
+        self.macros.append(handle)
+        if autostart and self.loop is not None:
+            handle.start()
+        return handle
+
+    def _resolve_backend(self, backend):
+        if backend is None:
+            backend = self.backend
+        if backend is None:
+            raise ValueError("未指定输入后端")
+        if isinstance(backend, InputBackend):
+            return backend
+        if backend not in self._backends:
+            self._backends[backend] = create_backend(backend)
+        return self._backends[backend]
+
+    def call(self, func, *args):
+        """在事件循环线程中调用 func，引擎未运行时直接调用"""
+        loop = self.loop
+        if loop is not None and threading.get_ident() != self._loop_thread_id:
+            loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def _start_macro(self, macro):
+        if macro.state != STATE_READY or self.loop is None:
+            return
+        macro.started = True
+        macro.state = STATE_RUNNING
+        macro._task = self.loop.create_task(self._run_macro(macro))
+
+    # 在当前线程运行
+
+    def run(self):
+        """在当前线程中运行全部宏，直到它们都结束"""
+        asyncio.run(self._run_all())
+
+    async def _run_all(self):
+        self._loop_thread_id = threading.get_ident()
+        self.loop = asyncio.get_running_loop()
+        try:
+            for macro in self.macros:
+                self._start_macro(macro)
+            tasks = [macro._task for macro in self.macros if macro._task is not None]
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            self._close_pools()
+            self.loop = None
+
+    # 在后台线程运行
+
+    def start(self):
+        """在后台线程中启动事件循环，并启动已添加的宏"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._thread_main, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        for macro in self.macros:
+            macro.start()
+
+    def _thread_main(self):
+        loop = asyncio.new_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            # 取消仍未结束的宏，使其正常收尾
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._close_pools()
+            self.loop = None
+
+    def _close_pools(self):
+        if self._send_pool is not None:
+            self._send_pool.shutdown()
+            self._send_pool = None
+        if self._timer_pool is not None:
+            self._timer_pool.shutdown()
+            self._timer_pool = None
+
+    def stop_all(self):
+        """停止所有宏"""
+        for macro in self.macros:
+            macro.stop()
+
+    def wait(self, timeout=None):
+        """等待所有已启动的宏结束，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for macro in self.macros:
+            if not macro.started:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not macro.done.wait(remaining):
+                return False
+        return True
+
+    def shutdown(self):
+        """停止所有宏并关闭后台事件循环"""
+        self.stop_all()
+        self.wait(timeout=1.0)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def summary(self):
+        """返回 {宏名: 统计结果}"""
+        return {macro.name: macro.summary() for macro in self.macros}
+
+    # 调度
+
+    async def _sleep(self, macro, delay):
+        """睡眠 delay 秒，可被控制操作提前唤醒"""
+        loop = self.loop
+        wake = loop.create_future()
+        handle = loop.call_later(delay, _set_done, wake) if delay is not None else None
+        macro._wake = wake
+        try:
+            await wake
+        finally:
+            macro._wake = None
+            if handle is not None:
+                handle.cancel()
+
+    async def _send(self, queue, events):
+        """发送一批事件，返回发送的事件数；会阻塞的后端在发送线程中调用，期间其它宏照常运行"""
+        if not events:
+            return 0
+        if not queue.backend.blocking:
+            return queue.send(events)
+        if self._send_pool is None:
+            self._send_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='macro-send')
+        return await self.loop.run_in_executor(self._send_pool, queue.send, events)
+
+    async def _fine_sleep(self, delay):
+        """在计时线程中用 time.sleep 睡眠一小段，Windows上不受事件循环定时器粒度的限制"""
+        if self._timer_pool is None:
+            self._timer_pool = ThreadPoolExecutor(thread_name_prefix='macro-timer')
+        await self.loop.run_in_executor(self._timer_pool, time.sleep, delay)
+
+    async def _wait_until(self, macro, queue, deadline):
+        """等待到截止时间，返回期间暂停的总时长；宏被停止时返回None"""
+        clock = self.clock
+        spin = self.spin_threshold
+        coarse = spin + self.timer_resolution
+        paused = 0.0
+        while True:
+            if macro.state == STATE_STOPPED:
+                return None
+            if macro.state == STATE_PAUSED:
+                # 暂停期间不保持按住，恢复后重新按下
+                ups, downs = queue.suspend()
+                macro.events += await self._send(queue, ups)
+                pause_start = clock()
+                while macro.state == STATE_PAUSED:
+                    await self._sleep(macro, None)
+                paused += clock() - pause_start
+                if downs:
+                    if macro.state == STATE_STOPPED:
+                        queue.release_all()
+                    else:
+                        macro.events += await self._send(queue, downs)
+                continue
+            remaining = deadline + paused - clock()
+            if remaining <= 0:
+                return paused
+            if remaining > coarse:
+                await self._sleep(macro, remaining - coarse)
+            elif remaining > spin:
+                # 最后一个定时器周期分段睡眠，每段之后检查暂停与停止
+                await self._fine_sleep(min(remaining - spin, FINE_SLICE))
+            else:
+                # 协作式自旋，让出事件循环给其它宏
+                await asyncio.sleep(0)
+
+    async def _run_macro(self, macro):
+        """一个宏的调度协程，出队与发送和执行器的调度线程共用 StreamQueue"""
+        clock = self.clock
+        queue = StreamQueue(macro.streams, macro.backend, clock=clock,
+                            skip_late=self.late_policy == LATE_SKIP, max_lag=self.max_lag,
+                            metrics=macro.metrics)
+        try:
+            now = clock()
+            macro.start_time = now
+            queue.start(now)
+            while queue.active:
+                paused = await self._wait_until(macro, queue, queue.next_due)
+                if paused is None:
+                    break
+                if paused:
+                    queue.shift(paused)
+                macro.wakeups += 1
+                macro.events += await self._send(queue, queue.collect(clock()))
+        except Exception as e:
+            print(f"[{macro.name}] 运行出错: {e}")
+        finally:
+            # 停止或出错时立即释放仍按住的按键
+            macro.events += await self._send(queue, queue.release_all())
+            macro.end_time = clock()
+            if macro.state != STATE_STOPPED:
+                macro.state = STATE_FINISHED
+            macro.done.set()
+
+def _set_done(future):
+    if not future.done():
+        future.set_result(None)
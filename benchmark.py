@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+"""
+性能基准测试脚本
+使用假的user32与假的依赖库代替真实的Windows API，可在任意平台上无界面运行，不会真正发送输入。
+结果可保存为JSON文件，并与之前保存的结果对比，便于发现版本之间的性能退化
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from async_engine import AsyncMacroEngine
+from executor import MacroExecutor
+from game_input_sendinput import GameSendInput
+from hot_reload import MacroFileWatcher
+from input_backend import (NullBackend, RecordingBackend, PyAutoGUIBackend, DirectInputBackend,
+                           Win32Backend, SendInputBackend, ScanCodeBackend)
+from metrics import TimingMetrics
+from module.Step import Step
+from module.MacroFile import (JsonlSource, load_binary, load_json, save_binary, save_json,
+                              save_jsonl)
+from module.Program import compile_program
+from module.Timeline import compile_steps
+from recorder import MacroRecorder
+
+
+class FakeUser32:
+    """模拟user32，SendInput只统计调用次数并记录调用时刻的内存占用"""
+    def __init__(self):
+        self.calls = 0
+        self.baseline = 0  # 每次按键开始前已分配的内存（字节）
+        self.max_inflight = 0  # 调用SendInput时按键路径上已分配的最大内存（字节）
+
+    def SendInput(self, n_inputs, input_arr, size):
+        self.calls += 1
+        inflight = tracemalloc.get_traced_memory()[0] - self.baseline
+        if inflight > self.max_inflight:
+            self.max_inflight = inflight
+        return n_inputs
+
+    def GetSystemMetrics(self, index):
+        return (1920, 1080)[index]
+
+
+def _fake_module(name, **attrs):
+    """创建只包含指定属性的假模块"""
+    module = types.ModuleType(name)
+    for attr, value in attrs.items():
+        setattr(module, attr, value)
+    return module
+
+
+@contextlib.contextmanager
+def fake_input_modules():
+    """临时用假模块替换pyautogui、pydirectinput与pywin32，结束后恢复"""
+    noop = lambda *args, **kwargs: None
+    fakes = {
+        'pyautogui': _fake_module('pyautogui', press=noop, keyDown=noop, keyUp=noop, click=noop,
+                                  KEYBOARD_KEYS=[]),
+        'pydirectinput': _fake_module('pydirectinput', press=noop, keyDown=noop, keyUp=noop,
+                                      click=noop, moveTo=noop, PAUSE=0, KEYBOARD_MAPPING={}),
+        'win32api': _fake_module('win32api', keybd_event=noop, mouse_event=noop,
+                                 SetCursorPos=noop, GetCursorPos=lambda: (0, 0)),
+        'win32con': _fake_module('win32con', KEYEVENTF_KEYUP=0x0002,
+                                 MOUSEEVENTF_LEFTDOWN=0x0002, MOUSEEVENTF_LEFTUP=0x0004,
+                                 MOUSEEVENTF_RIGHTDOWN=0x0008, MOUSEEVENTF_RIGHTUP=0x0010,
+                                 MOUSEEVENTF_MIDDLEDOWN=0x0020, MOUSEEVENTF_MIDDLEUP=0x0040),
+    }
+    # 依赖这些库的模块也需要重新导入
+    names = list(fakes) + ['game_input_pydirectinput', 'game_input_win32']
+    saved = {name: sys.modules.get(name) for name in names}
+    for name in names:
+        sys.modules.pop(name, None)
+    sys.modules.update(fakes)
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """计算百分位数（最近秩法）"""
+    if not values:
+        return {f'p{p}': 0.0 for p in points}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        result[f'p{p}'] = ordered[index]
+    return result
+
+
+def _run_executor(executor):
+    """同步运行执行器直到结束，返回 (墙钟耗时, CPU耗时)"""
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    executor.start()
+    executor.thread.join()
+    executor.stop()
+    return time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+
+def bench_executor_overhead(events=100_000, metrics=False):
+    """零延迟运行执行器，测量每步的调度开销；metrics 为真时同时记录计时指标"""
+    backend = NullBackend()
+    executor = MacroExecutor()
+    executor.set_backend(backend)
+    executor.set_metrics(TimingMetrics() if metrics else None)
+    steps = [Step(key, 0, 0) for key in 'abcdefghij']
+    executor.load_steps(steps, loop_count=max(1, events // len(steps)))
+    wall, cpu = _run_executor(executor)
+    return {
+        'events': backend.count,
+        'events_per_second': backend.count / wall,
+        'step_overhead_us': wall / backend.count * 1e6,
+        'cpu_us_per_event': cpu / backend.count * 1e6,
+    }
+
+
+def bench_live_stats(events=100_000, interval=0.001):
+    """在另一线程每 interval 秒读取一次 live_stats（远快于界面刷新），
+    测量单次读取耗时及其对执行器调度开销的影响"""
+    backend = NullBackend()
+    executor = MacroExecutor()
+    executor.set_backend(backend)
+    steps = [Step(key, 0, 0) for key in 'abcdefghij']
+    executor.load_steps(steps, loop_count=max(1, events // len(steps)))
+    reads = []
+    done = threading.Event()
+
+    def poll():
+        while not done.wait(interval):
+            start = time.perf_counter()
+            executor.live_stats()
+            reads.append(time.perf_counter() - start)
+
+    poller = threading.Thread(target=poll, daemon=True)
+    poller.start()
+    wall, cpu = _run_executor(executor)
+    done.set()
+    poller.join()
+    result = {
+        'events_per_second': backend.count / wall,
+        'step_overhead_us': wall / backend.count * 1e6,
+        'reads': len(reads),
+    }
+    if reads:
+        result.update({f'read_{name}_us': value * 1e6 for name, value in percentiles(reads).items()})
+    return result
+
+
+def bench_chords(events=100_000, stops=20):
+    """零延迟运行组合键与按住的步骤，测量每步开销；再反复在按住时停止，
+    测量从调用 stop 到释放事件发出的延迟"""
+    backend = NullBackend()
+    executor = MacroExecutor()
+    executor.set_backend(backend)
+    steps = [Step('ctrl+shift+e', 0, 0), Step('w', 0, 0, 0.001), Step('a', 0, 0)]
+    executor.load_steps(steps, loop_count=max(1, events // len(steps)))
+    wall, cpu = _run_executor(executor)
+    result = {
+        'chord_step_overhead_us': wall / (executor.timing_stats.count or 1) * 1e6,
+        'events': backend.count,
+    }
+
+    latencies = []
+    for _ in range(stops):
+        backend = RecordingBackend()
+        executor = MacroExecutor()
+        executor.set_backend(backend)
+        executor.load_steps([Step('w', 0.001, 0, 60), Step('ctrl+a', 60, 0, 60)], loop_count=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            executor.start()
+            while executor.live_stats() is None or executor.live_stats()['held'] < 3:
+                time.sleep(0.001)
+            stopped = time.perf_counter()
+            executor.stop()
+            executor.thread.join()
+        latencies.append(backend.events[-1][0] - stopped)
+    result.update({f'stop_release_{name}_ms': value * 1000
+                   for name, value in percentiles(latencies).items()})
+    return result
+
+
+def bench_executor_timing(interval=0.01, duration=2.0, precise=True):
+    """以固定间隔运行执行器，根据记录的事件时间计算定时误差"""
+    backend = RecordingBackend()
+    executor = MacroExecutor()
+    executor.set_backend(backend)
+    executor.set_precise_timing(precise)
+    executor.load_steps([Step('a', interval, 0)], loop_count=max(1, int(duration / interval)))
+    wall, cpu = _run_executor(executor)
+
+    times = [event[0] for event in backend.events]
+    start = times[0]
+    errors = [(t - (start + i * interval)) * 1000 for i, t in enumerate(times)]
+    result = {
+        'events': len(times),
+        'interval_ms': interval * 1000,
+        'cpu_us_per_event': cpu / len(times) * 1e6,
+        'final_drift_ms': errors[-1],
+        'max_error_ms': max(abs(e) for e in errors),
+    }
+    result.update({f'error_{k}_ms': v for k, v in percentiles([abs(e) for e in errors]).items()})
+    return result
+
+
+def bench_program(repeats=(10, 20, 50)):
+    """对比嵌套重复块的控制流宏与展开后的平铺时间轴：编译后的内存占用与零延迟执行的每步开销"""
+    entries = [{'key': key, 'delay': 0, 'random_offset': 0} for key in 'abcdefghij']
+    for count in reversed(repeats):
+        entries = [{'repeat': count, 'steps': entries}]
+    events = 10
+    for count in repeats:
+        events *= count
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        program = compile_program(entries, loop_count=1)
+        program_bytes = tracemalloc.get_traced_memory()[0] - start
+        start = tracemalloc.get_traced_memory()[0]
+        timeline = compile_steps([Step('abcdefghij'[i % 10], 0, 0) for i in range(events)], 1)
+        timeline_bytes = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'events': events,
+        'instructions': len(program),
+        'program_bytes': program_bytes,
+        'flat_bytes': timeline_bytes,
+    }
+    for name, load in (('program', lambda executor: executor.load_program(program)),
+                       ('flat', lambda executor: executor.load_timeline(timeline))):
+        backend = NullBackend()
+        executor = MacroExecutor()
+        executor.set_backend(backend)
+        load(executor)
+        wall, cpu = _run_executor(executor)
+        result[f'{name}_step_overhead_us'] = wall / backend.count * 1e6
+    return result
+
+
+def _concurrent_result(events, wall, cpu, errors):
+    """汇总并发测试的结果，errors 为各事件的定时误差（毫秒）"""
+    result = {
+        'events': events,
+        'cpu_percent': cpu / wall * 100,
+        'cpu_us_per_event': cpu / events * 1e6 if events else 0.0,
+    }
+    result.update({f'error_{k}_ms': v for k, v in percentiles(errors).items()})
+    return result
+
+
+def bench_concurrent_macros(counts=(1, 10, 50), interval=0.01, duration=1.0):
+    """同时运行多个宏，对比asyncio引擎与每个宏一个执行器线程的开销与定时误差"""
+    timeline = compile_steps([Step('a', interval, 0)], loop_count=max(1, int(duration / interval)))
+    results = {}
+    for count in counts:
+        # asyncio引擎：所有宏共用一个事件循环
+        backends = [RecordingBackend() for _ in range(count)]
+        engine = AsyncMacroEngine()
+        for backend in backends:
+            engine.add_macro(timeline, backend=backend)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        engine.run()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        errors = []
+        for backend in backends:
+            times = [event[0] for event in backend.events]
+            errors.extend(abs(t - (times[0] + i * interval)) * 1000 for i, t in enumerate(times))
+        results[f'async_{count}'] = _concurrent_result(len(errors), wall, cpu, errors)
+
+        # 对照：每个宏一个执行器及其调度线程
+        executors = []
+        for backend in backends:
+            backend.clear()
+            executor = MacroExecutor()
+            executor.set_backend(backend)
+            executor.set_precise_timing(True)
+            executor.load_timeline(timeline)
+            executors.append(executor)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        for executor in executors:
+            executor.start()
+        for executor in executors:
+            executor.thread.join()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        errors = []
+        for backend in backends:
+            times = [event[0] for event in backend.events]
+            errors.extend(abs(t - (times[0] + i * interval)) * 1000 for i, t in enumerate(times))
+        results[f'threads_{count}'] = _concurrent_result(len(errors), wall, cpu, errors)
+    return results
+
+
+def bench_backends(events=200):
+    """通过假的底层库测量各输入后端的单次按键耗时"""
+    results = {}
+    with fake_input_modules():
+        backends = {
+            'pyautogui': PyAutoGUIBackend(),
+            'directinput': DirectInputBackend(),
+            'win32': Win32Backend(),
+            'sendinput': SendInputBackend(user32=FakeUser32()),
+            'scancode': ScanCodeBackend(user32=FakeUser32()),
+        }
+        for name, backend in backends.items():
+            durations = []
+            start_cpu = time.process_time()
+            start = time.perf_counter()
+            for _ in range(events):
+                t0 = time.perf_counter()
+                backend.press(0x41)
+                durations.append((time.perf_counter() - t0) * 1e6)
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - start_cpu
+            result = {
+                'events': events,
+                'events_per_second': events / wall,
+                'cpu_us_per_event': cpu / events * 1e6,
+            }
+            result.update({f'call_{k}_us': v for k, v in percentiles(durations).items()})
+            results[name] = result
+
+            # 批量接口：一次注入全部事件
+            start = time.perf_counter()
+            backend.batch([(0, 0x41)] * events)
+            results[name]['batch_events_per_second'] = events / (time.perf_counter() - start)
+    return results
+
+
+def bench_timeline_memory(steps=100_000):
+    """对比 Step 列表与编译后时间轴的内存占用"""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        step_list = [Step('abcdefghij'[i % 10], 0.1, 0.05) for i in range(steps)]
+        list_bytes = tracemalloc.get_traced_memory()[0] - start
+        start = tracemalloc.get_traced_memory()[0]
+        timeline = compile_steps(step_list)
+        timeline_bytes = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return {
+        'steps': len(timeline),
+        'step_list_bytes_per_step': list_bytes / steps,
+        'timeline_bytes_per_step': timeline_bytes / steps,
+    }
+
+
+def _measure_presses(user32, press, presses):
+    """执行指定次数的按键并统计耗时与内存分配"""
+    press('a')  # 预热，构建缓存
+    tracemalloc.start()
+    try:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for _ in range(presses):
+            user32.baseline = tracemalloc.get_traced_memory()[0]
+            press('a')
+        elapsed = time.perf_counter() - start
+        leaked = tracemalloc.get_traced_memory()[0] - start_memory
+    finally:
+        tracemalloc.stop()
+    return {
+        'presses': presses,
+        'seconds': elapsed,
+        'inflight_bytes_per_press': user32.max_inflight,
+        'leaked_bytes': leaked,
+    }
+
+
+def bench_key_dispatch_alloc(presses=1_000_000):
+    """对比逐次构建INPUT结构与使用预构建INPUT数组时每次按键的内存分配"""
+    results = {}
+
+    user32 = FakeUser32()
+    game_input = GameSendInput(settle_delay=0, user32=user32)
+    results['rebuild'] = _measure_presses(
+        user32, lambda key: game_input.send_batch(
+            [game_input._create_keyboard_input(0x41, 0, 0),
+             game_input._create_keyboard_input(0x41, 0, 0x0002)]),
+        presses)
+
+    user32 = FakeUser32()
+    game_input = GameSendInput(settle_delay=0, user32=user32)
+    results['prebuilt'] = _measure_presses(user32, game_input.press_key, presses)
+    return results
+
+
+def bench_recorder(events=100_000):
+    """测量录制时钩子回调的耗时，以及后台线程写盘的吞吐"""
+    recorder = MacroRecorder(capacity=1 << 17)
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        recorder.start(path, hooks=False)
+        keys = 'abcdefghij'
+        t = recorder.clock()
+        start = time.perf_counter()
+        for i in range(events):
+            recorder.push(keys[i // 2 % 10], i % 2 == 0, t + i * 0.001)
+        push_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        steps = recorder.stop()
+        stop_seconds = time.perf_counter() - start
+    finally:
+        os.remove(path)
+    return {
+        'events': events,
+        'hook_ns_per_event': push_seconds / events * 1e9,
+        'steps': steps,
+        'dropped': recorder.dropped,
+        'stop_seconds': stop_seconds,
+    }
+
+
+def bench_macro_file(steps=100_000):
+    """对比JSON与二进制宏文件的大小和加载耗时"""
+    timeline = compile_steps([Step('abcdefghij'[i % 10], 0.1, 0.05) for i in range(steps)])
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        for name, save, load in (('json', save_json, load_json),
+                                 ('binary', save_binary, load_binary)):
+            path = os.path.join(directory, f'macro.{name}')
+            save(path, timeline)
+            start = time.perf_counter()
+            loaded = load(path)
+            load_seconds = time.perf_counter() - start
+            # 按执行器的访问方式遍历一遍
+            start = time.perf_counter()
+            total = 0.0
+            for i in range(len(loaded)):
+                total += loaded.delays[i] + loaded.random_offsets[i] + loaded.key_ids[i]
+            results[name] = {
+                'steps': len(loaded),
+                'file_bytes': os.path.getsize(path),
+                'load_seconds': load_seconds,
+                'scan_seconds': time.perf_counter() - start,
+            }
+            del loaded
+    finally:
+        for file_name in os.listdir(directory):
+            os.remove(os.path.join(directory, file_name))
+        os.rmdir(directory)
+    return results
+
+
+def bench_streaming_loader(steps=100_000):
+    """对比一次性加载JSON与流式读取JSONL的内存峰值，并报告流式解析吞吐"""
+    step_list = [Step('abcdefghij'[i % 10], 0.1, 0.05) for i in range(steps)]
+    timeline = compile_steps(step_list)
+    del step_list
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(directory, 'macro.json')
+        jsonl_path = os.path.join(directory, 'macro.jsonl')
+        save_json(json_path, timeline)
+        save_jsonl(jsonl_path, timeline.to_steps())
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        load_json(json_path)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results['json'] = {'steps': steps, 'peak_bytes': peak, 'seconds': elapsed}
+
+        source = JsonlSource(jsonl_path)
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in source:
+            pass
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        steps_per_second, bytes_per_second = source.throughput()
+        results['jsonl_stream'] = {
+            'steps': source.steps,
+            'peak_bytes': peak,
+            'seconds': elapsed,
+            'parse_steps_per_second': steps_per_second,
+            'parse_bytes_per_second': bytes_per_second,
+        }
+    finally:
+        for file_name in os.listdir(directory):
+            os.remove(os.path.join(directory, file_name))
+        os.rmdir(directory)
+    return results
+
+
+# 冷启动测试在新进程中导入的模块（不含界面库与输入后端的依赖库）
+STARTUP_SCRIPT = '''
+import json
+from import_timer import ImportTimer
+with ImportTimer() as timer:
+    import executor, recorder, config, module.MacroFile
+import sys
+print(json.dumps({'import_ms': timer.total * 1000, 'modules': len(timer.records),
+                  'ctypes_loaded': 'ctypes' in sys.modules}))
+'''
+
+
+def bench_step_model(rows=100_000, deletes=1000, edits=1000):
+    """步骤表格模型：批量加载、逐格编辑、逐行删除与启动时取出时间轴的耗时（需要PyQt6）"""
+    from step_model import COLUMN_DELAY, StepTableModel
+    model = StepTableModel()
+    data = [('abcdefghij'[i % 10], 0.01, 0.005, 0) for i in range(rows)]
+    start = time.perf_counter()
+    model.set_rows(data)
+    load = time.perf_counter() - start
+    edits = min(edits, rows)
+    start = time.perf_counter()
+    for row in range(edits):
+        model.setData(model.index(row, COLUMN_DELAY), '0.02')
+    edit = time.perf_counter() - start
+    deletes = min(deletes, rows)
+    start = time.perf_counter()
+    for _ in range(deletes):
+        model.removeRow(model.rowCount() // 2)
+    delete = time.perf_counter() - start
+    start = time.perf_counter()
+    model.timeline()
+    compiled = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'load_ms': load * 1000,
+        'edit_us': edit / max(1, edits) * 1e6,
+        'delete_us': delete / max(1, deletes) * 1e6,
+        'start_ms': compiled * 1000,
+    }
+
+
+def bench_hot_reload(steps=10_000, reloads=5):
+    """运行中在一轮循环的随机位置重复热重载二进制宏文件，测量解析耗时与等待循环边界的时间"""
+    backend = NullBackend()
+    timeline = compile_steps([Step('abcdefghij'[i % 10], 0.00001, 0) for i in range(steps)])
+    rng = random.Random(0)
+    parse, wait = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'macro.kpm')
+        save_binary(path, timeline)
+        executor = MacroExecutor()
+        executor.set_backend(backend)
+        executor.set_precise_timing(True)
+        executor.load_timeline(load_binary(path))
+        watcher = MacroFileWatcher(executor, path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            executor.start()
+            # 等待开始发送，之后的重载都在循环边界替换
+            while executor.events_sent == 0 and executor.thread.is_alive():
+                time.sleep(0.001)
+            for _ in range(reloads):
+                time.sleep(rng.uniform(0, timeline.cycle_time))
+                count = executor.reloads
+                watcher.reload()
+                while executor.reloads == count and executor.thread.is_alive():
+                    time.sleep(0.001)
+                parse.append(executor.last_reload['parse'])
+                wait.append(executor.last_reload['wait'])
+            executor.stop()
+            executor.thread.join()
+        del executor, watcher
+    return {
+        'steps': steps,
+        'cycle_ms': timeline.cycle_time * 1000,
+        'parse_ms': sorted(parse)[len(parse) // 2] * 1000,
+        'wait_ms': sorted(wait)[len(wait) // 2] * 1000,
+        'wait_max_ms': max(wait) * 1000,
+    }
+
+
+def bench_startup(runs=5):
+    """在新进程中测量核心模块的冷启动导入耗时，取中位数"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    samples.sort(key=lambda sample: sample['import_ms'])
+    median = samples[len(samples) // 2]
+    return {
+        'import_ms': median['import_ms'],
+        'modules': median['modules'],
+        'ctypes_loaded': int(median['ctypes_loaded']),
+    }
+
+
+def run_benchmarks(args):
+    """运行全部基准测试，返回 {测试名: {指标: 数值}}"""
+    results = {
+        'executor_overhead': bench_executor_overhead(args.events),
+        'executor_overhead_metrics': bench_executor_overhead(args.events, metrics=True),
+        'executor_overhead_live_stats': bench_live_stats(args.events),
+        'executor_chords': bench_chords(args.events),
+        'executor_timing': bench_executor_timing(duration=args.duration),
+        'executor_timing_legacy': bench_executor_timing(duration=args.duration, precise=False),
+    }
+    results['timeline_memory'] = bench_timeline_memory(args.timeline_steps)
+    results['program'] = bench_program()
+    for name, result in bench_backends(args.backend_events).items():
+        results[f'backend_{name}'] = result
+    for name, result in bench_key_dispatch_alloc(args.presses).items():
+        results[f'key_dispatch_{name}'] = result
+    results['recorder'] = bench_recorder(args.record_events)
+    try:
+        results['step_model'] = bench_step_model(args.table_rows)
+    except ImportError as e:
+        print(f"跳过步骤表格测试: {e}")
+    results['startup'] = bench_startup()
+    counts = tuple(int(count) for count in args.concurrent.split(','))
+    for name, result in bench_concurrent_macros(counts, duration=args.duration).items():
+        results[f'concurrent_{name}'] = result
+    for name, result in bench_macro_file(args.file_steps).items():
+        results[f'macro_file_{name}'] = result
+    for name, result in bench_streaming_loader(args.file_steps).items():
+        results[f'loader_{name}'] = result
+    results['hot_reload'] = bench_hot_reload(args.file_steps)
+    return results
+
+
+def compare_results(old, new):
+    """打印两次结果中相同指标的变化"""
+    for bench, metrics in new.items():
+        old_metrics = old.get(bench, {})
+        for metric, value in metrics.items():
+            old_value = old_metrics.get(metric)
+            if not isinstance(old_value, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            change = (value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"{bench}.{metric}: {old_value:.4g} -> {value:.4g} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按键精灵性能基准测试')
+    parser.add_argument('--events', type=int, default=100_000, help='执行器开销测试的事件数')
+    parser.add_argument('--duration', type=float, default=2.0, help='定时精度测试的时长（秒）')
+    parser.add_argument('--backend-events', type=int, default=200, help='每个后端的按键次数')
+    parser.add_argument('--timeline-steps', type=int, default=100_000, help='时间轴内存测试的步数')
+    parser.add_argument('--presses', type=int, default=1_000_000, help='内存分配测试的按键次数')
+    parser.add_argument('--record-events', type=int, default=100_000, help='录制测试的事件数')
+    parser.add_argument('--table-rows', type=int, default=100_000, help='步骤表格测试的行数')
+    parser.add_argument('--file-steps', type=int, default=100_000, help='宏文件测试的步数')
+    parser.add_argument('--concurrent', default='1,10,50', help='并发测试的宏数量，逗号分隔')
+    parser.add_argument('--output', '-o', help='保存结果的JSON文件')
+    parser.add_argument('--compare', '-c', help='与之前保存的JSON结果对比')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    for bench, metrics in results.items():
+        print(f"[{bench}]")
+        for metric, value in metrics.items():
+            print(f"  {metric}: {value:.4g}" if isinstance(value, float) else f"  {metric}: {value}")
+
+    if args.output:
+        data = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        print(f"结果已保存到: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f)['results'], results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+命令行运行器
+不创建界面、不导入PyQt6，直接加载宏文件并用 MacroExecutor 执行，
+适合在同一台机器上无人值守地同时运行多个实例。退出时输出计时统计
+"""
+import argparse
+import json
+import sys
+import time
+from executor import MacroExecutor
+from hot_reload import MacroFileWatcher
+from input_backend import BACKENDS
+from metrics import TimingMetrics
+from module.Humanize import create_distribution
+from module.MacroFile import JSONL_SUFFIX, JsonlSource, is_binary, load_macro
+from module.Program import MacroProgram
+
+
+def load_settings(path):
+    """读取界面保存的JSON配置中除步骤外的设置，其它格式返回空字典"""
+    if is_binary(path) or path.lower().endswith(JSONL_SUFFIX):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"宏文件必须是JSON对象: {path}")
+    config.pop('steps', None)
+    return config
+
+
+def configure(executor, args):
+    """按宏文件与命令行参数配置执行器，命令行参数优先"""
+    settings = load_settings(args.macro)
+    if args.macro.lower().endswith(JSONL_SUFFIX):
+        executor.load_source(JsonlSource(args.macro))
+    else:
+        macro = load_macro(args.macro)
+        if isinstance(macro, MacroProgram):
+            executor.load_program(macro)
+        else:
+            executor.load_timeline(macro)
+    if args.loop_count is not None:
+        executor.loop_count = args.loop_count
+    if args.loop_time is not None:
+        executor.loop_time = args.loop_time
+
+    executor.set_backend(args.backend)
+    executor.set_precise_timing(args.precise or settings.get('precise_timing', False))
+    distribution = settings.get('distribution')
+    seed = args.seed if args.seed is not None else settings.get('seed')
+    if distribution is not None:
+        executor.set_delay_distribution(create_distribution(distribution), seed)
+    else:
+        executor.set_delay_distribution(executor.delay_distribution, seed)
+    if settings.get('mouse_click_double'):
+        executor.mouse_click_double = True
+        executor.set_clicker(settings.get('click_cps', 20),
+                             settings.get('click_button', 'left'),
+                             settings.get('click_jitter', 0.0))
+
+
+def bind_hotkeys(executor):
+    """绑定快捷键配置中的启动/暂停与停止热键"""
+    import keyboard
+    from config import config
+
+    def toggle_pause():
+        if executor.paused:
+            executor.resume()
+        else:
+            executor.pause()
+
+    start_key = config.get_key_by_title("启动/暂停")
+    stop_key = config.get_key_by_title("停止")
+    if start_key:
+        keyboard.add_hotkey(start_key, toggle_pause)
+    if stop_key:
+        keyboard.add_hotkey(stop_key, executor.stop)
+    print(f"热键: 暂停/继续 {start_key}, 停止 {stop_key}")
+
+
+def print_summary(executor):
+    """输出本次运行的计时统计"""
+    stats = executor.timing_stats.summary()
+    print("运行统计:")
+    print(f"  时长: {executor.run_elapsed:.3f}s")
+    print(f"  执行步数: {stats['count']}, 跳过步数: {stats['skipped']}")
+    print(f"  平均误差: {stats['mean_error'] * 1000:.3f}ms, 抖动: {stats['jitter'] * 1000:.3f}ms")
+    print(f"  最小误差: {stats['min_error'] * 1000:.3f}ms, 最大误差: {stats['max_error'] * 1000:.3f}ms")
+    print(f"  唤醒: {executor.wakeups}次 ({executor.wakeups_per_second():.1f}次/秒)")
+    print(f"  随机种子: {executor.last_seed}")
+    if executor.reloads:
+        reload = executor.last_reload
+        print(f"  热重载: {executor.reloads}次, 最近一次解析{reload['parse'] * 1000:.1f}ms, "
+              f"等待循环边界{reload['wait'] * 1000:.1f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按键精灵命令行运行器（无界面）')
+    parser.add_argument('macro', help=f'宏文件（.json / .kpm / {JSONL_SUFFIX}）')
+    parser.add_argument('--backend', '-b', choices=sorted(BACKENDS), default='pyautogui',
+                        help='输入后端')
+    parser.add_argument('--loop-count', '-n', type=int, help='循环次数，0为无限，默认使用宏文件中的值')
+    parser.add_argument('--loop-time', '-t', type=float, help='循环时长（秒），0为无限，默认使用宏文件中的值')
+    parser.add_argument('--precise', action='store_true', help='精确定时（绝对截止时间）')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--hotkeys', action='store_true', help='启用快捷键配置中的暂停/继续与停止热键')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视宏文件，修改后在下一个循环边界替换为新内容，不停止运行')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='记录计时指标并导出到文件，.csv 为CSV，其余为Prometheus文本格式')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='运行中导出计时指标的间隔（秒），0为只在结束时导出')
+    args = parser.parse_args(argv)
+
+    executor = MacroExecutor()
+    try:
+        configure(executor, args)
+    except (OSError, ValueError) as e:
+        print(f"加载宏失败: {e}")
+        return 1
+    if args.hotkeys:
+        bind_hotkeys(executor)
+    metrics = TimingMetrics() if args.metrics else None
+    executor.set_metrics(metrics)
+
+    # 宏很短时启动后可能立即结束，以 start 的返回值判断是否启动成功
+    if not executor.start():
+        return 1
+    watcher = None
+    if args.watch:
+        watcher = MacroFileWatcher(executor, args.macro)
+        watcher.start()
+    next_export = time.monotonic() + args.metrics_interval
+    try:
+        # 分段等待，使 Ctrl+C 能及时生效
+        while executor.thread.is_alive():
+            executor.thread.join(0.2)
+            if metrics is not None and args.metrics_interval > 0 and time.monotonic() >= next_export:
+                metrics.export(args.metrics)
+                next_export += args.metrics_interval
+    except KeyboardInterrupt:
+        executor.stop()
+        executor.thread.join()
+    if watcher is not None:
+        watcher.stop()
+    print_summary(executor)
+    if metrics is not None:
+        metrics.export(args.metrics)
+        print(f"计时指标已导出: {args.metrics}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,14 +6,22 @@ CONFIG_FILE = "shortcuts.json"
 
 @dataclass
 class Config:
-    keys: list           # 快捷键配置
+    keys: list           # 快捷键配置，首次访问时才从配置文件加载
 
     def __init__(self):
-        self.keys = self._get_default_keys()
-        self._load_config()
+        # 不在导入时读取配置文件，首次访问 keys 时由 __getattr__ 加载
+        pass
+
+    def __getattr__(self, name):
+        # 只在属性尚不存在时调用，加载后 keys 为普通属性，不再经过这里
+        if name == 'keys':
+            self._load_config()
+            return self.__dict__['keys']
+        raise AttributeError(name)
     
     def _load_config(self):
         """从配置文件加载快捷键设置"""
+        self.keys = self._get_default_keys()
         if os.path.exists(CONFIG_FILE):
             try:
                 with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
@@ -35,6 +43,10 @@ class Config:
             {
                 "key": "alt+f11",
                 "title": "停止",
+            },
+            {
+                "key": "alt+f9",
+                "title": "录制",
             }
         ]
     
@@ -1,23 +1,63 @@
-import pyautogui
 import time
 import threading
-from game_input_pydirectinput import GameDirectInput  # 导入使用pydirectinput的游戏输入模块
-from game_input_win32 import GameWin32Input  # 导入使用pywin32的游戏输入模块
+from input_backend import (InputBackend, create_backend, BACKEND_PYAUTOGUI,
+                           BACKEND_DIRECTINPUT, BACKEND_WIN32, BACKEND_SCANCODE)
+from module.Humanize import DelaySampler, UniformDelay
+from module.Program import MacroProgram
+from module.Timeline import MacroTimeline, compile_steps
+from scheduler import DeadlineScheduler, TimingStats, LATE_CATCHUP, LATE_SKIP, WAIT_INTERRUPTED
+from streams import (MacroStream, SourceStream, ProgramStream, HoldStream, ClickStream, StreamQueue,
+                     check_supported, reload_latency)
 
 class MacroExecutor:
-    def __init__(self):
+    def __init__(self, clock=time.perf_counter, sleep=None):
         self.steps = [] # 执行步骤
-        self.running = False # 是否运行
-        self.paused = False # 是否暂停
+        self.timeline = compile_steps([])  # 编译后的时间轴
+        self.source = None  # 流式宏来源，设置后代替时间轴逐步读取
+        self.program = None  # 控制流宏（MacroProgram），设置后按字节码执行时间轴中的步骤
+        self._running = False # 是否运行
+        self._paused = False # 是否暂停
+        self._control = threading.Condition()  # 运行/暂停状态的条件变量
+        self._generation = 0  # 控制状态每变化一次加1，用于打断睡眠
+        self._loop_generation = 0  # 调度线程本次等待开始时的状态版本
+        self._control_action = None  # 尚未生效的控制操作
+        self._control_time = 0.0  # 该控制操作发出的时间
+        self.control_latency = {}  # 各控制操作从发出到生效的延迟（秒），便于测试
         self.mouse_click_double = False # 鼠标连点
         self.loop_count = 0 # 循环次数
         self.loop_time = 0 # 循环时间
-        self.thread = None  # 键盘线程
-        self.thread_mouse = None  # 鼠标线程
+        self.thread = None  # 调度线程
+        self.click_cps = 20  # 鼠标连点目标速度（次/秒）
+        self.click_button = 'left'  # 鼠标连点按钮
+        self.click_jitter = 0.0  # 鼠标连点间隔的随机波动比例（0~1）
+        self.click_stream = None  # 本次运行的鼠标连点事件流
+        self.macro_stream = None  # 本次运行的按键宏事件流
+        self.hold_stream = None  # 本次运行的按键释放事件流，held 为当前按住的按键
         self.game_mode_directinput = False  # pydirectinput游戏模式标志
         self.game_mode_win32 = False  # pywin32游戏模式标志
-        self.game_direct_input = GameDirectInput()  # 创建pydirectinput实例
-        self.game_win32_input = GameWin32Input()  # 创建pywin32实例
+        self.game_mode_scancode = False  # SendInput扫描码模式标志
+        self.backend = None  # 指定的输入后端（名称或实例），为None时按游戏模式选择
+        self.active_backend = None  # 本次运行绑定的输入后端
+        self._backends = {}  # 已创建的后端实例，按名称缓存
+        self.precise_timing = False  # 精确定时模式（绝对截止时间，无累积漂移）
+        self.late_policy = LATE_CATCHUP  # 落后时的处理策略
+        self.max_lag = 0.05  # skip策略下允许的最大落后时间（秒）
+        self.clock = clock  # 单调时钟，可注入
+        self.sleep = sleep  # 睡眠函数，可注入；默认使用可被暂停/停止打断的睡眠
+        self.timing_stats = TimingStats()  # 最近一次运行按键宏的计时统计
+        self.stream_stats = {}  # 最近一次运行各事件流的计时统计
+        self.wakeups = 0  # 最近一次运行调度线程的唤醒次数
+        self.run_elapsed = 0.0  # 最近一次运行的时长（秒）
+        self.run_end_time = None  # 最近一次运行结束的时间，运行中为None
+        self.run_start_time = None  # 最近一次运行开始的时间
+        self.events_sent = 0  # 最近一次运行已发送的事件数，只由调度线程写入
+        self.delay_distribution = UniformDelay()  # 随机波动的分布
+        self.seed = None  # 随机种子，为None时每次运行随机生成
+        self.last_seed = None  # 最近一次运行使用的随机种子，用于复现
+        self.metrics = None  # 计时指标（TimingMetrics），为None时不记录
+        self.reloads = 0  # 最近一次运行中替换宏的次数
+        self.last_reload = None  # 最近一次替换的耗时：解析、等待循环边界与总计（秒）
+        self.start_error = None  # 最近一次启动失败的原因
 
 
     def load_steps(self, steps, loop_count=0, loop_time=0):
@@ -25,85 +65,405 @@ class MacroExecutor:
         self.steps = steps
         self.loop_count = loop_count
         self.loop_time = loop_time
+        self.timeline = compile_steps(steps, loop_count, loop_time)
+        self.source = None
+        self.program = None
+
+    def load_timeline(self, timeline):
+        """直接加载已编译的时间轴"""
+        self.steps = []
+        self.loop_count = timeline.loop_count
+        self.loop_time = timeline.loop_time
+        self.timeline = timeline
+        self.source = None
+        self.program = None
+
+    def load_source(self, source, loop_count=None, loop_time=None):
+        """加载流式宏来源（如 JsonlSource），执行时边读边发送，不预先编译
+        循环参数为None时使用来源中记录的值
+        """
+        self.steps = []
+        self.timeline = compile_steps([])
+        self.source = source
+        self.program = None
+        self.loop_count = source.loop_count if loop_count is None else loop_count
+        self.loop_time = source.loop_time if loop_time is None else loop_time
+
+    def load_program(self, program, loop_count=None, loop_time=None):
+        """加载控制流宏（MacroProgram），循环参数为None时使用宏中记录的值"""
+        self.steps = []
+        self.timeline = program.timeline
+        self.source = None
+        self.program = program
+        self.loop_count = program.loop_count if loop_count is None else loop_count
+        self.loop_time = program.loop_time if loop_time is None else loop_time
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def _set_state(self, action, running, paused):
+        """修改运行状态并立即唤醒所有等待中的线程"""
+        with self._control:
+            self._running = running
+            self._paused = paused
+            self._generation += 1
+            self._control_action = action
+            self._control_time = self.clock()
+            self._control.notify_all()
+
+    def _note_control_effect(self):
+        """执行线程观察到控制操作后记录其生效延迟，需持有 self._control"""
+        if self._control_action is not None:
+            self.control_latency[self._control_action] = self.clock() - self._control_time
+            self._control_action = None
+
+    def _sleep_until_changed(self, timeout, generation):
+        """睡眠至多 timeout 秒，控制状态发生变化时立即返回True"""
+        with self._control:
+            return self._control.wait_for(lambda: self._generation != generation, timeout)
+
+    def _scheduler_sleep(self, timeout):
+        """供调度线程使用的可打断睡眠"""
+        return self._sleep_until_changed(timeout, self._loop_generation)
+
+    def _wait_while_paused(self):
+        """暂停期间阻塞，直到恢复或停止，返回暂停时长（秒）"""
+        pause_start = self.clock()
+        with self._control:
+            self._note_control_effect()
+            self._control.wait_for(lambda: not self._paused or not self._running)
+            self._note_control_effect()
+        return self.clock() - pause_start
 
     def start(self):
+        """校验后启动调度线程，返回是否已启动；校验失败时错误保存在 start_error"""
+        self.start_error = None
         if self.thread and self.thread.is_alive():
-            return
+            if self._running:
+                return False
+            # 上次运行已结束，调度线程正在输出汇总
+            self.thread.join()
+        try:
+            self.active_backend = self.validate()
+        except Exception as e:
+            print(f"启动失败: {e}")
+            self.start_error = e
+            return False
         print("启动")
-        self.running = True
-        self.paused = False
+        self._set_state('start', True, False)
         self.thread = threading.Thread(target=self.run_loop, daemon=True)
         self.thread.start()
-
-        if self.mouse_click_double:
-            self.thread_mouse = threading.Thread(target=self.run_mouse, daemon=True)
-            self.thread_mouse.start()
+        return True
 
     def stop(self):
         print("停止")
-        self.running = False
-        self.paused = False
+        self._set_state('stop', False, False)
 
     def pause(self):
         print("暂停")
-        self.paused = True
+        self._set_state('pause', self._running, True)
 
     def resume(self):
         print("继续")
-        self.paused = False
+        self._set_state('resume', self._running, False)
         
+    def set_backend(self, backend):
+        """指定输入后端，可传入后端名称或 InputBackend 实例，传入None恢复按游戏模式选择"""
+        self.backend = backend
+
+    def _resolve_backend(self):
+        """解析本次运行使用的输入后端，按需创建"""
+        backend = self.backend
+        if backend is None:
+            if self.game_mode_scancode:
+                backend = BACKEND_SCANCODE
+            elif self.game_mode_win32:
+                backend = BACKEND_WIN32
+            elif self.game_mode_directinput:
+                backend = BACKEND_DIRECTINPUT
+            else:
+                backend = BACKEND_PYAUTOGUI
+        if isinstance(backend, InputBackend):
+            return backend
+        if backend not in self._backends:
+            self._backends[backend] = create_backend(backend)
+        return self._backends[backend]
+
+    def validate(self):
+        """启动前校验：解析输入后端并确认其支持宏中的全部按键，失败时抛出ValueError"""
+        backend = self._resolve_backend()
+        check_supported(backend, self.timeline)
+        return backend
+
+    def reload_macro(self, macro, detected=None, compiled=None):
+        """替换宏内容（MacroTimeline、MacroProgram 或流式来源），可在任意线程调用
+        运行中时在下一个循环边界生效，循环计数、时长与计时不会重置；未运行时供下次启动使用。
+        循环参数保持不变。detected/compiled 为检测到修改与编译完成的时间，用于统计替换延迟
+        """
+        if isinstance(macro, MacroProgram):
+            stream_type = ProgramStream
+            timeline = macro.timeline
+        elif isinstance(macro, MacroTimeline):
+            stream_type = MacroStream
+            timeline = macro
+        else:
+            stream_type = SourceStream
+            timeline = None
+        if timeline is not None:
+            if len(timeline) == 0:
+                raise ValueError("新的宏没有步骤")
+            check_supported(self.active_backend or self._resolve_backend(), timeline)
+        with self._control:
+            stream = self.macro_stream
+            if self.run_end_time is None and stream is not None:
+                if not isinstance(stream, stream_type):
+                    raise ValueError("运行中不能在时间轴、控制流宏与流式宏之间切换")
+                stream.swap(macro, detected, compiled)
+            if stream_type is SourceStream:
+                self.source = macro
+                self.program = None
+            else:
+                self.timeline = timeline
+                self.program = macro if stream_type is ProgramStream else None
+                self.steps = []
+
+    def _on_swap(self, stream, detected, compiled, now):
+        """调度线程在循环边界替换宏后记录延迟"""
+        self.reloads += 1
+        self.last_reload = latency = reload_latency(detected, compiled, now)
+        print(f"[reload] 第{stream.loops}轮开始时替换宏, 解析{latency['parse'] * 1000:.1f}ms, "
+              f"等待循环边界{latency['wait'] * 1000:.1f}ms")
+
     def set_game_mode_directinput(self, enabled):
         """设置是否使用SendInput游戏模式"""
+        self.backend = None
         self.game_mode_directinput = enabled
-        # 如果启用了pydirectinput模式，自动禁用win32模式
+        # 如果启用了pydirectinput模式，自动禁用其它模式
         if enabled:
             self.game_mode_win32 = False
+            self.game_mode_scancode = False
             
     def set_game_mode_win32(self, enabled):
         """设置是否使用pywin32游戏模式"""
+        self.backend = None
         self.game_mode_win32 = enabled
-        # 如果启用了win32模式，自动禁用pydirectinput模式
+        # 如果启用了win32模式，自动禁用其它模式
+        if enabled:
+            self.game_mode_directinput = False
+            self.game_mode_scancode = False
+
+    def set_game_mode_scancode(self, enabled):
+        """设置是否使用SendInput扫描码模式"""
+        self.backend = None
+        self.game_mode_scancode = enabled
+        # 如果启用了扫描码模式，自动禁用其它模式
         if enabled:
             self.game_mode_directinput = False
+            self.game_mode_win32 = False
+
+    def set_delay_distribution(self, distribution, seed=None):
+        """设置随机波动的分布与随机种子"""
+        self.delay_distribution = distribution
+        self.seed = seed
+
+    def set_clicker(self, cps=20, button='left', jitter=0.0):
+        """设置鼠标连点的目标速度（次/秒）、按钮与间隔随机波动比例"""
+        if cps <= 0:
+            raise ValueError(f"连点速度必须大于0: {cps}")
+        if not 0 <= jitter < 1:
+            raise ValueError(f"连点随机波动必须在0到1之间: {jitter}")
+        self.click_cps = cps
+        self.click_button = button
+        self.click_jitter = jitter
+
+    def achieved_cps(self):
+        """当前或最近一次运行实际达到的连点速度（次/秒），未连点时返回0"""
+        stream = self.click_stream
+        if stream is None:
+            return 0.0
+        now = self.run_end_time if self.run_end_time is not None else self.clock()
+        return stream.achieved_cps(now)
+
+    def set_metrics(self, metrics):
+        """设置计时指标，逐事件记录定时误差与后端调用耗时；为None时关闭"""
+        self.metrics = metrics
+
+    def set_precise_timing(self, enabled):
+        """设置是否使用精确定时模式"""
+        self.precise_timing = enabled
+
+    def _wait_until(self, scheduler, queue, deadline):
+        """等待到截止时间，期间响应暂停与停止
+        返回期间累计暂停的时长（秒），已停止时返回None
+        """
+        paused_total = 0.0
+        while True:
+            with self._control:
+                self._loop_generation = self._generation
+                if not self._running:
+                    self._note_control_effect()
+                    return None
+                paused = self._paused
+            if paused:
+                # 暂停期间不保持按住，恢复后重新按下；暂停期间的时间不计入时间轴
+                ups, downs = queue.suspend()
+                self.events_sent += queue.send(ups)
+                paused_delta = self._wait_while_paused()
+                if downs:
+                    if self._running:
+                        self.events_sent += queue.send(downs)
+                    else:
+                        # 暂停中被停止，按键已经释放
+                        queue.release_all()
+                paused_total += paused_delta
+                deadline += paused_delta
+                continue
+            if scheduler.wait_until(deadline) != WAIT_INTERRUPTED:
+                return paused_total
+
+    def _create_streams(self):
+        """创建本次运行的事件流"""
+        absolute = self.precise_timing
+        sampler = DelaySampler(self.delay_distribution, self.seed)
+        self.last_seed = sampler.seed
+        print(f"随机种子: {sampler.seed}")
+        streams = []
+        self.macro_stream = None
+        # 没有按键步骤时只运行连点，直到手动停止
+        if self.program is not None:
+            self.macro_stream = ProgramStream(self.program, sampler, absolute=absolute,
+                                              loop_count=self.loop_count, loop_time=self.loop_time)
+        elif self.source is not None:
+            self.macro_stream = SourceStream(self.source, sampler, absolute=absolute,
+                                             loop_count=self.loop_count, loop_time=self.loop_time,
+                                             supports=self.active_backend.supports)
+        elif len(self.timeline):
+            self.macro_stream = MacroStream(self.timeline, sampler, absolute=absolute,
+                                            loop_count=self.loop_count, loop_time=self.loop_time)
+        self.hold_stream = None
+        if self.macro_stream is not None:
+            self.macro_stream.stats = self.timing_stats
+            self.macro_stream.on_swap = self._on_swap
+            streams.append(self.macro_stream)
+            # 热重载可能换入包含组合键或按住的宏，始终创建释放事件流，没有按住时不进入队列
+            self.hold_stream = self.macro_stream.holds = HoldStream()
+            streams.append(self.hold_stream)
+        self.click_stream = None
+        if self.mouse_click_double:
+            # 连点使用由运行种子派生的独立采样器，与宏交替取用时两者仍可各自复现
+            click_sampler = sampler.spawn('click') if self.click_jitter > 0 else None
+            self.click_stream = ClickStream(self.click_cps, self.click_button, self.click_jitter,
+                                            sampler=click_sampler,
+                                            is_enabled=lambda: self.mouse_click_double)
+            streams.append(self.click_stream)
+        return streams
 
     def run_loop(self):
-        start_time = time.time()
-        count = 0
-        while self.running:
-            if self.loop_count and count >= self.loop_count:
-                break
-            if self.loop_time and (time.time() - start_time >= self.loop_time):
-                break
-
-            for step in self.steps:
-                if not self.running:
+        """调度线程：所有事件流共用一个优先队列，每次唤醒把到期事件合并为一批发送"""
+        scheduler = DeadlineScheduler(clock=self.clock,
+                                      sleep=self.sleep or self._scheduler_sleep,
+                                      fine_sleep=self.sleep or time.sleep)
+        backend = self.active_backend
+        clock = self.clock
+        metrics = self.metrics
+
+        queue = None
+        try:
+            # 与 reload_macro 互斥，保证运行开始前后请求的替换都不会丢失
+            with self._control:
+                streams = self._create_streams()
+                self.run_end_time = None
+            self.stream_stats = {stream.name: stream.stats for stream in streams}
+            self.wakeups = 0
+            self.events_sent = 0
+            self.reloads = 0
+            if metrics is not None:
+                metrics.reset()
+            queue = StreamQueue(streams, backend, clock=clock,
+                                skip_late=self.late_policy == LATE_SKIP, max_lag=self.max_lag,
+                                metrics=metrics)
+            scheduler.start()
+            now = scheduler.start_time
+            self.run_start_time = now
+            queue.start(now)
+
+            while queue.active:
+                paused = self._wait_until(scheduler, queue, queue.next_due)
+                if paused is None:
                     break
-                while self.paused:
-                    time.sleep(1)
-
-                # 根据模式选择不同的按键模拟方法
-                if self.game_mode_win32:
-                    self.game_win32_input.press_key(step.key)
-                elif self.game_mode_directinput:
-                    self.game_direct_input.press_key(step.key)
-                else:
-                    pyautogui.press(step.key)
-                    
-                wait_time = step.get_wait_time()
-                time.sleep(max(0, wait_time))
-            count += 1
-
-    def run_mouse(self):
-        while self.running:
-            if self.paused:
-                time.sleep(1)
-                continue
-            if self.mouse_click_double:
-                # 根据模式选择不同的鼠标点击方法
-                    if self.game_mode_win32:
-                        self.game_win32_input.click()
-                    elif self.game_mode_directinput:
-                        self.game_direct_input.click()
-                    else:
-                        pyautogui.click()
-            time.sleep(0.05)
+                if paused:
+                    queue.shift(paused)
+                self.wakeups += 1
+                self.events_sent += queue.send(queue.collect(clock()))
+        finally:
+            # 停止或出错时立即释放仍按住的按键，不等待各自的释放时间
+            released = queue.release_all() if queue is not None else []
+            if released:
+                backend.batch(released)
+                self.events_sent += len(released)
+                print(f"[hold] 释放仍按住的{len(released)}个按键")
+            # 无论正常结束、停止还是出错都结束本次运行，否则界面、热重载与下次启动都会认为仍在运行
+            self.run_end_time = clock()
+            with self._control:
+                self._running = False
+                self._paused = False
+                self._generation += 1
+                self._control.notify_all()
+
+        self.run_elapsed = self.run_end_time - scheduler.start_time
+        for name, stats in self.stream_stats.items():
+            print(f"[{name}] 执行{stats.count}步, 跳过{stats.skipped}步, "
+                  f"漂移{stats.drift * 1000:.3f}ms, 抖动{stats.jitter * 1000:.3f}ms")
+        if self.source is not None and hasattr(self.source, 'throughput'):
+            steps_per_second, bytes_per_second = self.source.throughput()
+            print(f"[source] 解析{self.source.steps}步, "
+                  f"{steps_per_second:.0f}步/秒, {bytes_per_second / 1e6:.1f}MB/秒")
+        if self.click_stream is not None:
+            print(f"[mouse] 目标{self.click_cps}次/秒, 实际{self.achieved_cps():.1f}次/秒")
+        if metrics is not None:
+            metrics.print_summary()
+        print(f"运行结束: 唤醒{self.wakeups}次, 每秒唤醒{self.wakeups_per_second():.1f}次")
+
+    def live_stats(self):
+        """当前或最近一次运行的实时统计，供界面定时刷新
+
+        只读取调度线程写入的普通属性，不获取任何锁，不会阻塞调度线程；
+        各项不是同一时刻的快照，相差至多一次唤醒
+        """
+        start = self.run_start_time
+        if start is None:
+            return None
+        end = self.run_end_time
+        now = end if end is not None else self.clock()
+        macro = self.macro_stream
+        stats = self.timing_stats
+        dropped = 0
+        for stream_stats in self.stream_stats.values():
+            dropped += stream_stats.skipped
+        return {
+            'running': end is None,
+            'elapsed': now - start,
+            'loop_time': self.loop_time,
+            'loop_count': self.loop_count,
+            'loops': macro.loops if macro is not None else 0,
+            'step': macro.index if macro is not None else 0,
+            'steps': len(self.timeline) if self.source is None else None,
+            'events': self.events_sent,
+            'error': stats.last,
+            'mean_error': stats.mean,
+            'jitter': stats.jitter,
+            'dropped': dropped,
+            'held': len(self.hold_stream.held) if self.hold_stream is not None else 0,
+        }
+
+    def wakeups_per_second(self):
+        """最近一次运行调度线程每秒的唤醒次数"""
+        if self.run_elapsed <= 0:
+            return 0.0
+        return self.wakeups / self.run_elapsed
+
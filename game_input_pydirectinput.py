@@ -5,6 +5,7 @@
 """
 import pydirectinput
 import time
+from key_table import PYAUTOGUI_NAMES, resolve_key
 
 class GameDirectInput:
     def __init__(self):
@@ -12,56 +13,23 @@ class GameDirectInput:
         # 可以根据需要设置一些配置选项
         pydirectinput.PAUSE = 0.01  # 设置默认延迟，可根据需要调整
         
+    def _key_name(self, key):
+        """获取pydirectinput使用的按键名，也可直接传入虚拟键码，无法识别时返回None"""
+        try:
+            return PYAUTOGUI_NAMES[resolve_key(key)]
+        except ValueError:
+            return None
+
     def press_key(self, key):
         """按下并释放指定的按键
         使用pydirectinput提供的底层按键模拟，提高与游戏的兼容性
         """
         try:
-            # 对于单字符键，直接使用字符
-            if len(key) == 1 and key.isalnum():
-                pydirectinput.press(key)
-            # 对于特殊键，需要处理
-            else:
-                # 常见特殊键的映射
-                special_keys = {
-                    'space': 'space',
-                    'enter': 'enter',
-                    'esc': 'esc',
-                    'tab': 'tab',
-                    'up': 'up',
-                    'down': 'down',
-                    'right': 'right',
-                    'left': 'left',
-                    'backspace': 'backspace',
-                    'delete': 'delete',
-                    'shift': 'shift',
-                    'ctrl': 'ctrl',
-                    'alt': 'alt',
-                    'f1': 'f1',
-                    'f2': 'f2',
-                    'f3': 'f3',
-                    'f4': 'f4',
-                    'f5': 'f5',
-                    'f6': 'f6',
-                    'f7': 'f7',
-                    'f8': 'f8',
-                    'f9': 'f9',
-                    'f10': 'f10',
-                    'f11': 'f11',
-                    'f12': 'f12'
-                }
-                
-                # 检查是否是特殊键
-                key_lower = key.lower()
-                if key_lower in special_keys:
-                    pydirectinput.press(special_keys[key_lower])
-                else:
-                    # 默认情况下尝试使用原始键
-                    print(f"尝试使用未映射的键: {key}")
-                    pydirectinput.press(key)
-                     
-                # 短暂延迟确保按键被正确处理
-                time.sleep(0.01)
+            name = self._key_name(key)
+            if name is None:
+                print(f"未映射的键: {key}")
+                return
+            pydirectinput.press(name)
         except Exception as e:
             print(f"按键模拟错误: {e}")
     
@@ -93,30 +61,11 @@ class GameDirectInput:
         适用于需要长按的操作
         """
         try:
-            # 对于单字符键，直接使用字符
-            if len(key) == 1 and key.isalnum():
-                pydirectinput.keyDown(key)
-            # 对于特殊键，需要处理
-            else:
-                special_keys = {
-                    'space': 'space',
-                    'enter': 'enter',
-                    'esc': 'esc',
-                    'tab': 'tab',
-                    'up': 'up',
-                    'down': 'down',
-                    'right': 'right',
-                    'left': 'left',
-                    'shift': 'shift',
-                    'ctrl': 'ctrl',
-                    'alt': 'alt'
-                }
-                
-                key_lower = key.lower()
-                if key_lower in special_keys:
-                    pydirectinput.keyDown(special_keys[key_lower])
-                else:
-                    pydirectinput.keyDown(key)
+            name = self._key_name(key)
+            if name is None:
+                print(f"未映射的键: {key}")
+                return
+            pydirectinput.keyDown(name)
         except Exception as e:
             print(f"按键按下错误: {e}")
             
@@ -125,29 +74,10 @@ class GameDirectInput:
         配合hold_key使用
         """
         try:
-            # 对于单字符键，直接使用字符
-            if len(key) == 1 and key.isalnum():
-                pydirectinput.keyUp(key)
-            # 对于特殊键，需要处理
-            else:
-                special_keys = {
-                    'space': 'space',
-                    'enter': 'enter',
-                    'esc': 'esc',
-                    'tab': 'tab',
-                    'up': 'up',
-                    'down': 'down',
-                    'right': 'right',
-                    'left': 'left',
-                    'shift': 'shift',
-                    'ctrl': 'ctrl',
-                    'alt': 'alt'
-                }
-                
-                key_lower = key.lower()
-                if key_lower in special_keys:
-                    pydirectinput.keyUp(special_keys[key_lower])
-                else:
-                    pydirectinput.keyUp(key)
+            name = self._key_name(key)
+            if name is None:
+                print(f"未映射的键: {key}")
+                return
+            pydirectinput.keyUp(name)
         except Exception as e:
-            print(f"按键释放错误: {e}")
\ No newline at end of file
+            print(f"按键释放错误: {e}")
@@ -5,9 +5,9 @@
 """
 import ctypes
 import time
-import win32con
-import win32api
 from ctypes import wintypes
+from input_backend import SendResult
+from key_table import VK_CODE, EXTENDED_KEYS, build_scan_table, resolve_key  # VK_CODE 保留供旧代码引用
 
 # Windows API常量
 INPUT_MOUSE = 0
@@ -30,6 +30,16 @@ KEYEVENTF_KEYUP = 0x0002
 KEYEVENTF_UNICODE = 0x0004
 KEYEVENTF_SCANCODE = 0x0008
 
+# 预构建按键事件缓存的最大条目数
+KEY_CACHE_SIZE = 256
+
+# 鼠标按钮对应的按下/释放标志
+MOUSE_BUTTON_FLAGS = {
+    'left': (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+    'right': (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP),
+    'middle': (MOUSEEVENTF_MIDDLEDOWN, MOUSEEVENTF_MIDDLEUP),
+}
+
 # 定义结构体
 class MOUSEINPUT(ctypes.Structure):
     _fields_ = [
@@ -70,45 +80,192 @@ class INPUT(ctypes.Structure):
         ("union", INPUT_UNION)
     ]
 
-# 虚拟键码映射
-VK_CODE = {
-    'a': 0x41, 'b': 0x42, 'c': 0x43, 'd': 0x44, 'e': 0x45, 'f': 0x46, 'g': 0x47, 'h': 0x48,
-    'i': 0x49, 'j': 0x4A, 'k': 0x4B, 'l': 0x4C, 'm': 0x4D, 'n': 0x4E, 'o': 0x4F, 'p': 0x50,
-    'q': 0x51, 'r': 0x52, 's': 0x53, 't': 0x54, 'u': 0x55, 'v': 0x56, 'w': 0x57, 'x': 0x58,
-    'y': 0x59, 'z': 0x5A,
-    '0': 0x30, '1': 0x31, '2': 0x32, '3': 0x33, '4': 0x34, '5': 0x35, '6': 0x36, '7': 0x37,
-    '8': 0x38, '9': 0x39,
-    'space': 0x20, 'enter': 0x0D, 'esc': 0x1B, 'tab': 0x09,
-    'up': 0x26, 'down': 0x28, 'right': 0x27, 'left': 0x25,
-    'backspace': 0x08, 'delete': 0x2E,
-    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12,
-    'f1': 0x70, 'f2': 0x71, 'f3': 0x72, 'f4': 0x73, 'f5': 0x74, 'f6': 0x75,
-    'f7': 0x76, 'f8': 0x77, 'f9': 0x78, 'f10': 0x79, 'f11': 0x7A, 'f12': 0x7B
-}
+INPUT_SIZE = ctypes.sizeof(INPUT)
+INPUT_ARRAY_1 = INPUT * 1
+INPUT_ARRAY_2 = INPUT * 2
+
+
+def encode_key_event(vk, key_up=False, scan_table=None):
+    """计算键盘事件的 (wVk, wScan, dwFlags)，不依赖Windows，便于单独测试
+    scan_table 为 build_scan_table 生成的扫描码表，为None时按虚拟键码发送；
+    扫描码模式下没有对应扫描码的按键退回虚拟键码
+    """
+    flags = KEYEVENTF_KEYUP if key_up else 0
+    scan = scan_table[vk] if scan_table is not None else 0
+    if scan:
+        flags |= KEYEVENTF_SCANCODE
+        if scan >> 8 == 0xE0:
+            flags |= KEYEVENTF_EXTENDEDKEY
+        return 0, scan & 0xFF, flags
+    if vk in EXTENDED_KEYS:
+        flags |= KEYEVENTF_EXTENDEDKEY
+    return vk, 0, flags
+
+
+class InputBatch:
+    """批量输入事件
+    收集多个键盘和鼠标事件，通过 GameSendInput.send_batch 一次性交给SendInput发送
+    """
+    def __init__(self, game_input):
+        self._game_input = game_input
+        self.inputs = []
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def clear(self):
+        """清空已收集的事件"""
+        self.inputs.clear()
+
+    def key_down(self, key):
+        """添加按键按下事件"""
+        self.inputs.append(self._game_input._key_inputs(key)[1][0])
+        return self
+
+    def key_up(self, key):
+        """添加按键释放事件"""
+        self.inputs.append(self._game_input._key_inputs(key)[2][0])
+        return self
+
+    def press_key(self, key):
+        """添加按下并释放按键的事件"""
+        self.inputs.extend(self._game_input._key_inputs(key)[0])
+        return self
+
+    def move_to(self, x, y):
+        """添加鼠标移动到屏幕坐标(x, y)的事件"""
+        abs_x, abs_y = self._game_input._to_absolute(x, y)
+        self.inputs.append(self._game_input._create_mouse_input(
+            abs_x, abs_y, MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_MOVE))
+        return self
+
+    def mouse_down(self, button='left'):
+        """添加鼠标按下事件"""
+        self.inputs.append(self._game_input._button_inputs(button)[1][0])
+        return self
+
+    def mouse_up(self, button='left'):
+        """添加鼠标释放事件"""
+        self.inputs.append(self._game_input._button_inputs(button)[2][0])
+        return self
+
+    def click(self, x=None, y=None, button='left'):
+        """添加鼠标点击事件，指定坐标时先移动鼠标"""
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        self.inputs.extend(self._game_input._button_inputs(button)[0])
+        return self
+
+    def send(self):
+        """发送并清空已收集的事件，返回 SendResult"""
+        return self._game_input.send_batch(self)
+
 
 class GameSendInput:
-    def __init__(self):
-        # 初始化SendInput API
-        self.user32 = ctypes.windll.user32
-        self.user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
-        self.user32.SendInput.restype = wintypes.UINT
+    def __init__(self, settle_delay=0.01, user32=None, scan_code=False):
+        # 初始化SendInput API，可注入假的user32以便在非Windows环境下测试
+        if user32 is None:
+            user32 = ctypes.windll.user32
+            user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
+            user32.SendInput.restype = wintypes.UINT
+            user32.MapVirtualKeyW.argtypes = [wintypes.UINT, wintypes.UINT]
+            user32.MapVirtualKeyW.restype = wintypes.UINT
+        self.user32 = user32
+        self._SendInput = user32.SendInput
+
+        # 扫描码模式：按扫描码发送按键，供只读取扫描码的DirectInput/Raw Input游戏使用。
+        # 扫描码表在此一次性生成，之后按虚拟键码直接查表
+        self.scan_code = scan_code
+        self.scan_table = None
+        if scan_code:
+            self.scan_table = build_scan_table(getattr(user32, 'MapVirtualKeyW', None))
         
         # 获取屏幕尺寸
-        self.screen_width = win32api.GetSystemMetrics(0)
-        self.screen_height = win32api.GetSystemMetrics(1)
+        self.screen_width = user32.GetSystemMetrics(0)
+        self.screen_height = user32.GetSystemMetrics(1)
+
+        # 每次调用SendInput后的等待时间（秒），为0时不等待
+        self.settle_delay = settle_delay
+
+        # 按键 -> (按下并释放, 按下, 释放) 三个预构建的INPUT数组
+        self._key_cache = {}
+        # 鼠标按钮 -> (点击, 按下, 释放) 三个预构建的INPUT数组
+        self._button_cache = {}
         
     def _send_input(self, inputs):
-        """发送输入事件"""
+        """发送输入事件，返回系统实际接收的事件数"""
         n_inputs = len(inputs)
+        if n_inputs == 0:
+            return 0
         arr = INPUT * n_inputs
         input_arr = arr(*inputs)
         
-        result = self.user32.SendInput(n_inputs, input_arr, ctypes.sizeof(INPUT))
+        return self._send_array(input_arr, n_inputs)
+
+    def _send_array(self, input_arr, n_inputs):
+        """发送已构建好的INPUT数组，返回系统实际接收的事件数"""
+        result = self._SendInput(n_inputs, input_arr, INPUT_SIZE)
         if result != n_inputs:
             print(f"SendInput失败，发送了{result}/{n_inputs}个事件")
             
         # 短暂延迟确保事件被处理
-        time.sleep(0.01)
+        if self.settle_delay > 0:
+            time.sleep(self.settle_delay)
+        return result
+
+    def _key_inputs(self, key):
+        """获取按键预构建的INPUT数组，首次使用时构建并缓存"""
+        entry = self._key_cache.get(key)
+        if entry is None:
+            vk = self._get_vk(key)
+            down = self._create_keyboard_input(*encode_key_event(vk, False, self.scan_table))
+            up = self._create_keyboard_input(*encode_key_event(vk, True, self.scan_table))
+            entry = (INPUT_ARRAY_2(down, up), INPUT_ARRAY_1(down), INPUT_ARRAY_1(up))
+            # 缓存已满时淘汰最早加入的条目
+            if len(self._key_cache) >= KEY_CACHE_SIZE:
+                del self._key_cache[next(iter(self._key_cache))]
+            self._key_cache[key] = entry
+        return entry
+
+    def batch(self):
+        """创建一个新的批量输入事件"""
+        return InputBatch(self)
+
+    def send_batch(self, batch):
+        """一次性发送批量事件，batch 可以是 InputBatch 或 INPUT 列表
+        返回 SendResult(accepted, submitted)
+        """
+        inputs = batch.inputs if isinstance(batch, InputBatch) else batch
+        submitted = len(inputs)
+        accepted = self._send_input(inputs)
+        if isinstance(batch, InputBatch):
+            batch.clear()
+        return SendResult(accepted, submitted)
+
+    def _get_vk(self, key):
+        """获取按键对应的虚拟键码，也可直接传入虚拟键码，无法识别时抛出ValueError"""
+        return resolve_key(key)
+
+    def _button_inputs(self, button):
+        """获取鼠标按钮预构建的INPUT数组，首次使用时构建并缓存"""
+        entry = self._button_cache.get(button)
+        if entry is None:
+            down_flag, up_flag = self._get_button_flags(button)
+            down = self._create_mouse_input(0, 0, down_flag)
+            up = self._create_mouse_input(0, 0, up_flag)
+            entry = (INPUT_ARRAY_2(down, up), INPUT_ARRAY_1(down), INPUT_ARRAY_1(up))
+            self._button_cache[button] = entry
+        return entry
+
+    def _get_button_flags(self, button):
+        """获取鼠标按钮对应的按下/释放标志，不支持时抛出ValueError"""
+        if button not in MOUSE_BUTTON_FLAGS:
+            raise ValueError(f"不支持的鼠标按钮: {button}")
+        return MOUSE_BUTTON_FLAGS[button]
+
+    def _to_absolute(self, x, y):
+        """将屏幕坐标转换为SendInput使用的绝对坐标"""
+        return int(x * 65535 / self.screen_width), int(y * 65535 / self.screen_height)
         
     def _create_mouse_input(self, dx, dy, flags, mouse_data=0):
         """创建鼠标输入事件"""
@@ -144,102 +301,42 @@ class GameSendInput:
     def press_key(self, key):
         """按下并释放指定的按键"""
         try:
-            # 获取虚拟键码
-            key_lower = key.lower()
-            if key_lower in VK_CODE:
-                vk = VK_CODE[key_lower]
-            elif len(key) == 1 and key.isalnum():
-                # 对于未映射的单字符，尝试转换为大写获取虚拟键码
-                vk = ord(key.upper())
-            else:
-                print(f"未映射的键: {key}")
-                return
-                
-            # 发送按键按下和释放事件
-            inputs = [
-                self._create_keyboard_input(vk, 0, 0),  # 按键按下
-                self._create_keyboard_input(vk, 0, KEYEVENTF_KEYUP)  # 按键释放
-            ]
-            
-            self._send_input(inputs)
-            
+            entry = self._key_cache.get(key) or self._key_inputs(key)
+            self._send_array(entry[0], 2)
+        except ValueError as e:
+            print(e)
         except Exception as e:
             print(f"按键模拟错误: {e}")
     
     def click(self, x=None, y=None, button='left'):
         """执行鼠标点击操作"""
         try:
-            # 如果指定了坐标，先移动鼠标
-            if x is not None and y is not None:
-                # 转换为绝对坐标
-                abs_x = int(x * 65535 / self.screen_width)
-                abs_y = int(y * 65535 / self.screen_height)
-                
-                # 发送鼠标移动事件
-                move_input = self._create_mouse_input(abs_x, abs_y, MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_MOVE)
-                self._send_input([move_input])
-            
-            # 根据按钮类型发送点击事件
-            if button == 'left':
-                down_flag = MOUSEEVENTF_LEFTDOWN
-                up_flag = MOUSEEVENTF_LEFTUP
-            elif button == 'right':
-                down_flag = MOUSEEVENTF_RIGHTDOWN
-                up_flag = MOUSEEVENTF_RIGHTUP
-            elif button == 'middle':
-                down_flag = MOUSEEVENTF_MIDDLEDOWN
-                up_flag = MOUSEEVENTF_MIDDLEUP
+            if x is None or y is None:
+                entry = self._button_cache.get(button) or self._button_inputs(button)
+                self._send_array(entry[0], 2)
             else:
-                print(f"不支持的鼠标按钮: {button}")
-                return
-            
-            # 发送鼠标按下和释放事件
-            inputs = [
-                self._create_mouse_input(0, 0, down_flag),  # 鼠标按下
-                self._create_mouse_input(0, 0, up_flag)    # 鼠标释放
-            ]
-            
-            self._send_input(inputs)
-            
+                self.send_batch(self.batch().click(x, y, button))
+        except ValueError as e:
+            print(e)
         except Exception as e:
             print(f"鼠标点击错误: {e}")
             
     def hold_key(self, key):
         """按住指定的按键不释放"""
         try:
-            # 获取虚拟键码
-            key_lower = key.lower()
-            if key_lower in VK_CODE:
-                vk = VK_CODE[key_lower]
-            elif len(key) == 1 and key.isalnum():
-                vk = ord(key.upper())
-            else:
-                print(f"未映射的键: {key}")
-                return
-                
-            # 发送按键按下事件
-            input_event = self._create_keyboard_input(vk, 0, 0)
-            self._send_input([input_event])
-            
+            entry = self._key_cache.get(key) or self._key_inputs(key)
+            self._send_array(entry[1], 1)
+        except ValueError as e:
+            print(e)
         except Exception as e:
             print(f"按键按下错误: {e}")
             
     def release_key(self, key):
         """释放之前按住的按键"""
         try:
-            # 获取虚拟键码
-            key_lower = key.lower()
-            if key_lower in VK_CODE:
-                vk = VK_CODE[key_lower]
-            elif len(key) == 1 and key.isalnum():
-                vk = ord(key.upper())
-            else:
-                print(f"未映射的键: {key}")
-                return
-                
-            # 发送按键释放事件
-            input_event = self._create_keyboard_input(vk, 0, KEYEVENTF_KEYUP)
-            self._send_input([input_event])
-            
+            entry = self._key_cache.get(key) or self._key_inputs(key)
+            self._send_array(entry[2], 1)
+        except ValueError as e:
+            print(e)
         except Exception as e:
-            print(f"按键释放错误: {e}")
\ No newline at end of file
+            print(f"按键释放错误: {e}")
@@ -1,13 +1,48 @@
 import json
+import time
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QTableView,
     QSpinBox, QDoubleSpinBox, QLabel, QHBoxLayout, QLineEdit, QApplication,
-    QHeaderView, QCheckBox, QFileDialog, QDialog, QMessageBox
+    QHeaderView, QCheckBox, QFileDialog, QDialog, QMessageBox, QComboBox
 )
-from PyQt6.QtCore import Qt
-from module.Step import Step
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from module.Humanize import create_distribution, EmpiricalDelay
+from module.MacroFile import (BINARY_SUFFIX, JSONL_SUFFIX, JsonlSource, is_binary,
+                              load_binary, save_binary, save_jsonl)
+from module.Program import MacroProgram, compile_program, has_control_flow
+from hot_reload import MacroFileWatcher
+from recorder import MacroRecorder
+from step_model import COLUMN_ACTION, COLUMN_KEY, DeleteButtonDelegate, StepTableModel
 from config import config
 
+# 连点按钮下拉框的选项
+CLICK_BUTTON_LABELS = [
+    ('left', '左键'),
+    ('right', '右键'),
+    ('middle', '中键'),
+]
+
+# 延迟分布下拉框的选项
+DISTRIBUTION_LABELS = [
+    ('uniform', '均匀'),
+    ('gaussian', '正态'),
+    ('lognormal', '对数正态'),
+]
+
+# 运行状态面板的项目
+STATS_LABELS = [
+    ('loops', '循环'),
+    ('step', '步骤'),
+    ('rate', '事件/秒'),
+    ('error', '误差'),
+    ('dropped', '丢弃'),
+    ('elapsed', '时长'),
+    ('refresh', '刷新耗时'),
+]
+
+# 运行状态面板的刷新间隔（毫秒）
+STATS_INTERVAL = 250
+
 class ShortcutConfigDialog(QDialog):
     """快捷键配置对话框"""
     def __init__(self, parent=None):
@@ -80,6 +115,11 @@ class ShortcutConfigDialog(QDialog):
         self.accept()
 
 class MacroConfigWindow(QWidget):
+    # 录制快捷键在keyboard的钩子线程中触发，通过信号转到界面线程处理
+    record_hotkey_pressed = pyqtSignal()
+    # 宏文件热重载在监视线程中完成，通过信号回到界面线程刷新表格
+    macro_file_reloaded = pyqtSignal(str)
+
     def __init__(self, executor):
         super().__init__()
         self.executor = executor
@@ -88,14 +128,35 @@ class MacroConfigWindow(QWidget):
 
         layout = QVBoxLayout()
 
-        # 表格：配置步骤
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(["按键", "延迟(s)", "随机波动(s)", "操作"])
+        # 表格：配置步骤，数据保存在模型中，只绘制可见的行
+        self.step_model = StepTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.step_model)
+        self.delete_delegate = DeleteButtonDelegate(parent=self.table)
+        self.delete_delegate.delete_requested.connect(self.delete_step)
+        self.table.setItemDelegateForColumn(COLUMN_ACTION, self.delete_delegate)
         # 设置表格水平大小策略为Expanding，使其宽度能够达到100%父元素
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # 固定行高，避免大量步骤时逐行计算高度
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         layout.addWidget(self.table)
 
+        # 流式播放的JSONL宏文件或包含控制项的宏（MacroProgram），不加载到表格
+        self.stream_source = None
+        self.stream_label = QLabel()
+        self.stream_label.hide()
+        layout.addWidget(self.stream_label)
+
+        # 编辑时校验单元格，无效输入的错误显示在表格下方
+        self.step_error_label = QLabel()
+        self.step_error_label.setStyleSheet("color: red")
+        self.step_error_label.hide()
+        layout.addWidget(self.step_error_label)
+        self.step_model.dataChanged.connect(self.show_step_error)
+        self.step_model.modelReset.connect(self.show_step_error)
+        self.step_model.rowsRemoved.connect(self.show_step_error)
+
         # 控制循环参数
         loop_layout = QHBoxLayout()
         loop_layout.addWidget(QLabel("循环次数(0无限):"))
@@ -107,6 +168,19 @@ class MacroConfigWindow(QWidget):
         self.loop_time = QSpinBox()
         self.loop_time.setRange(0, 999999)
         loop_layout.addWidget(self.loop_time)
+
+        # 随机波动的分布与随机种子
+        loop_layout.addWidget(QLabel("延迟分布:"))
+        self.distribution_combo = QComboBox()
+        for name, label in DISTRIBUTION_LABELS:
+            self.distribution_combo.addItem(label, name)
+        loop_layout.addWidget(self.distribution_combo)
+        self.loaded_distribution = None  # 从配置加载的分布，保留其参数
+
+        loop_layout.addWidget(QLabel("随机种子:"))
+        self.seed_edit = QLineEdit()
+        self.seed_edit.setPlaceholderText("留空随机")
+        loop_layout.addWidget(self.seed_edit)
         layout.addLayout(loop_layout)
         
         # 添加鼠标连点复选框
@@ -127,10 +201,75 @@ class MacroConfigWindow(QWidget):
         self.game_mode_win32_checkbox.setChecked(False)  # 默认不启用
         self.game_mode_win32_checkbox.stateChanged.connect(self.toggle_game_mode_win32)
         mouse_layout.addWidget(self.game_mode_win32_checkbox)
+
+        # 添加扫描码模式复选框
+        self.game_mode_scancode_checkbox = QCheckBox("使用扫描码模式(DirectInput游戏)")
+        self.game_mode_scancode_checkbox.setChecked(False)  # 默认不启用
+        self.game_mode_scancode_checkbox.stateChanged.connect(self.toggle_game_mode_scancode)
+        mouse_layout.addWidget(self.game_mode_scancode_checkbox)
+
+        # 添加精确定时复选框
+        self.precise_timing_checkbox = QCheckBox("精确定时(无累积漂移)")
+        self.precise_timing_checkbox.setChecked(self.executor.precise_timing)
+        self.precise_timing_checkbox.stateChanged.connect(self.toggle_precise_timing)
+        mouse_layout.addWidget(self.precise_timing_checkbox)
+
+        # 监视最近加载或保存的宏文件，修改后在下一个循环边界替换正在运行的宏
+        self.macro_path = None
+        self.watcher = None
+        self.hot_reload_checkbox = QCheckBox("修改文件后自动重载")
+        self.hot_reload_checkbox.stateChanged.connect(self.update_watcher)
+        mouse_layout.addWidget(self.hot_reload_checkbox)
+        self.macro_file_reloaded.connect(self.load_config_file)
         
         # 添加到主布局
         layout.addLayout(mouse_layout)
 
+        # 连点参数：目标速度、按钮、间隔随机波动，以及实际达到的速度
+        click_layout = QHBoxLayout()
+        click_layout.addWidget(QLabel("连点速度(次/秒):"))
+        self.click_cps = QSpinBox()
+        self.click_cps.setRange(1, 1000)
+        self.click_cps.setValue(self.executor.click_cps)
+        click_layout.addWidget(self.click_cps)
+
+        click_layout.addWidget(QLabel("按钮:"))
+        self.click_button_combo = QComboBox()
+        for name, label in CLICK_BUTTON_LABELS:
+            self.click_button_combo.addItem(label, name)
+        click_layout.addWidget(self.click_button_combo)
+
+        click_layout.addWidget(QLabel("随机波动(%):"))
+        self.click_jitter = QSpinBox()
+        self.click_jitter.setRange(0, 90)
+        click_layout.addWidget(self.click_jitter)
+
+        self.click_rate_label = QLabel("实际: - 次/秒")
+        click_layout.addWidget(self.click_rate_label)
+        layout.addLayout(click_layout)
+
+        # 运行期间定时刷新实际连点速度
+        self.click_rate_timer = QTimer(self)
+        self.click_rate_timer.setInterval(500)
+        self.click_rate_timer.timeout.connect(self.update_click_rate)
+        self.click_rate_timer.start()
+
+        # 运行状态面板：定时读取执行器的统计，不加锁，不影响调度线程
+        stats_layout = QHBoxLayout()
+        self.stats_labels = {}
+        for name, text in STATS_LABELS:
+            label = QLabel(f"{text}: -")
+            stats_layout.addWidget(label)
+            self.stats_labels[name] = label
+        layout.addLayout(stats_layout)
+        self.stats_last = None  # 上次刷新时的 (时长, 事件数)，用于计算事件速度
+        self.stats_refreshes = 0  # 刷新次数
+        self.stats_refresh_time = 0.0  # 刷新累计耗时（秒）
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_INTERVAL)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start()
+
         # 按钮行
         btn_layout = QHBoxLayout()
         btn_add = QPushButton("添加步骤")
@@ -153,6 +292,19 @@ class MacroConfigWindow(QWidget):
         btn_stop.clicked.connect(self.stop_macro)
         btn_layout.addWidget(btn_stop)
         
+        self.record_btn = QPushButton("录制")
+        self.record_btn.clicked.connect(lambda: self.toggle_record(from_button=True))
+        btn_layout.addWidget(self.record_btn)
+
+        btn_layout.addWidget(QLabel("量化(ms):"))
+        self.record_quantum = QSpinBox()
+        self.record_quantum.setRange(0, 1000)
+        self.record_quantum.setToolTip("录制时把延迟对齐到该粒度，0为保持原始时间")
+        btn_layout.addWidget(self.record_quantum)
+        self.recorder = None
+        self.record_path = None
+        self.record_hotkey_pressed.connect(self.toggle_record)
+
         # 添加快捷键配置按钮
         btn_shortcut = QPushButton("配置快捷键")
         btn_shortcut.clicked.connect(self.show_shortcut_config)
@@ -166,91 +318,214 @@ class MacroConfigWindow(QWidget):
         self.update_button_texts()
 
     def save_config(self):
-        steps = []
+        if self.focus_step_error():
+            return
         try:
-            for row in range(self.table.rowCount()):
-                key = self.table.item(row, 0).text()
-                # 添加异常处理，确保能够正确转换为浮点数
-                try:
-                    delay_text = self.table.item(row, 1).text()
-                    delay = float(delay_text)
-                except ValueError:
-                    raise ValueError(f"第{row+1}行的延迟时间 '{delay_text}' 不是有效的数字")
-                
-                try:
-                    rand_text = self.table.item(row, 2).text()
-                    rand = float(rand_text)
-                except ValueError:
-                    raise ValueError(f"第{row+1}行的随机波动 '{rand_text}' 不是有效的数字")
-                
-                steps.append(Step(key, delay, rand))
+            steps = self.step_model.to_steps()
+            seed = self.get_seed()
         except ValueError as e:
             QMessageBox.critical(self, "输入错误", str(e))
             return
+        # 表格为空时保存已加载的控制流宏，保留重复块、跳转等控制项
+        program = self.stream_source if isinstance(self.stream_source, MacroProgram) and not steps else None
         
         # 创建配置字典，包含步骤和循环参数
         config = {
-            'steps': [step.to_dict() for step in steps],
+            'steps': program.entries if program is not None else [step.to_dict() for step in steps],
             'loop_count': self.loop_count.value(),
             'loop_time': self.loop_time.value(),
-            'mouse_click_double': self.executor.mouse_click_double
+            'mouse_click_double': self.executor.mouse_click_double,
+            'precise_timing': self.executor.precise_timing,
+            'click_cps': self.click_cps.value(),
+            'click_button': self.click_button_combo.currentData(),
+            'click_jitter': self.click_jitter.value() / 100,
+            'distribution': self.get_delay_distribution().to_dict(),
+            'seed': seed
         }
         
         # 显示文件对话框让用户选择保存位置
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "保存配置", "", "JSON Files (*.json);;All Files (*)")
+            self, "保存配置", "", f"JSON Files (*.json);;Macro Files (*{BINARY_SUFFIX} *{JSONL_SUFFIX});;All Files (*)")
         
-        if file_path:
+        if program is not None and file_path.lower().endswith((JSONL_SUFFIX, BINARY_SUFFIX)):
+            QMessageBox.critical(self, "保存失败", "包含控制项的宏只能保存为JSON格式")
+        elif file_path.lower().endswith((JSONL_SUFFIX, BINARY_SUFFIX)):
+            try:
+                if file_path.lower().endswith(JSONL_SUFFIX):
+                    # 逐行保存，只包含步骤与循环参数
+                    save_jsonl(file_path, steps, config['loop_count'], config['loop_time'])
+                else:
+                    # 保存为二进制宏文件，只包含步骤与循环参数，直接使用表格中已编译的时间轴
+                    save_binary(file_path, self.step_model.timeline(config['loop_count'],
+                                                                    config['loop_time']))
+            except ValueError as e:
+                # 组合键与按住时长不能保存为JSONL
+                QMessageBox.critical(self, "保存失败", str(e))
+                return
+            self.set_macro_path(file_path)
+            print(f"宏已保存到: {file_path}")
+        elif file_path:
             # 保存为JSON文件
             with open(file_path, "w", encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
+            self.set_macro_path(file_path)
             print(f"配置已保存到: {file_path}")
 
+    def set_macro_path(self, path):
+        """记录最近加载或保存的宏文件，启用热重载时改为监视该文件"""
+        if path != self.macro_path:
+            self.macro_path = path
+            self.update_watcher()
+
+    def update_watcher(self, *args):
+        """按复选框状态启动或停止对宏文件的监视"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.hot_reload_checkbox.isChecked() and self.macro_path:
+            path = self.macro_path
+            self.watcher = MacroFileWatcher(self.executor, path,
+                                            on_reload=lambda macro: self.macro_file_reloaded.emit(path))
+            self.watcher.start()
+
+    def show_step_error(self, *args):
+        """编辑后显示第一个无效单元格的错误，全部有效时隐藏"""
+        found = self.step_model.first_error()
+        if found is None:
+            self.step_error_label.hide()
+        else:
+            row, column, error = found
+            self.step_error_label.setText(f"第{row+1}行: {error}")
+            self.step_error_label.show()
+
+    def focus_step_error(self):
+        """存在无效单元格时选中并滚动到第一个，返回True"""
+        found = self.step_model.first_error()
+        if found is None:
+            return False
+        row, column, error = found
+        index = self.step_model.index(row, column)
+        self.table.setCurrentIndex(index)
+        self.table.scrollTo(index)
+        self.show_step_error()
+        return True
+
+    def set_stream_source(self, source):
+        """设置流式播放的宏来源或控制流宏，为None时恢复使用表格中的步骤"""
+        self.stream_source = source
+        if source is None:
+            self.stream_label.hide()
+        else:
+            if isinstance(source, MacroProgram):
+                text = f"控制流宏: {self.macro_path}，{len(source.timeline)}个按键步骤"
+            else:
+                text = f"流式播放: {source.path}"
+            self.stream_label.setText(f"{text}（添加步骤后改为执行表格）")
+            self.stream_label.show()
+
     def add_step(self):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        self.table.setItem(row, 0, QTableWidgetItem("a"))
-        self.table.setItem(row, 1, QTableWidgetItem("0.1"))
-        self.table.setItem(row, 2, QTableWidgetItem("0.1"))
-        
-        delete_btn = QPushButton("删除")
-        delete_btn.clicked.connect(self.create_delete_handler())
-        self.table.setCellWidget(row, 3, delete_btn)
-        
-    def create_delete_handler(self):
-        # 创建删除处理函数，获取按钮的当前行索引
-        return lambda: self.delete_step(self.get_button_row())
-        
-    def get_button_row(self):
-        # 获取触发事件的按钮所在的行
-        button = self.sender()
-        if button:
-            # 遍历表格查找按钮所在行
-            for row in range(self.table.rowCount()):
-                if self.table.cellWidget(row, 3) == button:
-                    return row
-        return -1
-        
+        self.set_stream_source(None)
+        row = self.step_model.append_row()
+        self.table.scrollTo(self.step_model.index(row, COLUMN_KEY))
+
     def delete_step(self, row):
+        # 行号由删除按钮的委托直接给出
         if row >= 0:
-            self.table.removeRow(row)
+            self.step_model.removeRow(row)
             
     def toggle_mouse_click(self, state):
         self.executor.mouse_click_double = (state == Qt.CheckState.Checked.value)
         
+    def get_seed(self):
+        """读取随机种子，留空时返回None"""
+        text = self.seed_edit.text().strip()
+        if not text:
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            raise ValueError(f"随机种子 '{text}' 不是有效的整数")
+
+    def get_delay_distribution(self):
+        """根据下拉框创建当前选择的延迟分布"""
+        name = self.distribution_combo.currentData()
+        if self.loaded_distribution is not None and self.loaded_distribution.name == name:
+            return self.loaded_distribution
+        return create_distribution({'type': name})
+
+    def set_delay_distribution(self, distribution):
+        """在下拉框中选中指定的延迟分布"""
+        self.loaded_distribution = distribution
+        if distribution.name == EmpiricalDelay.name:
+            if self.distribution_combo.findData(EmpiricalDelay.name) < 0:
+                self.distribution_combo.addItem("经验", EmpiricalDelay.name)
+        self.distribution_combo.setCurrentIndex(self.distribution_combo.findData(distribution.name))
+
+    def update_click_rate(self):
+        """刷新实际达到的连点速度"""
+        if self.executor.click_stream is None:
+            self.click_rate_label.setText("实际: - 次/秒")
+        else:
+            self.click_rate_label.setText(f"实际: {self.executor.achieved_cps():.1f} 次/秒")
+
+    def update_stats(self):
+        """刷新运行状态面板，并统计每次刷新的耗时"""
+        refresh_start = time.perf_counter()
+        stats = self.executor.live_stats()
+        if stats is None:
+            return
+        # 运行结束后只刷新一次最终结果
+        if not stats['running'] and self.stats_last is not None and self.stats_last[0] == stats['elapsed']:
+            return
+        labels = self.stats_labels
+        loop_count = f"/{stats['loop_count']}" if stats['loop_count'] else ""
+        labels['loops'].setText(f"循环: {stats['loops']}{loop_count}")
+        steps = f"/{stats['steps']}" if stats['steps'] else ""
+        labels['step'].setText(f"步骤: {stats['step']}{steps}")
+        last = self.stats_last
+        if stats['running'] and last is not None and stats['elapsed'] > last[0] >= 0 and stats['events'] >= last[1]:
+            # 运行中显示两次刷新之间的速度
+            rate = (stats['events'] - last[1]) / (stats['elapsed'] - last[0])
+        else:
+            rate = stats['events'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        self.stats_last = (stats['elapsed'], stats['events'])
+        labels['rate'].setText(f"事件/秒: {rate:.1f}")
+        labels['error'].setText(f"误差: {stats['error'] * 1000:.2f}ms (抖动{stats['jitter'] * 1000:.2f}ms)")
+        labels['dropped'].setText(f"丢弃: {stats['dropped']}")
+        loop_time = f"/{stats['loop_time']}s" if stats['loop_time'] else "s"
+        labels['elapsed'].setText(f"时长: {stats['elapsed']:.1f}{loop_time}")
+        self.stats_refreshes += 1
+        self.stats_refresh_time += time.perf_counter() - refresh_start
+        labels['refresh'].setText(
+            f"刷新耗时: {self.stats_refresh_time / self.stats_refreshes * 1e6:.0f}us")
+
+    def toggle_precise_timing(self, state):
+        """切换精确定时模式"""
+        self.executor.set_precise_timing(state == Qt.CheckState.Checked.value)
+
     def toggle_game_mode_directinput(self, state):
         """切换SendInput游戏模式"""
         self.executor.set_game_mode_directinput(state == Qt.CheckState.Checked.value)
-        # 如果启用了pydirectinput模式，自动取消勾选win32模式
+        # 如果启用了pydirectinput模式，自动取消勾选其它模式
         if state == Qt.CheckState.Checked.value:
             self.game_mode_win32_checkbox.setChecked(False)
+            self.game_mode_scancode_checkbox.setChecked(False)
             
     def toggle_game_mode_win32(self, state):
         """切换pywin32游戏模式"""
         self.executor.set_game_mode_win32(state == Qt.CheckState.Checked.value)
-        # 如果启用了win32模式，自动取消勾选pydirectinput模式
+        # 如果启用了win32模式，自动取消勾选其它模式
+        if state == Qt.CheckState.Checked.value:
+            self.game_mode_directinput_checkbox.setChecked(False)
+            self.game_mode_scancode_checkbox.setChecked(False)
+
+    def toggle_game_mode_scancode(self, state):
+        """切换SendInput扫描码模式"""
+        self.executor.set_game_mode_scancode(state == Qt.CheckState.Checked.value)
+        # 如果启用了扫描码模式，自动取消勾选其它模式
         if state == Qt.CheckState.Checked.value:
             self.game_mode_directinput_checkbox.setChecked(False)
+            self.game_mode_win32_checkbox.setChecked(False)
 
     def start_macro(self):
         start_key = config.get_key_by_title("启动/暂停")
@@ -273,64 +548,133 @@ class MacroConfigWindow(QWidget):
             self.executor.pause()
             return
         elif not self.executor.running:
+            # 表格在编辑时已校验，存在无效单元格时定位到该单元格，不启动
+            if self.focus_step_error():
+                return
             print('启动执行')
-            if start_key:
-                self.start_btn.setText(f"暂停 {start_key}")
-            else:
-                self.start_btn.setText("暂停")
 
-        steps = []
         try:
-            for row in range(self.table.rowCount()):
-                key = self.table.item(row, 0).text()
-                # 添加异常处理，确保能够正确转换为浮点数
-                try:
-                    delay_text = self.table.item(row, 1).text()
-                    delay = float(delay_text)
-                except ValueError:
-                    raise ValueError(f"第{row+1}行的延迟时间 '{delay_text}' 不是有效的数字")
-                
-                try:
-                    rand_text = self.table.item(row, 2).text()
-                    rand = float(rand_text)
-                except ValueError:
-                    raise ValueError(f"第{row+1}行的随机波动 '{rand_text}' 不是有效的数字")
-                
-                steps.append(Step(key, delay, rand))
+            seed = self.get_seed()
         except ValueError as e:
             QMessageBox.critical(self, "输入错误", str(e))
             return
-        self.executor.load_steps(steps,
-                                 loop_count=self.loop_count.value(),
-                                 loop_time=self.loop_time.value())
-        self.executor.start()
+        self.executor.set_delay_distribution(self.get_delay_distribution(), seed)
+        self.executor.set_clicker(self.click_cps.value(),
+                                  self.click_button_combo.currentData(),
+                                  self.click_jitter.value() / 100)
+        try:
+            # 表格中的步骤已在编辑时编译，这里只复制时间轴；当前模式不支持的按键由 start 校验
+            if isinstance(self.stream_source, MacroProgram) and not self.step_model.rowCount():
+                self.executor.load_program(self.stream_source,
+                                           loop_count=self.loop_count.value(),
+                                           loop_time=self.loop_time.value())
+            elif self.stream_source is not None and not self.step_model.rowCount():
+                self.executor.load_source(self.stream_source,
+                                          loop_count=self.loop_count.value(),
+                                          loop_time=self.loop_time.value())
+            else:
+                self.executor.load_timeline(self.step_model.timeline(self.loop_count.value(),
+                                                                     self.loop_time.value()))
+        except ValueError as e:
+            QMessageBox.critical(self, "按键错误", str(e))
+            return
+        if not self.executor.start():
+            if self.executor.start_error is not None:
+                QMessageBox.critical(self, "启动失败", str(self.executor.start_error))
+            return
+        # 启动成功后才切换按钮文案
+        if start_key:
+            self.start_btn.setText(f"暂停 {start_key}")
+        else:
+            self.start_btn.setText("暂停")
+
+    def toggle_record(self, from_button=False):
+        """开始或停止录制，停止后把录制结果加载到表格"""
+        if self.recorder is not None and self.recorder.recording:
+            # 通过界面按钮停止时，最后一次按下是点击停止按钮本身
+            self.recorder.stop(drop_last=from_button)
+            self.record_btn.setText(self.record_button_text("录制"))
+            self.load_config_file(self.record_path)
+            return
+        if self.executor.running:
+            QMessageBox.warning(self, "警告", "请先停止正在执行的宏")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "保存录制", "", "JSON Files (*.json);;All Files (*)")
+        if not file_path:
+            return
+        # 停止录制时按下的快捷键组合不计入宏，录制中单独按下其中的按键仍会录制
+        record_key = config.get_key_by_title("录制")
+        self.record_path = file_path
+        try:
+            self.recorder = MacroRecorder(quantum=self.record_quantum.value() / 1000,
+                                          stop_hotkey=record_key)
+            self.recorder.start(file_path,
+                                loop_count=self.loop_count.value(),
+                                loop_time=self.loop_time.value())
+        except Exception as e:
+            QMessageBox.critical(self, "录制失败", str(e))
+            return
+        self.record_btn.setText(self.record_button_text("停止录制"))
+
+    def record_button_text(self, text):
+        """录制按钮的文本，附带当前配置的快捷键"""
+        record_key = config.get_key_by_title("录制")
+        return f"{text} {record_key}" if record_key else text
 
     def load_config(self):
         # 显示文件对话框让用户选择要加载的文件
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "加载配置", "", "JSON Files (*.json);;All Files (*)")
+            self, "加载配置", "", f"Macro Files (*.json *{BINARY_SUFFIX} *{JSONL_SUFFIX});;All Files (*)")
         
         if file_path:
+            self.load_config_file(file_path)
+
+    def load_config_file(self, file_path):
+        """从JSON或二进制宏文件加载配置到界面"""
+        if file_path and file_path.lower().endswith(JSONL_SUFFIX):
+            # JSONL宏文件不加载到表格，执行时流式读取，内存占用与宏长度无关
             try:
-                # 从JSON文件加载配置
-                with open(file_path, "r", encoding='utf-8') as f:
-                    config = json.load(f)
-                
-                # 清空现有表格内容
-                self.table.setRowCount(0)
-                
-                # 加载步骤
-                if 'steps' in config:
-                    for step_data in config['steps']:
-                        row = self.table.rowCount()
-                        self.table.insertRow(row)
-                        self.table.setItem(row, 0, QTableWidgetItem(step_data['key']))
-                        self.table.setItem(row, 1, QTableWidgetItem(str(step_data['delay'])))
-                        self.table.setItem(row, 2, QTableWidgetItem(str(step_data.get('random_offset', 0.1))))
-                        
-                        delete_btn = QPushButton("删除")
-                        delete_btn.clicked.connect(self.create_delete_handler())
-                        self.table.setCellWidget(row, 3, delete_btn)
+                source = JsonlSource(file_path)
+            except (OSError, ValueError) as e:
+                print(f"加载配置失败: {str(e)}")
+                return
+            self.step_model.clear()
+            self.loop_count.setValue(source.loop_count)
+            self.loop_time.setValue(int(source.loop_time))
+            self.set_stream_source(source)
+            self.set_macro_path(file_path)
+            print(f"流式宏已从: {file_path} 加载")
+            return
+        if file_path:
+            self.set_stream_source(None)
+            program = None
+            try:
+                if is_binary(file_path):
+                    # 二进制宏文件只包含步骤与循环参数
+                    timeline = load_binary(file_path)
+                    config = {
+                        'loop_count': timeline.loop_count,
+                        'loop_time': int(timeline.loop_time),
+                    }
+                    rows = ((step.key, step.delay, step.random_offset, step.hold)
+                            for step in timeline.to_steps())
+                else:
+                    # 从JSON文件加载配置
+                    with open(file_path, "r", encoding='utf-8') as f:
+                        config = json.load(f)
+                    entries = config.get('steps', [])
+                    if has_control_flow(entries):
+                        # 包含重复块、跳转等控制项的宏不展开到表格，编译后直接执行
+                        program = compile_program(entries, config.get('loop_count', 0),
+                                                  config.get('loop_time', 0))
+                        entries = []
+                    rows = ((step_data['key'], step_data['delay'], step_data.get('random_offset', 0.1),
+                             step_data.get('hold', 0))
+                            for step_data in entries)
+
+                # 加载步骤，一次性替换表格内容
+                self.step_model.set_rows(rows)
                 
                 # 加载循环参数
                 if 'loop_count' in config:
@@ -342,7 +686,31 @@ class MacroConfigWindow(QWidget):
                 if 'mouse_click_double' in config:
                     self.mouse_click_checkbox.setChecked(config['mouse_click_double'])
                     self.executor.mouse_click_double = config['mouse_click_double']
-                
+
+                # 加载精确定时设置
+                if 'precise_timing' in config:
+                    self.precise_timing_checkbox.setChecked(config['precise_timing'])
+
+                # 加载连点参数
+                if 'click_cps' in config:
+                    self.click_cps.setValue(int(config['click_cps']))
+                if 'click_button' in config:
+                    self.click_button_combo.setCurrentIndex(
+                        max(0, self.click_button_combo.findData(config['click_button'])))
+                if 'click_jitter' in config:
+                    self.click_jitter.setValue(round(config['click_jitter'] * 100))
+
+                # 加载延迟分布与随机种子
+                if 'distribution' in config:
+                    self.set_delay_distribution(create_distribution(config['distribution']))
+                if config.get('seed') is not None:
+                    self.seed_edit.setText(str(config['seed']))
+                else:
+                    self.seed_edit.clear()
+
+                self.set_macro_path(file_path)
+                if program is not None:
+                    self.set_stream_source(program)
                 print(f"配置已从: {file_path} 加载")
             except Exception as e:
                 print(f"加载配置失败: {str(e)}")
@@ -352,6 +720,8 @@ class MacroConfigWindow(QWidget):
         start_key = config.get_key_by_title("启动/暂停")
         stop_key = config.get_key_by_title("停止")
         
+        if not (self.recorder is not None and self.recorder.recording):
+            self.record_btn.setText(self.record_button_text("录制"))
         if start_key:
             self.start_btn.setText(f"启动 {start_key}")
         if stop_key:
@@ -0,0 +1,92 @@
+"""
+宏文件热重载
+后台线程轮询宏文件的修改时间与大小，变化后在该线程中解析、编译并校验新内容，
+交给执行器在下一个循环边界替换，执行器线程不停止、计时与循环计数不重置
+"""
+import os
+import threading
+from module.MacroFile import JSONL_SUFFIX, JsonlSource, load_macro
+
+# 默认的轮询间隔（秒）
+POLL_INTERVAL = 0.25
+
+
+class MacroFileWatcher:
+    """监视宏文件，修改后重新加载到执行器
+
+    文件写到一半时可能解析失败，此时保留原来的宏，等待下一次修改再重试
+    """
+
+    def __init__(self, executor, path, interval=POLL_INTERVAL, on_reload=None):
+        self.executor = executor
+        self.path = path
+        self.interval = interval
+        self.on_reload = on_reload  # 加载成功后在监视线程中调用 on_reload(新的宏)
+        self.reloads = 0            # 成功加载的次数
+        self.errors = 0             # 解析或校验失败的次数
+        self.last_error = None
+        self.thread = None
+        self._stop = threading.Event()
+        self._signature = self._stat()
+
+    def _stat(self):
+        """文件的 (修改时间, 大小)，文件不存在时返回None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self._signature = self._stat()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """检查一次文件是否变化，变化时重新加载，返回是否加载成功"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        return self.reload()
+
+    def _load(self):
+        """解析并编译宏文件；流式宏先完整读一遍，确认每一行都有效"""
+        if str(self.path).lower().endswith(JSONL_SUFFIX):
+            for _ in JsonlSource(self.path):
+                pass
+            return JsonlSource(self.path)
+        return load_macro(self.path)
+
+    def reload(self):
+        """立即重新加载文件并交给执行器，返回是否成功"""
+        clock = self.executor.clock
+        detected = clock()
+        try:
+            macro = self._load()
+            compiled = clock()
+            self.executor.reload_macro(macro, detected, compiled)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            self.last_error = e
+            print(f"[reload] 重新加载失败，继续使用原来的宏: {e}")
+            return False
+        self.reloads += 1
+        self.last_error = None
+        print(f"[reload] 已重新加载: {self.path}（解析{(compiled - detected) * 1000:.1f}ms）")
+        if self.on_reload is not None:
+            self.on_reload(macro)
+        return True
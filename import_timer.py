@@ -0,0 +1,71 @@
+"""
+启动耗时统计
+在启动期间替换内置的 __import__，记录每个模块首次导入的累计耗时（含其依赖）与自身耗时，
+用于跟踪冷启动时间，找出拖慢启动的依赖库
+"""
+import builtins
+import sys
+import time
+
+
+class ImportTimer:
+    """导入耗时计时器，作为上下文管理器使用，只统计其间首次导入的模块
+
+    records 中每项为 (模块名, 嵌套深度, 累计耗时, 自身耗时)，单位秒，按导入开始的顺序排列
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.records = []
+        self.start_time = 0.0
+        self.end_time = 0.0
+        self._children = []  # 正在导入的各层模块中，其依赖已用去的时间
+        self._original_import = None
+
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        self.start_time = self.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time = self.clock()
+        builtins.__import__ = self._original_import
+        return False
+
+    @property
+    def total(self):
+        """计时期间的总耗时（秒）"""
+        return self.end_time - self.start_time
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 相对导入与已加载的模块直接交给原始的 __import__
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = len(self._children)
+        self._children.append(0.0)
+        # 先占位，使记录按导入开始的顺序排列，依赖排在导入它的模块之后
+        index = len(self.records)
+        self.records.append((name, depth, 0.0, 0.0))
+        start = self.clock()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = self.clock() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            self.records[index] = (name, depth, elapsed, elapsed - children)
+
+    def report(self, max_depth=1, top=10):
+        """生成耗时报告：按导入顺序列出前 max_depth 层模块，并列出自身耗时最多的 top 个模块"""
+        lines = [f"启动导入耗时: 共{self.total * 1000:.1f}ms",
+                 f"{'累计(ms)':>10}{'自身(ms)':>10}  模块"]
+        for name, depth, elapsed, own in self.records:
+            if depth < max_depth:
+                lines.append(f"{elapsed * 1000:10.1f}{own * 1000:10.1f}  {'  ' * depth}{name}")
+        slowest = sorted(self.records, key=lambda r: r[3], reverse=True)[:top]
+        lines.append(f"自身耗时最多的{len(slowest)}个模块:")
+        for name, depth, elapsed, own in slowest:
+            lines.append(f"{elapsed * 1000:10.1f}{own * 1000:10.1f}  {name}")
+        return "\n".join(lines)
@@ -0,0 +1,233 @@
+"""
+输入后端模块
+统一pyautogui、pydirectinput、pywin32、SendInput等按键模拟方式的接口，
+执行器启动时绑定一个后端，执行过程中不再逐事件判断模式。
+各后端及其依赖库（含ctypes）在首次创建时才导入，不影响程序的启动速度。
+另提供记录后端与空后端，便于在没有Windows的环境下测量执行器的吞吐与定时
+"""
+import time
+from collections import namedtuple
+from key_table import PYAUTOGUI_NAMES
+
+# 批量发送的结果：accepted为系统实际接收的事件数，submitted为提交的事件数
+SendResult = namedtuple('SendResult', ['accepted', 'submitted'])
+
+# 批量事件类型
+EVENT_PRESS = 0    # 按下并释放按键
+EVENT_HOLD = 1     # 按住按键
+EVENT_RELEASE = 2  # 释放按键
+EVENT_CLICK = 3    # 鼠标点击，参数为鼠标按钮
+
+# 后端名称
+BACKEND_PYAUTOGUI = 'pyautogui'
+BACKEND_DIRECTINPUT = 'directinput'
+BACKEND_WIN32 = 'win32'
+BACKEND_SENDINPUT = 'sendinput'
+BACKEND_SCANCODE = 'scancode'
+BACKEND_RECORDING = 'recording'
+BACKEND_NULL = 'null'
+
+
+class InputBackend:
+    """输入后端协议
+    press/hold/release 接收由统一按键表解析得到的虚拟键码，click 接收鼠标按钮名，
+    batch 接收 (事件类型, 参数) 列表，返回 SendResult(accepted, submitted)。
+    blocking 为真的后端在调用中会睡眠（如按键间的固定延迟），asyncio引擎在单独的线程中调用
+    """
+    name = None
+    blocking = False
+
+    def supports(self, vk):
+        """是否支持指定的虚拟键码，用于启动前校验宏"""
+        return True
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def hold(self, key):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def click(self, button='left'):
+        raise NotImplementedError
+
+    def batch(self, events):
+        """逐个执行批量事件，支持一次性注入的后端应覆盖此方法"""
+        handlers = (self.press, self.hold, self.release, self.click)
+        for event_type, arg in events:
+            handlers[event_type](arg)
+        return SendResult(len(events), len(events))
+
+
+class PyAutoGUIBackend(InputBackend):
+    """基于pyautogui的后端"""
+    name = BACKEND_PYAUTOGUI
+    blocking = True  # pyautogui 每次调用后暂停 PAUSE 秒
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def supports(self, vk):
+        return PYAUTOGUI_NAMES[vk] in self._pyautogui.KEYBOARD_KEYS
+
+    def press(self, key):
+        self._pyautogui.press(PYAUTOGUI_NAMES[key])
+
+    def hold(self, key):
+        self._pyautogui.keyDown(PYAUTOGUI_NAMES[key])
+
+    def release(self, key):
+        self._pyautogui.keyUp(PYAUTOGUI_NAMES[key])
+
+    def click(self, button='left'):
+        self._pyautogui.click(button=button)
+
+
+class DirectInputBackend(InputBackend):
+    """基于pydirectinput的后端"""
+    name = BACKEND_DIRECTINPUT
+    blocking = True
+
+    def __init__(self):
+        import pydirectinput
+        from game_input_pydirectinput import GameDirectInput
+        self._keyboard_mapping = pydirectinput.KEYBOARD_MAPPING
+        self.game_input = GameDirectInput()
+        self.press = self.game_input.press_key
+        self.hold = self.game_input.hold_key
+        self.release = self.game_input.release_key
+
+    def supports(self, vk):
+        return PYAUTOGUI_NAMES[vk] in self._keyboard_mapping
+
+    def click(self, button='left'):
+        self.game_input.click(button=button)
+
+
+class Win32Backend(InputBackend):
+    """基于pywin32的后端"""
+    name = BACKEND_WIN32
+    blocking = True  # 按下与释放之间、按键之后各睡眠10ms
+
+    def __init__(self):
+        from game_input_win32 import GameWin32Input
+        self.game_input = GameWin32Input()
+        self.press = self.game_input.press_key
+        self.hold = self.game_input.hold_key
+        self.release = self.game_input.release_key
+
+    def click(self, button='left'):
+        self.game_input.click(button=button)
+
+
+class SendInputBackend(InputBackend):
+    """基于SendInput的后端，批量事件一次性注入"""
+    name = BACKEND_SENDINPUT
+    scan_code = False
+
+    def __init__(self, settle_delay=0, user32=None):
+        from game_input_sendinput import GameSendInput
+        self.game_input = GameSendInput(settle_delay=settle_delay, user32=user32,
+                                        scan_code=self.scan_code)
+        self.blocking = settle_delay > 0
+        self.press = self.game_input.press_key
+        self.hold = self.game_input.hold_key
+        self.release = self.game_input.release_key
+
+    def click(self, button='left'):
+        self.game_input.click(button=button)
+
+    def batch(self, events):
+        batch = self.game_input.batch()
+        # 无法识别的按键或按钮抛出ValueError，整批都不发送，避免只注入一半的组合键
+        for event_type, arg in events:
+            if event_type == EVENT_PRESS:
+                batch.press_key(arg)
+            elif event_type == EVENT_HOLD:
+                batch.key_down(arg)
+            elif event_type == EVENT_RELEASE:
+                batch.key_up(arg)
+            else:
+                batch.click(button=arg)
+        return self.game_input.send_batch(batch)
+
+
+class ScanCodeBackend(SendInputBackend):
+    """以扫描码发送按键的SendInput后端，兼容只读取扫描码的DirectInput游戏"""
+    name = BACKEND_SCANCODE
+    scan_code = True
+
+
+class RecordingBackend(InputBackend):
+    """在内存中记录全部事件的后端，events 中每项为 (时间, 事件类型, 参数)"""
+    name = BACKEND_RECORDING
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.events = []
+
+    def press(self, key):
+        self.events.append((self.clock(), EVENT_PRESS, key))
+
+    def hold(self, key):
+        self.events.append((self.clock(), EVENT_HOLD, key))
+
+    def release(self, key):
+        self.events.append((self.clock(), EVENT_RELEASE, key))
+
+    def click(self, button='left'):
+        self.events.append((self.clock(), EVENT_CLICK, button))
+
+    def batch(self, events):
+        now = self.clock()
+        self.events.extend((now, event_type, arg) for event_type, arg in events)
+        return SendResult(len(events), len(events))
+
+    def clear(self):
+        """清空已记录的事件"""
+        self.events.clear()
+
+
+class NullBackend(InputBackend):
+    """丢弃所有事件的后端，只统计事件数，用于测量执行器自身的开销"""
+    name = BACKEND_NULL
+
+    def __init__(self):
+        self.count = 0
+
+    def press(self, key):
+        self.count += 1
+
+    def hold(self, key):
+        self.count += 1
+
+    def release(self, key):
+        self.count += 1
+
+    def click(self, button='left'):
+        self.count += 1
+
+    def batch(self, events):
+        self.count += len(events)
+        return SendResult(len(events), len(events))
+
+
+BACKENDS = {
+    BACKEND_PYAUTOGUI: PyAutoGUIBackend,
+    BACKEND_DIRECTINPUT: DirectInputBackend,
+    BACKEND_WIN32: Win32Backend,
+    BACKEND_SENDINPUT: SendInputBackend,
+    BACKEND_SCANCODE: ScanCodeBackend,
+    BACKEND_RECORDING: RecordingBackend,
+    BACKEND_NULL: NullBackend,
+}
+
+
+def create_backend(name):
+    """按名称创建后端，对应的依赖库在此时才导入"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的输入后端: {name}")
+    return BACKENDS[name]()
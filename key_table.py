@@ -0,0 +1,241 @@
+"""
+统一按键表
+合并各输入后端的按键名映射，宏加载时一次性把按键名解析为虚拟键码，
+执行时各后端只按整数下标查表，无法识别的按键在启动前即被拒绝
+"""
+
+# 按键名 -> 虚拟键码
+VK_CODE = {
+    'backspace': 0x08, 'tab': 0x09, 'clear': 0x0C, 'enter': 0x0D,
+    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13, 'caps_lock': 0x14,
+    'esc': 0x1B, 'space': 0x20, 'page_up': 0x21, 'page_down': 0x22,
+    'end': 0x23, 'home': 0x24, 'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'select': 0x29, 'print': 0x2A, 'execute': 0x2B, 'print_screen': 0x2C,
+    'insert': 0x2D, 'delete': 0x2E, 'help': 0x2F,
+    '0': 0x30, '1': 0x31, '2': 0x32, '3': 0x33, '4': 0x34,
+    '5': 0x35, '6': 0x36, '7': 0x37, '8': 0x38, '9': 0x39,
+    'a': 0x41, 'b': 0x42, 'c': 0x43, 'd': 0x44, 'e': 0x45, 'f': 0x46, 'g': 0x47, 'h': 0x48,
+    'i': 0x49, 'j': 0x4A, 'k': 0x4B, 'l': 0x4C, 'm': 0x4D, 'n': 0x4E, 'o': 0x4F, 'p': 0x50,
+    'q': 0x51, 'r': 0x52, 's': 0x53, 't': 0x54, 'u': 0x55, 'v': 0x56, 'w': 0x57, 'x': 0x58,
+    'y': 0x59, 'z': 0x5A,
+    'lwin': 0x5B, 'rwin': 0x5C, 'apps': 0x5D,
+    'numpad0': 0x60, 'numpad1': 0x61, 'numpad2': 0x62, 'numpad3': 0x63,
+    'numpad4': 0x64, 'numpad5': 0x65, 'numpad6': 0x66, 'numpad7': 0x67,
+    'numpad8': 0x68, 'numpad9': 0x69, 'multiply': 0x6A, 'add': 0x6B,
+    'separator': 0x6C, 'subtract': 0x6D, 'decimal': 0x6E, 'divide': 0x6F,
+    'f1': 0x70, 'f2': 0x71, 'f3': 0x72, 'f4': 0x73, 'f5': 0x74, 'f6': 0x75,
+    'f7': 0x76, 'f8': 0x77, 'f9': 0x78, 'f10': 0x79, 'f11': 0x7A, 'f12': 0x7B,
+    'f13': 0x7C, 'f14': 0x7D, 'f15': 0x7E, 'f16': 0x7F, 'f17': 0x80, 'f18': 0x81,
+    'f19': 0x82, 'f20': 0x83, 'f21': 0x84, 'f22': 0x85, 'f23': 0x86, 'f24': 0x87,
+    'num_lock': 0x90, 'scroll_lock': 0x91,
+    'lshift': 0xA0, 'rshift': 0xA1,
+    'lcontrol': 0xA2, 'rcontrol': 0xA3,
+    'lmenu': 0xA4, 'rmenu': 0xA5,
+    'browser_back': 0xA6, 'browser_forward': 0xA7,
+    'browser_refresh': 0xA8, 'browser_stop': 0xA9,
+    'browser_search': 0xAA, 'browser_favorites': 0xAB,
+    'browser_home': 0xAC,
+    'volume_mute': 0xAD, 'volume_down': 0xAE, 'volume_up': 0xAF,
+    'media_next_track': 0xB0, 'media_prev_track': 0xB1,
+    'media_stop': 0xB2, 'media_play_pause': 0xB3,
+    'launch_mail': 0xB4, 'launch_media_select': 0xB5,
+    'launch_app1': 0xB6, 'launch_app2': 0xB7,
+    ';': 0xBA, '=': 0xBB, ',': 0xBC, '-': 0xBD, '.': 0xBE, '/': 0xBF, '`': 0xC0,
+    '[': 0xDB, '\\': 0xDC, ']': 0xDD, "'": 0xDE,
+    # 鼠标按钮，宏中以按键的形式出现，执行时转为鼠标点击
+    'mouse_left': 0x01, 'mouse_right': 0x02, 'mouse_middle': 0x04,
+}
+
+# 需要按住Shift输入的符号 -> 同一按键不按Shift时的字符（美式键盘布局），大写字母同理对应小写字母
+SHIFTED_SYMBOLS = {
+    '~': '`', '!': '1', '@': '2', '#': '3', '$': '4', '%': '5', '^': '6', '&': '7', '*': '8',
+    '(': '9', ')': '0', '_': '-', '+': '=', '{': '[', '}': ']', '|': '\\', ':': ';', '"': "'",
+    '<': ',', '>': '.', '?': '/',
+}
+
+# 鼠标按钮的虚拟键码 -> 鼠标按钮名
+MOUSE_BUTTONS = {0x01: 'left', 0x02: 'right', 0x04: 'middle'}
+
+# 其它常见写法 -> 标准按键名
+KEY_ALIASES = {
+    'escape': 'esc', 'return': 'enter', 'control': 'ctrl', 'menu': 'alt', ' ': 'space',
+    'del': 'delete', 'ins': 'insert', 'pageup': 'page_up', 'pagedown': 'page_down',
+    'pgup': 'page_up', 'pgdn': 'page_down', 'capslock': 'caps_lock', 'numlock': 'num_lock',
+    'scrolllock': 'scroll_lock', 'printscreen': 'print_screen', 'prtsc': 'print_screen',
+    'win': 'lwin', 'winleft': 'lwin', 'winright': 'rwin',
+    'shiftleft': 'lshift', 'shiftright': 'rshift', 'left shift': 'lshift', 'right shift': 'rshift',
+    'ctrlleft': 'lcontrol', 'ctrlright': 'rcontrol', 'lctrl': 'lcontrol', 'rctrl': 'rcontrol',
+    'altleft': 'lmenu', 'altright': 'rmenu', 'lalt': 'lmenu', 'ralt': 'rmenu',
+    'num0': 'numpad0', 'num1': 'numpad1', 'num2': 'numpad2', 'num3': 'numpad3',
+    'num4': 'numpad4', 'num5': 'numpad5', 'num6': 'numpad6', 'num7': 'numpad7',
+    'num8': 'numpad8', 'num9': 'numpad9',
+    'volumemute': 'volume_mute', 'volumedown': 'volume_down', 'volumeup': 'volume_up',
+    'nexttrack': 'media_next_track', 'prevtrack': 'media_prev_track',
+    'playpause': 'media_play_pause',
+    # keyboard库钩子给出的按键名
+    'page up': 'page_up', 'page down': 'page_down', 'caps lock': 'caps_lock',
+    'num lock': 'num_lock', 'scroll lock': 'scroll_lock', 'print screen': 'print_screen',
+    'left windows': 'lwin', 'right windows': 'rwin', 'windows': 'lwin',
+    'left ctrl': 'lcontrol', 'right ctrl': 'rcontrol', 'left alt': 'lmenu', 'right alt': 'rmenu',
+    'alt gr': 'rmenu', 'play/pause media': 'media_play_pause', 'next track': 'media_next_track',
+    'previous track': 'media_prev_track', 'volume up': 'volume_up', 'volume down': 'volume_down',
+}
+
+# pyautogui/pydirectinput 使用的按键名与标准名不同的部分
+_PYAUTOGUI_RENAMES = {
+    'page_up': 'pageup', 'page_down': 'pagedown', 'caps_lock': 'capslock',
+    'num_lock': 'numlock', 'scroll_lock': 'scrolllock', 'print_screen': 'printscreen',
+    'lwin': 'winleft', 'rwin': 'winright',
+    'lshift': 'shiftleft', 'rshift': 'shiftright',
+    'lcontrol': 'ctrlleft', 'rcontrol': 'ctrlright',
+    'lmenu': 'altleft', 'rmenu': 'altright',
+    'media_next_track': 'nexttrack', 'media_prev_track': 'prevtrack',
+    'media_stop': 'stop', 'media_play_pause': 'playpause',
+}
+
+
+def _build_name_table():
+    """虚拟键码 -> pyautogui/pydirectinput 按键名，按键码下标直接查表"""
+    names = [None] * 256
+    for name, vk in VK_CODE.items():
+        if vk in MOUSE_BUTTONS:
+            continue
+        if name.startswith('numpad'):
+            alias = 'num' + name[len('numpad'):]
+        else:
+            alias = _PYAUTOGUI_RENAMES.get(name, name.replace('_', ''))
+        names[vk] = alias
+    return tuple(names)
+
+
+# 虚拟键码 -> pyautogui/pydirectinput 按键名
+PYAUTOGUI_NAMES = _build_name_table()
+
+
+def _shifted_base(key):
+    """大写字母与需要Shift输入的符号返回不按Shift时的按键名，其余返回None"""
+    if len(key) != 1:
+        return None
+    if 'A' <= key <= 'Z':
+        return key.lower()
+    return SHIFTED_SYMBOLS.get(key)
+
+
+def resolve_key(key):
+    """将按键名解析为单个虚拟键码，无法识别时抛出ValueError
+    多字符的按键名不区分大小写；大写字母与需要Shift的符号不是单个按键，同样抛出ValueError，
+    由 resolve_chord 解析为与Shift的组合键
+    """
+    if isinstance(key, int):
+        if 0 < key < 256:
+            return key
+        raise ValueError(f"无效的虚拟键码: {key}")
+    base = _shifted_base(key)
+    if base is not None:
+        raise ValueError(f"按键 '{key}' 需要按住Shift，只能作为组合键 shift+{base} 发送")
+    name = key.strip().lower() if len(key) > 1 else key
+    name = KEY_ALIASES.get(name, name)
+    vk = VK_CODE.get(name)
+    if vk is None:
+        raise ValueError(f"无法识别的按键: '{key}'")
+    return vk
+
+
+def resolve_chord(key):
+    """将按键或以+连接的组合键（如 ctrl+shift+e）解析为虚拟键码元组，按下的顺序与书写顺序一致
+    大写字母与需要Shift的符号（如 A、!、+）解析为与Shift的组合键，与 pyautogui.press 的行为一致。
+    无法识别时抛出ValueError
+    """
+    if not isinstance(key, str):
+        return (resolve_key(key),)
+    base = _shifted_base(key)
+    if base is not None:
+        return (VK_CODE['shift'], VK_CODE[base])
+    if len(key) < 3 or '+' not in key:
+        return (resolve_key(key),)
+    parts = [part.strip() for part in key.split('+')]
+    if not all(parts):
+        raise ValueError(f"无效的组合键: '{key}'")
+    chord = []
+    for part in parts:
+        for vk in resolve_chord(part):
+            if vk not in chord:
+                chord.append(vk)
+    return tuple(chord)
+
+
+# MapVirtualKey 的映射类型：虚拟键码 -> 扫描码，扩展键的扫描码高字节为0xE0
+MAPVK_VK_TO_VSC_EX = 4
+
+# 按键名 -> 扫描码（第一套扫描码，美式键盘布局），扩展键以0xE0前缀表示
+SCAN_CODE = {
+    'esc': 0x01, '1': 0x02, '2': 0x03, '3': 0x04, '4': 0x05, '5': 0x06, '6': 0x07,
+    '7': 0x08, '8': 0x09, '9': 0x0A, '0': 0x0B, '-': 0x0C, '=': 0x0D, 'backspace': 0x0E,
+    'tab': 0x0F, 'q': 0x10, 'w': 0x11, 'e': 0x12, 'r': 0x13, 't': 0x14, 'y': 0x15,
+    'u': 0x16, 'i': 0x17, 'o': 0x18, 'p': 0x19, '[': 0x1A, ']': 0x1B, 'enter': 0x1C,
+    'ctrl': 0x1D, 'lcontrol': 0x1D, 'a': 0x1E, 's': 0x1F, 'd': 0x20, 'f': 0x21,
+    'g': 0x22, 'h': 0x23, 'j': 0x24, 'k': 0x25, 'l': 0x26, ';': 0x27, "'": 0x28,
+    '`': 0x29, 'shift': 0x2A, 'lshift': 0x2A, '\\': 0x2B, 'z': 0x2C, 'x': 0x2D,
+    'c': 0x2E, 'v': 0x2F, 'b': 0x30, 'n': 0x31, 'm': 0x32, ',': 0x33, '.': 0x34,
+    '/': 0x35, 'rshift': 0x36, 'multiply': 0x37, 'alt': 0x38, 'lmenu': 0x38,
+    'space': 0x39, 'caps_lock': 0x3A,
+    'f1': 0x3B, 'f2': 0x3C, 'f3': 0x3D, 'f4': 0x3E, 'f5': 0x3F, 'f6': 0x40,
+    'f7': 0x41, 'f8': 0x42, 'f9': 0x43, 'f10': 0x44, 'num_lock': 0x45, 'scroll_lock': 0x46,
+    'numpad7': 0x47, 'numpad8': 0x48, 'numpad9': 0x49, 'subtract': 0x4A,
+    'numpad4': 0x4B, 'numpad5': 0x4C, 'numpad6': 0x4D, 'add': 0x4E,
+    'numpad1': 0x4F, 'numpad2': 0x50, 'numpad3': 0x51, 'numpad0': 0x52, 'decimal': 0x53,
+    'f11': 0x57, 'f12': 0x58,
+    'f13': 0x64, 'f14': 0x65, 'f15': 0x66, 'f16': 0x67, 'f17': 0x68, 'f18': 0x69,
+    'f19': 0x6A, 'f20': 0x6B, 'f21': 0x6C, 'f22': 0x6D, 'f23': 0x6E, 'f24': 0x76,
+    # 扩展键
+    'rcontrol': 0xE01D, 'divide': 0xE035, 'print_screen': 0xE037, 'rmenu': 0xE038,
+    'home': 0xE047, 'up': 0xE048, 'page_up': 0xE049, 'left': 0xE04B, 'right': 0xE04D,
+    'end': 0xE04F, 'down': 0xE050, 'page_down': 0xE051, 'insert': 0xE052, 'delete': 0xE053,
+    'lwin': 0xE05B, 'rwin': 0xE05C, 'apps': 0xE05D,
+    'browser_search': 0xE065, 'browser_favorites': 0xE066, 'browser_refresh': 0xE067,
+    'browser_stop': 0xE068, 'browser_forward': 0xE069, 'browser_back': 0xE06A,
+    'launch_app1': 0xE06B, 'launch_mail': 0xE06C, 'launch_media_select': 0xE06D,
+    'media_prev_track': 0xE010, 'media_next_track': 0xE019, 'volume_mute': 0xE020,
+    'launch_app2': 0xE021, 'media_play_pause': 0xE022, 'media_stop': 0xE024,
+    'volume_down': 0xE02E, 'volume_up': 0xE030, 'browser_home': 0xE032,
+}
+
+# 必须带 KEYEVENTF_EXTENDEDKEY 发送的虚拟键码，
+# MapVirtualKey 对其中部分按键（方向键、Home/End等）不返回0xE0前缀，需以此为准
+EXTENDED_KEYS = frozenset(VK_CODE[name] for name, scan in SCAN_CODE.items() if scan >> 8 == 0xE0)
+
+
+def build_scan_table(map_virtual_key=None):
+    """生成 虚拟键码 -> 扫描码 的查找表（256项，0表示没有对应的扫描码）
+    map_virtual_key 为 MapVirtualKeyW 或兼容的函数，用于按当前键盘布局映射；
+    为None或其返回0时使用内置的美式布局表。扩展键的扫描码带0xE0前缀
+    """
+    table = [0] * 256
+    for name, scan in SCAN_CODE.items():
+        table[VK_CODE[name]] = scan
+    if map_virtual_key is not None:
+        for vk in range(1, 256):
+            scan = map_virtual_key(vk, MAPVK_VK_TO_VSC_EX)
+            if scan:
+                table[vk] = scan
+    for vk in EXTENDED_KEYS:
+        if table[vk]:
+            table[vk] = 0xE000 | (table[vk] & 0xFF)
+    return tuple(table)
+
+
+# 内置布局的扫描码表
+SCAN_TABLE = build_scan_table()
+
+
+def _build_key_names():
+    """虚拟键码 -> 标准按键名，同一键码有多个名称时取第一个"""
+    names = [None] * 256
+    for name, vk in VK_CODE.items():
+        if names[vk] is None:
+            names[vk] = name
+    return tuple(names)
+
+
+# 虚拟键码 -> 标准按键名，用于显示与导出
+KEY_NAMES = _build_key_names()
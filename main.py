@@ -1,11 +1,25 @@
 import sys
-import keyboard
-from PyQt6.QtWidgets import QApplication
-from gui import MacroConfigWindow
-from executor import MacroExecutor
-from config import config
+import time
+from import_timer import ImportTimer
+
+# 启动参数：输出启动耗时报告（各模块的导入耗时与窗口显示前的总耗时）
+STARTUP_REPORT_ARG = '--startup-report'
 
 def main():
+    launch_time = time.perf_counter()
+    startup_report = STARTUP_REPORT_ARG in sys.argv
+    if startup_report:
+        sys.argv.remove(STARTUP_REPORT_ARG)
+
+    # 各输入后端的依赖库在首次选择该后端时才导入，这里只导入界面与热键所需的模块
+    with ImportTimer() as import_timer:
+        import keyboard
+        from PyQt6.QtWidgets import QApplication
+        from PyQt6.QtCore import QTimer
+        from gui import MacroConfigWindow
+        from executor import MacroExecutor
+        from config import config
+
     app = QApplication(sys.argv)
 
     executor = MacroExecutor()
@@ -15,11 +29,21 @@ def main():
     # 全局热键绑定 - 从配置中获取快捷键
     start_key = config.get_key_by_title("启动/暂停")
     stop_key = config.get_key_by_title("停止")
-    
+    record_key = config.get_key_by_title("录制")
+
     if start_key:
         keyboard.add_hotkey(start_key, lambda: window.start_macro())
     if stop_key:
         keyboard.add_hotkey(stop_key, lambda: window.stop_macro())
+    if record_key:
+        keyboard.add_hotkey(record_key, lambda: window.record_hotkey_pressed.emit())
+
+    if startup_report:
+        # 事件循环开始处理事件时窗口已显示，以此作为启动完成的时间
+        def print_startup_report():
+            print(import_timer.report())
+            print(f"启动完成: {(time.perf_counter() - launch_time) * 1000:.1f}ms")
+        QTimer.singleShot(0, print_startup_report)
 
     sys.exit(app.exec())
 
@@ -0,0 +1,280 @@
+"""
+计时指标
+以固定内存的对数线性直方图（HDR风格）统计每次事件的定时误差（实际发送时间 - 计划时间）
+与后端调用耗时，长时间运行内存占用不变，可随时计算 p50/p99 等分位数，
+并导出为CSV或Prometheus文本格式
+"""
+import os
+import time
+from array import array
+from key_table import KEY_NAMES
+
+# 直方图的精度：每个2的幂区间分为 2**(SUB_BUCKET_BITS-1) 个桶，相对误差约1%
+SUB_BUCKET_BITS = 7
+# 可记录的最大值为 2**(SUB_BUCKET_BITS+MAX_EXPONENT) 微秒（约76小时），更大的值计入最后一个桶
+MAX_EXPONENT = 31
+
+# 导出Prometheus直方图时使用的桶上界（秒）
+PROMETHEUS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                      0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# 导出时输出的分位数
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """对数线性直方图，以微秒为单位记录非负的时间值
+
+    小于 2**SUB_BUCKET_BITS 微秒的值逐微秒计数，更大的值按所在的2的幂区间再等分，
+    桶数固定，记录一次只做几次整数运算
+    """
+    __slots__ = ('counts', 'count', 'total', 'min', 'max', 'negative',
+                 '_sub_count', '_half', '_max_index')
+
+    def __init__(self):
+        self._sub_count = 1 << SUB_BUCKET_BITS
+        self._half = self._sub_count >> 1
+        buckets = self._sub_count + MAX_EXPONENT * self._half
+        self._max_index = buckets - 1
+        self.counts = array('Q', bytes(8 * buckets))
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0     # 所有值之和（秒）
+        self.min = 0.0
+        self.max = 0.0
+        self.negative = 0    # 记录时为负（提前发送）的次数，按0计入
+
+    def _index(self, us):
+        if us < self._sub_count:
+            return us
+        exponent = us.bit_length() - SUB_BUCKET_BITS
+        index = self._sub_count + (exponent - 1) * self._half + (us >> exponent) - self._half
+        return index if index < self._max_index else self._max_index
+
+    def _upper_bound(self, index):
+        """桶内值的上界（微秒，不含）"""
+        if index < self._sub_count:
+            return index + 1
+        offset = index - self._sub_count
+        exponent = offset // self._half + 1
+        return (self._half + offset % self._half + 1) << exponent
+
+    def record(self, seconds):
+        """记录一个时间值（秒）"""
+        if seconds < 0:
+            self.negative += 1
+            seconds = 0.0
+        if self.count == 0 or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.count += 1
+        self.total += seconds
+        self.counts[self._index(int(seconds * 1e6))] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """返回第 percent 百分位的值（秒），取所在桶的上界，不超过最大值"""
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(self.count * percent / 100 + 0.5))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            if bucket:
+                seen += bucket
+                if seen >= target:
+                    return min(self._upper_bound(index) / 1e6, self.max)
+        return self.max
+
+    def count_below(self, seconds):
+        """不大于 seconds 的记录数（按桶边界近似），用于导出累计直方图"""
+        limit = int(seconds * 1e6)
+        total = 0
+        for index, bucket in enumerate(self.counts):
+            if bucket:
+                if self._upper_bound(index) - 1 > limit:
+                    break
+                total += bucket
+        return total
+
+    def summary(self):
+        """返回统计结果字典（秒）"""
+        result = {
+            'count': self.count,
+            'min': self.min,
+            'mean': self.mean,
+            'max': self.max,
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent:g}'] = self.percentile(percent)
+        return result
+
+
+class TimingMetrics:
+    """执行器的计时指标
+
+    按 (事件流, 按键) 统计定时误差，按后端统计调用耗时与每次调用的事件数，
+    各直方图在第一次出现对应的标签时创建，数量受按键数限制。
+    只由调度线程写入；导出与汇总可在其它线程调用，遍历前先复制字典的条目，
+    调度线程同时新增标签时不会出错，读到的计数相差至多几个事件
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.errors = {}       # (事件流, 按键) -> 定时误差直方图
+        self.calls = {}        # 后端名 -> 调用耗时直方图
+        self.backend_events = {}  # 后端名 -> 已发送事件数
+        self.start_time = clock()
+
+    def reset(self):
+        """清空全部指标并重新开始计时"""
+        self.errors.clear()
+        self.calls.clear()
+        self.backend_events.clear()
+        self.start_time = self.clock()
+
+    def record_event(self, stream, key, scheduled, dispatched):
+        """记录一次事件的计划时间与实际发送时间"""
+        label = (stream, key)
+        histogram = self.errors.get(label)
+        if histogram is None:
+            histogram = self.errors[label] = LatencyHistogram()
+        histogram.record(dispatched - scheduled)
+
+    def record_call(self, backend, duration, events=1):
+        """记录一次后端调用的耗时与其中的事件数"""
+        histogram = self.calls.get(backend)
+        if histogram is None:
+            histogram = self.calls[backend] = LatencyHistogram()
+        histogram.record(duration)
+        self.backend_events[backend] = self.backend_events.get(backend, 0) + events
+
+    @property
+    def events(self):
+        """{事件流: 已发送事件数}"""
+        result = {}
+        for (stream, key), histogram in list(self.errors.items()):
+            result[stream] = result.get(stream, 0) + histogram.count
+        return result
+
+    def elapsed(self):
+        return self.clock() - self.start_time
+
+    def throughput(self):
+        """自开始以来每秒发送的事件数"""
+        elapsed = self.elapsed()
+        return sum(self.events.values()) / elapsed if elapsed > 0 else 0.0
+
+    def stream_error(self, stream):
+        """合并同一事件流所有按键的定时误差直方图"""
+        merged = LatencyHistogram()
+        for (name, key), histogram in list(self.errors.items()):
+            if name != stream:
+                continue
+            for i, bucket in enumerate(histogram.counts):
+                if bucket:
+                    merged.counts[i] += bucket
+            if merged.count == 0 or histogram.min < merged.min:
+                merged.min = histogram.min
+            merged.max = max(merged.max, histogram.max)
+            merged.count += histogram.count
+            merged.total += histogram.total
+            merged.negative += histogram.negative
+        return merged
+
+    def _rows(self):
+        """(指标名, 标签字典, 直方图) 列表"""
+        rows = []
+        for (stream, key), histogram in sorted(list(self.errors.items()),
+                                               key=lambda item: str(item[0])):
+            rows.append(('timing_error', {'stream': stream, 'key': _key_label(key)}, histogram))
+        for backend, histogram in sorted(list(self.calls.items())):
+            rows.append(('backend_call', {'backend': backend}, histogram))
+        return rows
+
+    def to_csv(self):
+        """导出为CSV文本，每个直方图一行，时间单位为毫秒"""
+        columns = ['metric', 'stream', 'key', 'backend', 'count', 'min_ms', 'mean_ms']
+        columns += [f'p{percent:g}_ms' for percent in PERCENTILES] + ['max_ms']
+        lines = [','.join(columns)]
+        for metric, labels, histogram in self._rows():
+            summary = histogram.summary()
+            values = [metric, labels.get('stream', ''), _csv_field(labels.get('key', '')),
+                      labels.get('backend', ''), str(summary['count'])]
+            values += [f"{summary[name] * 1000:.3f}" for name in
+                       ['min', 'mean'] + [f'p{percent:g}' for percent in PERCENTILES] + ['max']]
+            lines.append(','.join(values))
+        return '\n'.join(lines) + '\n'
+
+    def to_prometheus(self):
+        """导出为Prometheus文本格式"""
+        lines = []
+        names = {'timing_error': ('keypress_timing_error_seconds', '事件实际发送时间与计划时间之差'),
+                 'backend_call': ('keypress_backend_call_seconds', '输入后端单次调用的耗时')}
+        rows = self._rows()
+        for metric, (name, help_text) in names.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for row_metric, labels, histogram in rows:
+                if row_metric != metric:
+                    continue
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                for bound in PROMETHEUS_BUCKETS:
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} '
+                                 f'{histogram.count_below(bound)}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label_text}}} {histogram.total}')
+                lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+        lines.append('# HELP keypress_events_total 已发送的事件数')
+        lines.append('# TYPE keypress_events_total counter')
+        for stream, count in sorted(self.events.items()):
+            lines.append(f'keypress_events_total{{stream="{_escape(stream)}"}} {count}')
+        lines.append('# HELP keypress_events_per_second 自开始以来的平均事件发送速度')
+        lines.append('# TYPE keypress_events_per_second gauge')
+        lines.append(f'keypress_events_per_second {self.throughput()}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """按扩展名导出，.csv 为CSV，其余为Prometheus文本格式；先写临时文件再替换，避免读到半个文件"""
+        text = self.to_csv() if str(path).lower().endswith('.csv') else self.to_prometheus()
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def print_summary(self):
+        """打印各事件流的定时误差分位数与各后端的调用耗时"""
+        for stream in sorted(self.events):
+            summary = self.stream_error(stream).summary()
+            print(f"[{stream}] 误差 p50 {summary['p50'] * 1000:.3f}ms, "
+                  f"p99 {summary['p99'] * 1000:.3f}ms, 最大 {summary['max'] * 1000:.3f}ms")
+        for backend, histogram in sorted(list(self.calls.items())):
+            summary = histogram.summary()
+            print(f"[{backend}] 调用耗时 p50 {summary['p50'] * 1e6:.1f}us, "
+                  f"p99 {summary['p99'] * 1e6:.1f}us, "
+                  f"{self.backend_events.get(backend, 0)}个事件")
+
+
+def _key_label(key):
+    """按键标签：虚拟键码转为按键名，鼠标按钮名保持不变"""
+    if isinstance(key, int) and 0 <= key < len(KEY_NAMES) and KEY_NAMES[key]:
+        return KEY_NAMES[key]
+    return str(key)
+
+
+def _csv_field(value):
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,137 @@
+import random
+from array import array
+
+# 每次预先生成的随机数个数
+DEFAULT_BLOCK_SIZE = 4096
+# 对数正态分布噪声的上限，避免极端长延迟
+LOGNORMAL_MAX = 3.0
+
+
+class DelayDistribution:
+    """延迟随机分布
+    生成以步骤随机波动为单位的噪声，实际等待时间 = 基础延迟 + 随机波动 * 噪声
+    """
+    name = None
+
+    def sample_block(self, rng, size):
+        """用给定的随机数生成器生成 size 个噪声值"""
+        raise NotImplementedError
+
+    def to_dict(self):
+        return {'type': self.name}
+
+
+class UniformDelay(DelayDistribution):
+    """均匀分布，噪声落在[-1, 1]，与原先 random.uniform 的行为一致"""
+    name = 'uniform'
+
+    def sample_block(self, rng, size):
+        uniform = rng.uniform
+        return [uniform(-1.0, 1.0) for _ in range(size)]
+
+
+class GaussianDelay(DelayDistribution):
+    """截断正态分布，标准差为 sigma，噪声截断到[-1, 1]"""
+    name = 'gaussian'
+
+    def __init__(self, sigma=0.5):
+        self.sigma = sigma
+
+    def sample_block(self, rng, size):
+        gauss = rng.gauss
+        sigma = self.sigma
+        return [max(-1.0, min(1.0, gauss(0.0, sigma))) for _ in range(size)]
+
+    def to_dict(self):
+        return {'type': self.name, 'sigma': self.sigma}
+
+
+class LogNormalDelay(DelayDistribution):
+    """对数正态分布，均值为0、右偏，偶尔出现较长的停顿，更接近人的操作"""
+    name = 'lognormal'
+
+    def __init__(self, sigma=0.5):
+        self.sigma = sigma
+
+    def sample_block(self, rng, size):
+        lognormvariate = rng.lognormvariate
+        sigma = self.sigma
+        mu = -sigma * sigma / 2  # 使 exp(X) 的均值为1
+        return [min(LOGNORMAL_MAX, lognormvariate(mu, sigma) - 1.0) for _ in range(size)]
+
+    def to_dict(self):
+        return {'type': self.name, 'sigma': self.sigma}
+
+
+class EmpiricalDelay(DelayDistribution):
+    """经验分布，从录制得到的噪声样本中有放回地抽样"""
+    name = 'empirical'
+
+    def __init__(self, samples):
+        if not samples:
+            raise ValueError("经验分布至少需要一个样本")
+        self.samples = list(samples)
+
+    @classmethod
+    def from_delays(cls, delays):
+        """由录制的实际延迟生成样本：以中位数为中心，按最大偏差归一化到[-1, 1]"""
+        ordered = sorted(delays)
+        center = ordered[len(ordered) // 2]
+        spread = max(abs(d - center) for d in ordered) or 1.0
+        return cls([(d - center) / spread for d in ordered])
+
+    def sample_block(self, rng, size):
+        return rng.choices(self.samples, k=size)
+
+    def to_dict(self):
+        return {'type': self.name, 'samples': self.samples}
+
+
+DISTRIBUTIONS = {
+    UniformDelay.name: UniformDelay,
+    GaussianDelay.name: GaussianDelay,
+    LogNormalDelay.name: LogNormalDelay,
+    EmpiricalDelay.name: EmpiricalDelay,
+}
+
+
+def create_distribution(data):
+    """由配置字典创建延迟分布，如 {'type': 'gaussian', 'sigma': 0.5}"""
+    params = dict(data)
+    name = params.pop('type', UniformDelay.name)
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"未知的延迟分布: {name}")
+    return DISTRIBUTIONS[name](**params)
+
+
+class DelaySampler:
+    """按块预先生成延迟噪声
+    使用独立的随机数生成器，相同的种子与宏可以完全复现一次运行
+    """
+
+    def __init__(self, distribution=None, seed=None, block_size=DEFAULT_BLOCK_SIZE):
+        if seed is None:
+            seed = random.SystemRandom().randrange(1 << 32)
+        self.distribution = distribution or UniformDelay()
+        self.seed = seed
+        self.block_size = block_size
+        self._rng = random.Random(seed)
+
+    def spawn(self, name):
+        """派生一个独立的采样器，种子由本采样器的种子与 name 确定
+        各事件流使用各自的采样器，噪声序列不受其它流取用多少的影响
+        """
+        seed = random.Random(f'{self.seed}:{name}').randrange(1 << 32)
+        return DelaySampler(self.distribution, seed, self.block_size)
+
+    def next_block(self):
+        """生成下一块噪声"""
+        return array('d', self.distribution.sample_block(self._rng, self.block_size))
+
+    def sample(self, count):
+        """生成 count 个噪声值，用于预览或测试"""
+        values = array('d')
+        while len(values) < count:
+            values.extend(self.next_block())
+        return values[:count]
+
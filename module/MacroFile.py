@@ -0,0 +1,354 @@
+"""
+宏文件的读写
+除可编辑的JSON格式外，提供定长记录的二进制格式（.kpm）：
+文件头 + 按键名表 + 每步16字节的记录，加载时通过 mmap 映射，
+按列整体复制为类型化数组后立即关闭映射，不为每一步创建对象；
+以及逐行一步的JSONL格式（.jsonl），可边读边执行，内存占用与宏长度无关
+"""
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+from input_backend import EVENT_HOLD, EVENT_PRESS
+from key_table import resolve_chord, resolve_key
+from module.Program import MacroProgram, compile_program, has_control_flow
+from module.Step import Step, check_seconds
+from module.Timeline import MacroTimeline, compile_steps
+
+MAGIC = b'KPAM'
+VERSION = 1
+HOLD_VERSION = 2  # 记录中保存按住时长的版本，不包含按住的宏仍保存为版本1，旧版本程序可以读取
+BINARY_SUFFIX = '.kpm'
+JSONL_SUFFIX = '.jsonl'
+
+# 文件头：魔数、版本、记录长度、步数、循环次数、循环时长（秒）、按键名表长度、记录区偏移
+HEADER = struct.Struct('<4sHHIIdII')
+# 每步的记录：基础延迟（秒，float32）、随机波动（秒，float32）、按键编号、事件类型|标志<<8
+# 事件类型为 EVENT_PRESS 或 EVENT_HOLD，按住时标志为按住时长（毫秒）
+RECORD = struct.Struct('<ffII')
+RECORD_FIELDS = 4
+RECORD_ALIGN = 16
+FLAGS_SHIFT = 8
+MAX_HOLD_MS = (1 << 24) - 1
+
+
+def _align(offset):
+    return (offset + RECORD_ALIGN - 1) // RECORD_ALIGN * RECORD_ALIGN
+
+
+def save_binary(path, timeline):
+    """把时间轴保存为二进制宏文件，按住时长保存为毫秒，超出范围时抛出ValueError"""
+    count = len(timeline)
+    names = json.dumps(list(timeline.key_names), ensure_ascii=False).encode('utf-8')
+    offset = _align(HEADER.size + len(names))
+    records = bytearray(count * RECORD.size)
+    version = VERSION
+    if count:
+        # 按列整体写入交错的记录
+        view = memoryview(records)
+        floats = view.cast('f')
+        floats[0::RECORD_FIELDS] = memoryview(array('f', timeline.delays))
+        floats[1::RECORD_FIELDS] = memoryview(array('f', timeline.random_offsets))
+        words = view.cast('I')
+        words[2::RECORD_FIELDS] = memoryview(array('I', timeline.key_ids))
+        if timeline.holds is not None and any(timeline.holds):
+            words[3::RECORD_FIELDS] = memoryview(_encode_holds(timeline.holds))
+            version = HOLD_VERSION
+        if sys.byteorder != 'little':
+            words = array('I', records)
+            words.byteswap()
+            records = words.tobytes()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, RECORD.size, count, timeline.loop_count,
+                            timeline.loop_time, len(names), offset))
+        f.write(names)
+        f.write(bytes(offset - HEADER.size - len(names)))
+        f.write(records)
+
+
+def _encode_holds(holds):
+    """按住时长 -> 记录的事件类型与标志"""
+    kinds = array('I')
+    for row, hold in enumerate(holds, 1):
+        ms = round(hold * 1000)
+        if ms > MAX_HOLD_MS:
+            raise ValueError(f"第{row}行: 按住时长超出二进制格式的范围: {hold}")
+        kinds.append(EVENT_HOLD | ms << FLAGS_SHIFT if ms > 0 else EVENT_PRESS)
+    return kinds
+
+
+def load_binary(path):
+    """以 mmap 加载二进制宏文件，返回 MacroTimeline
+    各列按列整体复制后关闭映射，加载后文件可以被覆盖或删除。
+    文件格式或版本不符、存在无法识别的按键时抛出ValueError
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"不是有效的宏文件: {path}")
+        magic, version, record_size, count, loop_count, loop_time, names_size, offset = \
+            HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"不是有效的宏文件: {path}")
+        if version not in (VERSION, HOLD_VERSION) or record_size != RECORD.size:
+            raise ValueError(f"不支持的宏文件版本: {version}")
+        key_names = json.loads(f.read(names_size).decode('utf-8'))
+        if not isinstance(key_names, list) or not all(isinstance(name, str) for name in key_names):
+            raise ValueError(f"宏文件已损坏: {path}")
+        key_names = tuple(key_names)
+        delays, random_offsets, key_ids, kinds = array('f'), array('f'), array('I'), array('I')
+        if count:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                _read_columns(mapped, offset, count, path, delays, random_offsets, key_ids, kinds)
+            finally:
+                mapped.close()
+
+    holds = None
+    if version == HOLD_VERSION and any(kind & 0xFF == EVENT_HOLD for kind in kinds):
+        holds = array('d', ((kind >> FLAGS_SHIFT) / 1000 if kind & 0xFF == EVENT_HOLD else 0.0
+                            for kind in kinds))
+    key_codes = array('H')
+    errors = []
+    for name in key_names:
+        try:
+            key_codes.append(resolve_chord(name)[-1])
+        except ValueError as e:
+            errors.append(str(e))
+            key_codes.append(0)
+    if errors:
+        raise ValueError("\n".join(errors))
+    if key_ids and max(key_ids) >= len(key_names):
+        raise ValueError(f"宏文件已损坏: {path}")
+    return MacroTimeline(key_names, key_codes, key_ids, delays, random_offsets,
+                         loop_count=loop_count, loop_time=loop_time, holds=holds)
+
+
+def _read_columns(mapped, offset, count, path, *columns):
+    """从映射内存中按列复制交错的记录，复制完成后不再引用映射"""
+    end = offset + count * RECORD.size
+    if len(mapped) < end:
+        raise ValueError(f"宏文件已损坏: {path}")
+    with memoryview(mapped) as view:
+        records = view[offset:end]
+        if sys.byteorder != 'little':
+            # 大端平台上先复制一份并转换字节序
+            words = array('I', records)
+            words.byteswap()
+            records.release()
+            records = memoryview(words).cast('B')
+        with records, records.cast('I') as words:
+            for field, column in enumerate(columns):
+                # 跨步视图的 tobytes 只复制该列，数据与 float32/uint32 的列逐字节对应
+                column.frombytes(words[field::RECORD_FIELDS].tobytes())
+
+
+def save_json(path, timeline):
+    """把时间轴导出为可编辑的JSON宏文件"""
+    config = {
+        'steps': [step.to_dict() for step in timeline.to_steps()],
+        'loop_count': timeline.loop_count,
+        'loop_time': timeline.loop_time,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def save_program(path, program):
+    """把控制流宏按编译前的步骤保存为JSON宏文件"""
+    config = {
+        'steps': program.entries,
+        'loop_count': program.loop_count,
+        'loop_time': program.loop_time,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def load_json(path):
+    """从JSON宏文件导入并编译为时间轴，包含重复块、跳转等控制项时编译为 MacroProgram
+    文件内容无效时抛出ValueError并指出所在位置
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"宏文件必须是JSON对象: {path}")
+    entries = config.get('steps', [])
+    if not isinstance(entries, list):
+        raise ValueError(f"宏文件的 steps 必须是列表: {path}")
+    loop_count, loop_time = _loop_params(config)
+    if has_control_flow(entries):
+        return compile_program(entries, loop_count, loop_time)
+    steps = []
+    for row, step in enumerate(entries, 1):
+        where = f"第{row}行"
+        if not isinstance(step['key'], str):
+            raise ValueError(f"{where}: 无效的按键 {step['key']!r}")
+        if 'delay' not in step:
+            raise ValueError(f"{where}: 缺少延迟")
+        steps.append(Step(step['key'], check_seconds(step['delay'], "延迟", where),
+                          check_seconds(step.get('random_offset', 0.1), "随机波动", where),
+                          check_seconds(step.get('hold', 0), "按住时长", where)))
+    return compile_steps(steps, loop_count, loop_time)
+
+
+def _loop_params(config):
+    """读取并校验循环次数与循环时长"""
+    loop_count = config.get('loop_count', 0)
+    if isinstance(loop_count, bool) or not isinstance(loop_count, int) or loop_count < 0:
+        raise ValueError(f"无效的循环次数 {loop_count!r}")
+    loop_time = config.get('loop_time', 0)
+    check_seconds(loop_time, "循环时长", "宏文件")
+    return loop_count, loop_time
+
+
+def save_jsonl(path, steps, loop_count=0, loop_time=0):
+    """把步骤逐行写入JSONL宏文件，首行为循环参数，steps 可以是生成器
+    流式执行只支持单个按键的点按，遇到组合键或按住的步骤时抛出ValueError
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'version': VERSION, 'loop_count': loop_count,
+                            'loop_time': loop_time}) + '\n')
+        for row, step in enumerate(steps, 1):
+            if step.hold or len(resolve_chord(step.key)) > 1:
+                raise ValueError(f"第{row}行: 组合键与按住的步骤不能保存为JSONL格式，请保存为JSON")
+            f.write(json.dumps(step.to_dict(), ensure_ascii=False) + '\n')
+
+
+def _parse_step(line, line_no):
+    """解析JSONL中的一行，返回 (按键, 延迟, 随机波动)，空行与首行的文件头返回None
+    内容无效时抛出ValueError并指出行号
+    """
+    if not line.strip():
+        return None
+    where = f"第{line_no}行"
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise ValueError(f"{where}: 无效的JSON")
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: 步骤必须是JSON对象")
+    if 'key' not in data:
+        if line_no == 1:
+            return None
+        raise ValueError(f"{where}: 缺少按键")
+    key = data['key']
+    if not isinstance(key, str) or not key:
+        raise ValueError(f"{where}: 无效的按键 {key!r}")
+    if 'delay' not in data:
+        raise ValueError(f"{where}: 缺少延迟")
+    return (key, check_seconds(data['delay'], "延迟", where),
+            check_seconds(data.get('random_offset', 0.1), "随机波动", where))
+
+
+class JsonlSource:
+    """JSONL宏文件的流式来源
+
+    每次迭代都重新打开文件，逐行解析并产出 (虚拟键码, 延迟, 随机波动)，
+    不保留已读过的步骤，因此内存占用与宏长度无关，读到第一步即可开始执行。
+    同时累计解析的行数、字节数与耗时，用于报告解析吞吐
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.loop_count = 0
+        self.loop_time = 0
+        self.steps = 0           # 已解析的步数（累计所有循环）
+        self.bytes = 0           # 已解析的字节数
+        self.parse_seconds = 0.0  # 解析耗时（秒），不含等待执行的时间
+        self._key_codes = {}     # 按键名 -> 虚拟键码，每个按键只解析一次
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline() or '{}')
+            except ValueError:
+                raise ValueError("第1行: 无效的JSON")
+        if not isinstance(header, dict):
+            raise ValueError("第1行: 文件头必须是JSON对象")
+        if 'key' not in header:
+            self.loop_count, self.loop_time = _loop_params(header)
+
+    def __iter__(self):
+        key_codes = self._key_codes
+        clock = time.perf_counter
+        with open(self.path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                start = clock()
+                step = _parse_step(line, line_no)
+                if step is None:
+                    continue
+                key, delay, offset = step
+                vk = key_codes.get(key)
+                if vk is None:
+                    try:
+                        vk = key_codes[key] = resolve_key(key)
+                    except ValueError as e:
+                        raise ValueError(f"第{line_no}行: {e}")
+                item = (vk, delay, offset)
+                self.parse_seconds += clock() - start
+                self.steps += 1
+                self.bytes += len(line)
+                yield item
+
+    def throughput(self):
+        """解析吞吐，返回 (步/秒, 字节/秒)"""
+        if self.parse_seconds <= 0:
+            return 0.0, 0.0
+        return self.steps / self.parse_seconds, self.bytes / self.parse_seconds
+
+
+def iter_jsonl(path):
+    """逐行读取JSONL宏文件，依次产出 Step"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            step = _parse_step(line, line_no)
+            if step is not None:
+                yield Step(*step)
+
+
+def load_jsonl(path):
+    """从JSONL宏文件编译时间轴"""
+    source = JsonlSource(path)
+    return compile_steps(iter_jsonl(path), source.loop_count, source.loop_time)
+
+
+def is_binary(path):
+    """按文件头判断是否为二进制宏文件"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_macro(path):
+    """按文件内容与扩展名自动选择格式加载宏"""
+    if is_binary(path):
+        return load_binary(path)
+    if str(path).lower().endswith(JSONL_SUFFIX):
+        return load_jsonl(path)
+    return load_json(path)
+
+
+def save_macro(path, timeline):
+    """按扩展名选择格式保存宏，.kpm 为二进制，.jsonl 为逐行JSON，其余为JSON
+    控制流宏只能保存为JSON
+    """
+    path_lower = str(path).lower()
+    if isinstance(timeline, MacroProgram):
+        if path_lower.endswith((BINARY_SUFFIX, JSONL_SUFFIX)):
+            raise ValueError("包含控制项的宏只能保存为JSON格式")
+        save_program(path, timeline)
+    elif path_lower.endswith(BINARY_SUFFIX):
+        save_binary(path, timeline)
+    elif path_lower.endswith(JSONL_SUFFIX):
+        save_jsonl(path, timeline.to_steps(), timeline.loop_count, timeline.loop_time)
+    else:
+        save_json(path, timeline)
+
+
+if __name__ == '__main__':
+    # 格式转换：python -m module.MacroFile 输入文件 输出文件
+    if len(sys.argv) != 3:
+        print("用法: python -m module.MacroFile 输入文件 输出文件")
+        sys.exit(1)
+    save_macro(sys.argv[2], load_macro(sys.argv[1]))
+    print(f"已转换: {sys.argv[1]} -> {sys.argv[2]}")
@@ -0,0 +1,217 @@
+"""
+带控制流的宏
+宏文件的 steps 中除按键步骤外还可以包含控制项，编译为紧凑的字节码，由执行器逐条解释：
+    {"repeat": 20, "steps": [...]}      重复块，可任意嵌套
+    {"label": "a"} / {"goto": "a"}      标签与跳转，只能跳转到同一层的标签
+    {"wait_until": 1.5}                 等待到本轮开始后的1.5秒（已超过时不等待）
+    {"sub": "combo", "steps": [...]}    定义子程序（只能在最外层，不能递归调用）
+    {"call": "combo"}                   调用子程序
+重复块与子程序的步骤只保存一份，嵌套再深内存占用也只与宏文件的长度有关
+"""
+from array import array
+from key_table import resolve_chord
+from module.Step import Step, check_seconds
+from module.Timeline import compile_steps
+
+# 指令
+OP_STEP = 0    # 按一次键，参数为步骤编号
+OP_REPEAT = 1  # 进入重复块，参数为重复次数
+OP_NEXT = 2    # 重复块结尾，次数未用完时跳回块内第一条指令，参数为其位置
+OP_JUMP = 3    # 跳转，参数为目标位置
+OP_WAIT = 4    # 等待到本轮开始后的指定时间，参数为常量编号
+OP_CALL = 5    # 调用子程序，参数为子程序的位置
+OP_RET = 6     # 子程序返回
+OP_END = 7     # 一轮结束
+
+OP_NAMES = ('STEP', 'REPEAT', 'NEXT', 'JUMP', 'WAIT', 'CALL', 'RET', 'END')
+
+
+class MacroProgram:
+    """编译后的控制流宏
+    timeline 只保存按键步骤（每个步骤一份），ops/args 为并行的指令与参数数组，
+    constants 保存等待时间等浮点常量，entries 为编译前的步骤列表，用于保存回JSON
+    """
+    __slots__ = ('timeline', 'ops', 'args', 'constants', 'loop_count', 'loop_time', 'entries')
+
+    def __init__(self, timeline, ops, args, constants, loop_count=0, loop_time=0, entries=()):
+        self.timeline = timeline      # MacroTimeline，按键步骤
+        self.ops = ops                # array('B')，指令
+        self.args = args              # array('I')，指令参数
+        self.constants = constants    # array('d')，浮点常量
+        self.loop_count = loop_count  # 循环次数，0为无限
+        self.loop_time = loop_time    # 循环时长（秒），0为无限
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.ops)
+
+    def disassemble(self):
+        """返回可读的指令列表，用于调试"""
+        lines = []
+        for pc, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if op == OP_STEP:
+                timeline = self.timeline
+                detail = (f"{timeline.key_names[timeline.key_ids[arg]]} "
+                          f"{timeline.delays[arg]:g}s ±{timeline.random_offsets[arg]:g}s")
+            elif op == OP_WAIT:
+                detail = f"{self.constants[arg]:g}s"
+            elif op in (OP_RET, OP_END):
+                detail = ""
+            else:
+                detail = str(arg)
+            lines.append(f"{pc:5d}  {OP_NAMES[op]:<7}{detail}")
+        return lines
+
+
+def has_control_flow(entries):
+    """steps 中是否包含按键步骤以外的控制项"""
+    return any(not isinstance(entry, dict) or 'key' not in entry for entry in entries)
+
+
+class _Compiler:
+    def __init__(self):
+        self.steps = []
+        self.ops = array('B')
+        self.args = array('I')
+        self.constants = array('d')
+        self.subs = {}         # 子程序名 -> (步骤列表, 位置描述)
+        self.calls = []        # (CALL指令位置, 子程序名, 位置描述)
+        self.call_graph = {}   # 调用者（None为主程序）-> 被调用的子程序名集合
+        self.errors = []
+
+    def emit(self, op, arg=0):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def block(self, entries, where, owner, top_level):
+        """编译一层步骤，标签只在本层内可见"""
+        if not isinstance(entries, list):
+            self.errors.append(f"{where}步骤必须是列表")
+            return
+        labels = {}
+        gotos = []
+        for n, entry in enumerate(entries, 1):
+            path = f"{where}第{n}项"
+            if not isinstance(entry, dict):
+                self.errors.append(f"{path}: 无效的步骤")
+            elif 'key' in entry:
+                self.step(entry, path)
+            elif 'repeat' in entry:
+                count = _int(entry['repeat'])
+                if count is None or count < 0:
+                    self.errors.append(f"{path}: 无效的重复次数 {entry['repeat']!r}")
+                elif count > 0:
+                    self.emit(OP_REPEAT, count)
+                    start = len(self.ops)
+                    self.block(entry.get('steps', []), f"{path}的重复块中", owner, False)
+                    self.emit(OP_NEXT, start)
+            elif 'label' in entry:
+                name = str(entry['label'])
+                if name in labels:
+                    self.errors.append(f"{path}: 重复的标签 '{name}'")
+                labels[name] = len(self.ops)
+            elif 'goto' in entry:
+                gotos.append((self.emit(OP_JUMP), str(entry['goto']), path))
+            elif 'wait_until' in entry:
+                try:
+                    seconds = check_seconds(entry['wait_until'], "等待时间", path)
+                except ValueError as e:
+                    self.errors.append(str(e))
+                    continue
+                self.constants.append(seconds)
+                self.emit(OP_WAIT, len(self.constants) - 1)
+            elif 'call' in entry:
+                name = str(entry['call'])
+                self.calls.append((self.emit(OP_CALL), name, path))
+                self.call_graph.setdefault(owner, set()).add(name)
+            elif 'sub' in entry:
+                name = str(entry['sub'])
+                if not top_level or owner is not None:
+                    self.errors.append(f"{path}: 子程序只能定义在最外层")
+                elif name in self.subs:
+                    self.errors.append(f"{path}: 重复的子程序 '{name}'")
+                else:
+                    self.subs[name] = (entry.get('steps', []), path)
+            else:
+                self.errors.append(f"{path}: 无法识别的步骤 {entry!r}")
+        for pc, name, path in gotos:
+            if name in labels:
+                self.args[pc] = labels[name]
+            else:
+                self.errors.append(f"{path}: 找不到同一层的标签 '{name}'")
+
+    def step(self, entry, path):
+        key = entry['key']
+        if 'delay' not in entry:
+            self.errors.append(f"{path}: 缺少延迟")
+            return
+        try:
+            resolve_chord(key)
+        except (TypeError, ValueError) as e:
+            self.errors.append(f"{path}: {e}")
+            return
+        try:
+            step = Step(key, check_seconds(entry['delay'], "延迟", path),
+                        check_seconds(entry.get('random_offset', 0.1), "随机波动", path),
+                        check_seconds(entry.get('hold', 0), "按住时长", path))
+        except ValueError as e:
+            self.errors.append(str(e))
+            return
+        self.emit(OP_STEP, len(self.steps))
+        self.steps.append(step)
+
+    def check_recursion(self):
+        """子程序之间的调用不能成环，保证调用栈深度有限"""
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return False
+            if name in visiting:
+                return True
+            visiting.add(name)
+            cyclic = any(visit(callee) for callee in self.call_graph.get(name, ()))
+            visiting.discard(name)
+            done.add(name)
+            return cyclic
+
+        for name in self.subs:
+            if visit(name):
+                self.errors.append(f"子程序'{name}'存在递归调用")
+                return
+
+
+def compile_program(entries, loop_count=0, loop_time=0):
+    """把包含控制项的步骤列表编译为 MacroProgram，存在错误时抛出ValueError并列出所在位置"""
+    compiler = _Compiler()
+    compiler.block(entries, "", None, True)
+    compiler.emit(OP_END)
+    positions = {}
+    for name, (body, path) in compiler.subs.items():
+        positions[name] = len(compiler.ops)
+        compiler.block(body, f"子程序'{name}'中", name, False)
+        compiler.emit(OP_RET)
+    for pc, name, path in compiler.calls:
+        if name in positions:
+            compiler.args[pc] = positions[name]
+        else:
+            compiler.errors.append(f"{path}: 找不到子程序 '{name}'")
+    compiler.check_recursion()
+    if not compiler.steps and not compiler.errors:
+        compiler.errors.append("宏中没有按键步骤")
+    if compiler.errors:
+        raise ValueError("\n".join(compiler.errors))
+    return MacroProgram(compile_steps(compiler.steps), compiler.ops, compiler.args,
+                        compiler.constants, loop_count=loop_count, loop_time=loop_time,
+                        entries=entries)
+
+
+def _int(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number == value else None
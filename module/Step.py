@@ -1,3 +1,4 @@
+import math
 import random
 from dataclasses import dataclass, asdict
 
@@ -6,6 +7,7 @@ class Step:
     key: str           # 按键
     delay: float       # 基础延迟（秒）
     random_offset: float = 0.1  # 随机波动（秒）
+    hold: float = 0.0  # 按住时长（秒），为0时按下后立即释放
 
     def get_wait_time(self):
         if self.random_offset > 0:
@@ -13,5 +15,16 @@ class Step:
         return self.delay
     
     def to_dict(self):
-        # 将Step对象转换为字典，用于JSON序列化
-        return asdict(self)
+        # 将Step对象转换为字典，用于JSON序列化；不按住时省略hold，与旧版本的文件一致
+        data = asdict(self)
+        if not self.hold:
+            del data['hold']
+        return data
+
+
+def check_seconds(value, name, where):
+    """校验以秒为单位的时间，必须是非负的有限数值，否则抛出ValueError并指出所在位置"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not 0 <= value < math.inf:
+        raise ValueError(f"{where}: 无效的{name} {value!r}")
+    return float(value)
@@ -0,0 +1,106 @@
+from array import array
+from key_table import resolve_chord
+from module.Step import Step
+
+
+class MacroTimeline:
+    """编译后的宏时间轴
+    按键、延迟、随机波动与每步的起始偏移分别保存在并行的类型化数组中，
+    执行器按整数下标遍历，不再逐步访问 Step 对象。
+    各列也可以是其它支持下标访问的序列，如从二进制宏文件加载的 float32 数组。
+    按键名可以是组合键（如 ctrl+e），key_codes 中为其最后一个键，chords 中为全部键
+    """
+    __slots__ = ('key_names', 'key_codes', 'key_ids', 'delays', 'random_offsets', 'holds',
+                 '_starts', '_chords', 'loop_count', 'loop_time')
+
+    def __init__(self, key_names, key_codes, key_ids, delays, random_offsets,
+                 loop_count=0, loop_time=0, holds=None):
+        self.key_names = key_names            # 去重后的按键名，key_ids 为其下标
+        self.key_codes = key_codes            # array('H')，与 key_names 对应的虚拟键码
+        self.key_ids = key_ids                # array('H')，每步的按键编号
+        self.delays = delays                  # array('d')，每步的基础延迟（秒）
+        self.random_offsets = random_offsets  # array('d')，每步的随机波动（秒）
+        self.holds = holds                    # array('d')，每步的按住时长（秒），全部为0时为None
+        self.loop_count = loop_count          # 循环次数，0为无限
+        self.loop_time = loop_time            # 循环时长（秒），0为无限
+        self._starts = None
+        self._chords = None
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    @property
+    def starts(self):
+        """每步在一轮循环内的名义起始时间（秒），首次访问时计算"""
+        if self._starts is None:
+            starts = array('d', bytes(8 * len(self.delays)))
+            total = 0.0
+            for i, delay in enumerate(self.delays):
+                starts[i] = total
+                total += delay
+            self._starts = starts
+        return self._starts
+
+    @property
+    def chords(self):
+        """与 key_names 对应的虚拟键码元组，单个按键为只有一个元素的元组，首次访问时解析"""
+        if self._chords is None:
+            self._chords = tuple(resolve_chord(name) for name in self.key_names)
+        return self._chords
+
+    @property
+    def has_holds(self):
+        """是否包含组合键或按住的步骤，执行时需要分别发送按下与释放"""
+        return self.holds is not None or any(len(chord) > 1 for chord in self.chords)
+
+    @property
+    def cycle_time(self):
+        """一轮循环的名义时长（秒）"""
+        if not self.delays:
+            return 0.0
+        return self.starts[-1] + self.delays[-1]
+
+    def to_steps(self):
+        """还原为 Step 列表，用于编辑与保存，时间保留到微秒"""
+        holds = self.holds if self.holds is not None else [0.0] * len(self.key_ids)
+        return [Step(self.key_names[key_id], round(delay, 6), round(offset, 6), round(hold, 6))
+                for key_id, delay, offset, hold in zip(self.key_ids, self.delays,
+                                                       self.random_offsets, holds)]
+
+
+def compile_steps(steps, loop_count=0, loop_time=0):
+    """将 Step 列表与循环参数编译为 MacroTimeline
+    每个不同的按键只解析一次，存在无法识别的按键时抛出ValueError并列出所在行
+    """
+    key_names = []
+    key_codes = array('H')
+    key_index = {}
+    key_ids = array('H')
+    delays = array('d')
+    random_offsets = array('d')
+    holds = None  # 出现第一个按住的步骤时才创建
+    errors = []
+    for row, step in enumerate(steps):
+        key_id = key_index.get(step.key)
+        if key_id is None:
+            try:
+                vk = resolve_chord(step.key)[-1]
+            except ValueError as e:
+                errors.append(f"第{row+1}行: {e}")
+                continue
+            key_id = key_index[step.key] = len(key_names)
+            key_names.append(step.key)
+            key_codes.append(vk)
+        key_ids.append(key_id)
+        delays.append(step.delay)
+        random_offsets.append(step.random_offset)
+        if step.hold:
+            if holds is None:
+                holds = array('d', bytes(8 * (len(key_ids) - 1)))
+            holds.append(step.hold)
+        elif holds is not None:
+            holds.append(0.0)
+    if errors:
+        raise ValueError("\n".join(errors))
+    return MacroTimeline(tuple(key_names), key_codes, key_ids, delays, random_offsets,
+                         loop_count=loop_count, loop_time=loop_time, holds=holds)
@@ -0,0 +1,225 @@
+"""
+宏录制模块
+通过keyboard库的键盘与鼠标钩子录制按键，钩子回调只把事件写入预分配的环形缓冲区，
+由后台线程解析按键并以宏配置文件的格式流式写入磁盘，录制结果可直接由执行器回放
+"""
+import json
+import threading
+import time
+from array import array
+from collections import deque
+from key_table import resolve_chord
+from module.Humanize import EmpiricalDelay
+from module.Step import Step
+
+# 环形缓冲区的默认容量（事件数），必须是2的幂
+RING_CAPACITY = 4096
+# 后台线程写盘的间隔（秒）
+FLUSH_INTERVAL = 0.05
+
+
+def quantize_steps(steps, quantum):
+    """把步骤的延迟对齐到 quantum（秒）的整数倍，quantum 为0时原样返回
+    按累计时间取整，避免逐步取整造成误差累积
+    """
+    if quantum <= 0:
+        return list(steps)
+    result = []
+    elapsed = 0.0
+    previous = 0.0
+    for step in steps:
+        elapsed += step.delay
+        aligned = round(elapsed / quantum) * quantum
+        result.append(Step(step.key, round(aligned - previous, 6), step.random_offset, step.hold))
+        previous = aligned
+    return result
+
+
+class MacroRecorder:
+    """宏录制器
+
+    钩子回调（on_key/on_mouse）只向环形缓冲区写入 (时间, 按键名, 是否按下)，不做解析与IO；
+    键盘与鼠标钩子在不同的线程回调，写入时持有一个短锁，保证两者不会写入同一位置；
+    后台线程定期取出事件，忽略按住时的自动重复，并把每次按下写成一个步骤，
+    延迟为到下一次按下的时间间隔，最后一步的延迟为到停止录制的时间。
+    stop_hotkey 为停止录制的快捷键（如 'alt+f9'），按虚拟键码比较，不区分大小写；
+    最后几次按下恰好是该组合时停止时丢弃，录制过程中单独按下其中的按键仍会录制。
+    写盘速度跟不上导致缓冲区被覆盖时，被覆盖的事件计入 dropped
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, quantum=0.0, stop_hotkey=None,
+                 clock=time.time, flush_interval=FLUSH_INTERVAL):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"缓冲区容量必须是2的幂: {capacity}")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._times = array('d', bytes(8 * capacity))
+        self._downs = array('B', bytes(capacity))
+        self._keys = [None] * capacity
+        self._head = 0  # 钩子已写入的事件总数
+        self._push_lock = threading.Lock()  # 键盘与鼠标钩子线程写入缓冲区时互斥
+        self._tail = 0  # 后台线程已取出的事件总数
+        self.quantum = quantum  # 延迟量化的粒度（秒），0为保持原始时间
+        # 停止录制的快捷键的虚拟键码，停止时从末尾丢弃
+        self.stop_keys = frozenset(resolve_chord(stop_hotkey)) if stop_hotkey else frozenset()
+        self.clock = clock  # 与钩子事件时间一致的时钟
+        self.flush_interval = flush_interval
+        self.recording = False
+        self.dropped = 0  # 缓冲区溢出丢失的事件数
+        self.ignored = 0  # 无法识别而忽略的事件数
+        self.step_count = 0  # 已写入的步骤数
+        self._delays = array('d')  # 已写入步骤的延迟，停止时生成经验分布
+        self._file = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._hooks = []
+        self._held = set()  # 当前按住的按键，用于过滤自动重复
+        self._key_cache = {}  # 按键名 -> 虚拟键码，无法识别时为0
+        # 尚未写入的最后几次按下 (按键名, 虚拟键码, 时间)，保留到足以在停止时判断末尾是否为停止组合键
+        self._pending = deque()
+        self._keep = max(1, len(self.stop_keys))
+        self._loop_params = (0, 0)
+        self._start_time = 0.0
+        self._last_time = 0.0  # 已写入步骤的累计时间（量化后），用于量化取整
+
+    def push(self, key, down, t):
+        """写入一个事件，供钩子回调调用，也可直接调用以回放或测试"""
+        with self._push_lock:
+            i = self._head & self._mask
+            self._keys[i] = key
+            self._downs[i] = down
+            self._times[i] = t
+            self._head += 1
+
+    def on_key(self, event):
+        """keyboard 的键盘钩子回调"""
+        self.push(event.name, event.event_type == 'down', event.time)
+
+    def on_mouse(self, event):
+        """keyboard.mouse 的鼠标钩子回调，只录制按钮事件"""
+        button = getattr(event, 'button', None)
+        if button is not None:
+            self.push('mouse_' + button, event.event_type != 'up', event.time)
+
+    def start(self, path, loop_count=0, loop_time=0, hooks=True):
+        """开始录制到 path，hooks 为假时不安装钩子，事件由 push 写入"""
+        if self.recording:
+            return
+        self._head = self._tail = 0
+        self.dropped = self.ignored = self.step_count = 0
+        del self._delays[:]
+        self._held.clear()
+        self._pending.clear()
+        self._start_time = self._last_time = self.clock()
+        self._file = open(path, 'w', encoding='utf-8')
+        # 先写入文件头，步骤随录制逐条追加，停止时补齐其余字段
+        self._file.write('{\n    "steps": [')
+        self._loop_params = (loop_count, loop_time)
+        self._stop_event.clear()
+        self.recording = True
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+        if hooks:
+            import keyboard
+            from keyboard import mouse
+            self._hooks = [(keyboard.unhook, keyboard.hook(self.on_key)),
+                           (mouse.unhook, mouse.hook(self.on_mouse))]
+        print("开始录制")
+
+    def stop(self, drop_last=False):
+        """停止录制并完成文件，返回写入的步骤数
+        drop_last 为真时丢弃最后一次按下，如点击界面上的停止按钮；
+        否则最后几次按下是停止组合键时丢弃这几次按下
+        """
+        if not self.recording:
+            return self.step_count
+        for unhook, handler in self._hooks:
+            unhook(handler)
+        self._hooks = []
+        end_time = self.clock()
+        self.recording = False
+        self._stop_event.set()
+        self._thread.join()
+        self._drain()
+        pending = list(self._pending)
+        self._pending.clear()
+        count = 1 if drop_last else len(self.stop_keys)
+        if count and len(pending) >= count and (
+                drop_last or {vk for _, vk, _ in pending[-count:]} == self.stop_keys):
+            # 丢弃的按下是停止录制的操作，之前一步的延迟到该操作开始为止
+            end_time = pending[-count][2]
+            del pending[-count:]
+        for i, (key, _, _) in enumerate(pending):
+            self._write_step(key, pending[i + 1][2] if i + 1 < len(pending) else end_time)
+        loop_count, loop_time = self._loop_params
+        self._file.write(f'\n    ],\n    "loop_count": {loop_count},\n'
+                         f'    "loop_time": {loop_time}')
+        if len(self._delays) >= 2:
+            # 录制到的实际延迟作为经验分布保存，加载后随机波动按录制时的节奏抽样
+            distribution = EmpiricalDelay.from_delays(self._delays).to_dict()
+            self._file.write(f',\n    "distribution": {json.dumps(distribution)}')
+        self._file.write('\n}\n')
+        self._file.close()
+        self._file = None
+        print(f"录制结束: {self.step_count}步, 溢出{self.dropped}个事件, 忽略{self.ignored}个事件")
+        return self.step_count
+
+    def _writer_loop(self):
+        """后台线程：定期取出缓冲区中的事件并写盘"""
+        while not self._stop_event.wait(self.flush_interval):
+            self._drain()
+            self._file.flush()
+
+    def _drain(self):
+        """处理缓冲区中所有已写入的事件"""
+        head = self._head
+        tail = self._tail
+        if head - tail > self.capacity:
+            self.dropped += head - tail - self.capacity
+            tail = head - self.capacity
+        while tail < head:
+            i = tail & self._mask
+            self._handle(self._keys[i], self._downs[i], self._times[i])
+            tail += 1
+        self._tail = tail
+
+    def _handle(self, key, down, t):
+        vk = self._key_cache.get(key)
+        if vk is None:
+            try:
+                # 按住Shift时钩子给出大写字母或上档符号，取其所在按键的键码
+                vk = resolve_chord(key)[-1]
+            except ValueError:
+                vk = 0
+            self._key_cache[key] = vk
+        if not vk:
+            self.ignored += 1
+            return
+        if not down:
+            self._held.discard(key)
+            return
+        if key in self._held:
+            return  # 按住时的自动重复
+        self._held.add(key)
+        if not self._pending:
+            # 第一次按下前的等待不计入宏，量化以第一次按下为起点
+            self._start_time = self._last_time = t
+        self._pending.append((key, vk, t))
+        if len(self._pending) > self._keep:
+            key, _, _ = self._pending.popleft()
+            self._write_step(key, self._pending[0][2])
+
+    def _write_step(self, key, end_time):
+        """写入一步，延迟为从上一步到 end_time 的时间"""
+        if self.quantum > 0:
+            elapsed = round((end_time - self._start_time) / self.quantum) * self.quantum
+            delay = elapsed - (self._last_time - self._start_time)
+            self._last_time = self._start_time + elapsed
+        else:
+            delay = end_time - self._last_time
+            self._last_time = end_time
+        step = Step(key, round(max(0.0, delay), 6), 0.0)
+        self._delays.append(step.delay)
+        separator = ',' if self.step_count else ''
+        self._file.write(f'{separator}\n        {json.dumps(step.to_dict(), ensure_ascii=False)}')
+        self.step_count += 1
@@ -0,0 +1,121 @@
+"""
+高精度定时调度模块
+基于单调时钟为每一步计算绝对截止时间，先粗粒度睡眠、再短暂自旋命中截止时间，
+避免逐步 sleep 时后端调用耗时与睡眠超时不断累积造成的漂移
+"""
+import math
+import sys
+import time
+
+# 落后处理策略
+LATE_CATCHUP = 'catchup'  # 落后时立即补发，按原时间轴追赶
+LATE_SKIP = 'skip'        # 落后超过阈值的步骤直接跳过
+
+# 系统定时器的粒度（秒）：Windows 上 Condition.wait 与事件循环的定时器按约15.6ms的时钟中断唤醒，
+# 可打断的粗粒度睡眠需提前这么多醒来，否则较短的等待会整段超时
+TIMER_RESOLUTION = 0.016 if sys.platform == 'win32' else 0.001
+# 最后一个定时器周期内每段高精度睡眠的最长时间（秒），两段之间检查是否被打断
+FINE_SLICE = 0.001
+
+# wait_until() 的返回值
+WAIT_DISPATCH = 0     # 已到达截止时间
+WAIT_INTERRUPTED = 2  # 睡眠被打断
+
+
+class TimingStats:
+    """计时误差的在线统计（Welford算法），长时间运行内存占用也保持不变"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0        # 已执行步数
+        self.skipped = 0      # 因落后被跳过的步数
+        self.mean = 0.0       # 平均误差（秒）
+        self._m2 = 0.0
+        self.min = math.inf   # 最小误差
+        self.max = -math.inf  # 最大误差
+        self.last = 0.0       # 最近一步的误差，即当前相对理想时间轴的漂移
+
+    def add(self, error):
+        """记录一次误差（实际执行时间 - 计划时间，单位秒）"""
+        self.count += 1
+        delta = error - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (error - self.mean)
+        if error < self.min:
+            self.min = error
+        if error > self.max:
+            self.max = error
+        self.last = error
+
+    @property
+    def drift(self):
+        """当前漂移（秒）"""
+        return self.last
+
+    @property
+    def jitter(self):
+        """抖动，即误差的标准差（秒）"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def summary(self):
+        """返回统计结果字典"""
+        return {
+            'count': self.count,
+            'skipped': self.skipped,
+            'drift': self.drift,
+            'mean_error': self.mean,
+            'jitter': self.jitter,
+            'min_error': self.min if self.count else 0.0,
+            'max_error': self.max if self.count else 0.0,
+        }
+
+
+class DeadlineScheduler:
+    """截止时间调度器
+
+    各事件流按绝对截止时间推进，调度器只负责等待到队首的截止时间：
+    先用可打断的 sleep 粗粒度睡眠，在截止时间前一个定时器周期（timer_resolution）醒来，
+    再用高精度的 fine_sleep 分段睡眠（Python 3.11起 Windows 上的 time.sleep 使用高精度定时器），
+    最后 spin_threshold 秒自旋，误差不会随步数累积，也不受系统定时器粒度影响。
+    clock/sleep/fine_sleep 均可注入，便于在非Windows环境下用假时钟测试
+    （使用不会自行前进的假时钟时应把 spin_threshold 设为0）。
+    sleep 与 fine_sleep 返回真值表示睡眠被打断，sleep(0) 只检查是否已被打断。
+    """
+
+    def __init__(self, clock=time.perf_counter, sleep=time.sleep, spin_threshold=0.002,
+                 timer_resolution=TIMER_RESOLUTION, fine_sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.fine_sleep = fine_sleep
+        self.spin_threshold = spin_threshold  # 最后这段时间改为自旋等待（秒）
+        self.timer_resolution = timer_resolution
+        self.start_time = 0.0
+
+    def start(self):
+        """以当前时间为起点开始新的一轮运行"""
+        self.start_time = self.clock()
+
+    def wait_until(self, deadline):
+        """等待到指定的截止时间，睡眠被打断时返回 WAIT_INTERRUPTED，否则返回 WAIT_DISPATCH"""
+        clock = self.clock
+        spin = self.spin_threshold
+        remaining = deadline - clock()
+        # 粗粒度睡眠可能晚醒一个定时器周期，预留这段时间与自旋的时间
+        coarse = spin + self.timer_resolution
+        while remaining > coarse:
+            if self.sleep(remaining - coarse):
+                return WAIT_INTERRUPTED
+            remaining = deadline - clock()
+        # 最后一个定时器周期内分段高精度睡眠，每段之后检查是否被打断
+        while remaining > spin:
+            if self.fine_sleep(min(remaining - spin, FINE_SLICE)) or self.sleep(0):
+                return WAIT_INTERRUPTED
+            remaining = deadline - clock()
+        # 自旋命中截止时间
+        while remaining > 0:
+            remaining = deadline - clock()
+        return WAIT_DISPATCH
@@ -0,0 +1,366 @@
+"""
+步骤表格的数据模型
+用 QAbstractTableModel 保存步骤，表格只为可见的行取数据，编辑时增量编译与校验；
+删除按钮由委托绘制并处理点击，不再为每行创建按钮控件，
+批量加载时一次性重置模型，数万步的宏加载与删除都不会卡顿
+"""
+import math
+from array import array
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+from key_table import resolve_chord
+from module.Step import Step
+from module.Timeline import MacroTimeline
+
+# 表格的列
+COLUMN_KEY = 0
+COLUMN_DELAY = 1
+COLUMN_RANDOM = 2
+COLUMN_HOLD = 3
+COLUMN_ACTION = 4
+
+HEADER_LABELS = ["按键", "延迟(s)", "随机波动(s)", "按住(s)", "操作"]
+
+# 新增步骤的默认值
+DEFAULT_ROW = ("a", "0.1", "0.1", "0")
+
+# 无效单元格的背景色
+ERROR_COLOR = QColor(255, 200, 200)
+
+
+class StepTableModel(QAbstractTableModel):
+    """步骤表格模型
+
+    按列保存每步的文本用于显示与编辑，同时维护编译好的时间轴各列：
+    每次修改单元格只解析这一格，无效的输入标记在该单元格上（背景色与提示），
+    启动或保存时直接取用已编译的数据，不再逐格解析
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._set_empty()
+
+    def _set_empty(self):
+        # 四列文本，与界面中可编辑的内容一致
+        self._keys = []
+        self._delays = []
+        self._randoms = []
+        self._holds = []
+        # 每格的错误信息，None 表示有效
+        self._errors = ([], [], [], [])
+        self.error_count = 0
+        # 编译结果：去重后的按键及其引用计数，与每步的按键编号、延迟、随机波动
+        self.key_names = []
+        self.key_codes = array('H')
+        self._key_index = {}
+        self._key_refs = []
+        self.key_ids = array('H')
+        self.delays = array('d')
+        self.random_offsets = array('d')
+        self.holds = array('d')
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADER_LABELS)
+
+    def _column(self, column):
+        return (self._keys, self._delays, self._randoms, self._holds)[column]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.column() == COLUMN_ACTION:
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self._column(index.column())[index.row()]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._errors[index.column()][index.row()]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if self._errors[index.column()][index.row()] is not None:
+                return ERROR_COLOR
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() == COLUMN_ACTION or role != Qt.ItemDataRole.EditRole:
+            return False
+        row, column = index.row(), index.column()
+        text = str(value).strip()
+        if column != COLUMN_KEY and _out_of_range(text):
+            # 负数、nan 与 inf 直接拒绝编辑，单元格保持原值
+            return False
+        self._column(column)[row] = text
+        if column == COLUMN_KEY:
+            self._release_key(row)
+            key_id, error = self._acquire_key(text)
+            self.key_ids[row] = key_id
+        else:
+            number, error = _parse_number(text, column)
+            (self.delays, self.random_offsets, self.holds)[column - COLUMN_DELAY][row] = number
+        self._set_error(row, column, error)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() != COLUMN_ACTION:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return HEADER_LABELS[section]
+        return str(section + 1)
+
+    # 增量编译
+
+    def _acquire_key(self, text):
+        """解析按键或组合键并增加引用计数，返回 (按键编号, 错误信息)"""
+        key_id = self._key_index.get(text)
+        if key_id is None:
+            try:
+                vk = resolve_chord(text)[-1]
+            except ValueError as e:
+                return 0, str(e)
+            key_id = self._key_index[text] = len(self.key_names)
+            self.key_names.append(text)
+            self.key_codes.append(vk)
+            self._key_refs.append(0)
+        self._key_refs[key_id] += 1
+        return key_id, None
+
+    def _release_key(self, row):
+        """该行原来的按键有效时减少其引用计数"""
+        if self._errors[COLUMN_KEY][row] is None:
+            self._key_refs[self.key_ids[row]] -= 1
+
+    def _set_error(self, row, column, error):
+        errors = self._errors[column]
+        self.error_count += (error is not None) - (errors[row] is not None)
+        errors[row] = error
+
+    def _append_compiled(self, key, delay, random_offset, hold):
+        """解析一行并追加到编译结果与错误列表"""
+        key_id, key_error = self._acquire_key(key)
+        delay, delay_error = _parse_number(delay, COLUMN_DELAY)
+        random_offset, random_error = _parse_number(random_offset, COLUMN_RANDOM)
+        hold, hold_error = _parse_number(hold, COLUMN_HOLD)
+        self.key_ids.append(key_id)
+        self.delays.append(delay)
+        self.random_offsets.append(random_offset)
+        self.holds.append(hold)
+        for column, error in enumerate((key_error, delay_error, random_error, hold_error)):
+            self._errors[column].append(error)
+            if error is not None:
+                self.error_count += 1
+
+    def _compact_keys(self):
+        """移除已不再使用的按键并重新编号"""
+        if 0 not in self._key_refs:
+            return
+        remap = {}
+        key_names, key_codes, key_refs = [], array('H'), []
+        for key_id, refs in enumerate(self._key_refs):
+            if refs:
+                remap[key_id] = len(key_names)
+                key_names.append(self.key_names[key_id])
+                key_codes.append(self.key_codes[key_id])
+                key_refs.append(refs)
+        key_errors = self._errors[COLUMN_KEY]
+        key_ids = self.key_ids
+        for row in range(len(key_ids)):
+            if key_errors[row] is None:
+                key_ids[row] = remap[key_ids[row]]
+        self.key_names, self.key_codes, self._key_refs = key_names, key_codes, key_refs
+        self._key_index = {name: key_id for key_id, name in enumerate(key_names)}
+
+    def error(self, row, column):
+        """单元格的错误信息，有效时为None"""
+        return self._errors[column][row]
+
+    def first_error(self):
+        """第一个无效的单元格，返回 (行, 列, 错误信息)，全部有效时返回None"""
+        if not self.error_count:
+            return None
+        for row in range(len(self._keys)):
+            for column in (COLUMN_KEY, COLUMN_DELAY, COLUMN_RANDOM, COLUMN_HOLD):
+                error = self._errors[column][row]
+                if error is not None:
+                    return row, column, error
+        return None
+
+    def _check_errors(self):
+        found = self.first_error()
+        if found is not None:
+            row, column, error = found
+            raise ValueError(f"第{row+1}行: {error}")
+
+    def timeline(self, loop_count=0, loop_time=0):
+        """返回当前步骤编译好的 MacroTimeline，存在无效单元格时抛出 ValueError
+        各列复制一份，之后的编辑不影响正在执行的时间轴
+        """
+        self._check_errors()
+        self._compact_keys()
+        holds = self.holds[:] if any(self.holds) else None
+        return MacroTimeline(tuple(self.key_names), self.key_codes[:], self.key_ids[:],
+                             self.delays[:], self.random_offsets[:],
+                             loop_count=loop_count, loop_time=loop_time, holds=holds)
+
+    # 批量操作
+
+    def set_rows(self, rows):
+        """批量替换全部步骤，rows 为 (按键, 延迟, 随机波动, 按住时长) 的可迭代对象，只重置一次模型"""
+        self.beginResetModel()
+        self._set_empty()
+        keys, delays, randoms, holds = self._keys, self._delays, self._randoms, self._holds
+        key_errors, delay_errors, random_errors, hold_errors = self._errors
+        key_ids, delay_values, random_values = self.key_ids, self.delays, self.random_offsets
+        hold_values = self.holds
+        key_index, key_refs = self._key_index, self._key_refs
+        for key, delay, random_offset, hold in rows:
+            key, delay, random_offset, hold = str(key), str(delay), str(random_offset), str(hold)
+            keys.append(key)
+            delays.append(delay)
+            randoms.append(random_offset)
+            holds.append(hold)
+            # 已解析过的按键直接取编号，其余情况与逐格编辑相同
+            key_id = key_index.get(key)
+            if key_id is None:
+                key_id, error = self._acquire_key(key)
+            else:
+                key_refs[key_id] += 1
+                error = None
+            key_ids.append(key_id)
+            key_errors.append(error)
+            try:
+                number = float(delay)
+            except ValueError:
+                number = math.nan
+            if 0 <= number < math.inf:
+                delay_values.append(number)
+                delay_errors.append(None)
+            else:
+                number, error = _parse_number(delay, COLUMN_DELAY)
+                delay_values.append(number)
+                delay_errors.append(error)
+            try:
+                number = float(random_offset)
+            except ValueError:
+                number = math.nan
+            if 0 <= number < math.inf:
+                random_values.append(number)
+                random_errors.append(None)
+            else:
+                number, error = _parse_number(random_offset, COLUMN_RANDOM)
+                random_values.append(number)
+                random_errors.append(error)
+            try:
+                number = float(hold)
+            except ValueError:
+                number = math.nan
+            if 0 <= number < math.inf:
+                hold_values.append(number)
+                hold_errors.append(None)
+            else:
+                number, error = _parse_number(hold, COLUMN_HOLD)
+                hold_values.append(number)
+                hold_errors.append(error)
+        self.error_count = sum(len(errors) - errors.count(None) for errors in self._errors)
+        self.endResetModel()
+
+    def set_steps(self, steps):
+        """批量替换为 Step 列表"""
+        self.set_rows((step.key, step.delay, step.random_offset, step.hold) for step in steps)
+
+    def clear(self):
+        self.set_rows(())
+
+    def append_row(self, key=DEFAULT_ROW[0], delay=DEFAULT_ROW[1], random_offset=DEFAULT_ROW[2],
+                   hold=DEFAULT_ROW[3]):
+        """在末尾添加一步，返回其行号"""
+        row = len(self._keys)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.append(str(key))
+        self._delays.append(str(delay))
+        self._randoms.append(str(random_offset))
+        self._holds.append(str(hold))
+        self._append_compiled(str(key), str(delay), str(random_offset), str(hold))
+        self.endInsertRows()
+        return row
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or count <= 0 or row + count > len(self._keys):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        for removed in range(row, row + count):
+            self._release_key(removed)
+        end = row + count
+        for column_errors in self._errors:
+            self.error_count -= sum(1 for error in column_errors[row:end] if error is not None)
+            del column_errors[row:end]
+        for column in (self._keys, self._delays, self._randoms, self._holds,
+                       self.key_ids, self.delays, self.random_offsets, self.holds):
+            del column[row:end]
+        self.endRemoveRows()
+        return True
+
+    def to_steps(self):
+        """返回 Step 列表，用于保存，存在无效单元格时抛出 ValueError"""
+        self._check_errors()
+        key_names = self.key_names
+        return [Step(key_names[key_id], delay, random_offset, hold)
+                for key_id, delay, random_offset, hold in zip(self.key_ids, self.delays,
+                                                              self.random_offsets, self.holds)]
+
+
+def _parse_number(text, column):
+    """解析延迟、随机波动或按住时长，返回 (数值, 错误信息)；负数、nan 与 inf 同样无效"""
+    name = {COLUMN_DELAY: "延迟时间", COLUMN_RANDOM: "随机波动"}.get(column, "按住时长")
+    try:
+        number = float(text)
+    except ValueError:
+        return 0.0, f"{name} '{text}' 不是有效的数字"
+    if not 0 <= number < math.inf:
+        return 0.0, f"{name} '{text}' 必须是非负的有限数值"
+    return number, None
+
+
+def _out_of_range(text):
+    """能解析为数字但为负数、nan 或 inf"""
+    try:
+        number = float(text)
+    except ValueError:
+        return False
+    return not 0 <= number < math.inf
+
+
+class DeleteButtonDelegate(QStyledItemDelegate):
+    """在操作列绘制删除按钮，点击时发出 delete_requested(行号)"""
+    delete_requested = pyqtSignal(int)
+
+    def __init__(self, text="删除", parent=None):
+        super().__init__(parent)
+        self.text = text
+
+    def _button_option(self, option):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = self.text
+        button.state = QStyle.StateFlag.State_Enabled
+        return button
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, self._button_option(option), painter)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and option.rect.contains(event.position().toPoint())):
+            self.delete_requested.emit(index.row())
+            return True
+        return False
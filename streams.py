@@ -0,0 +1,681 @@
+"""
+定时事件流
+执行器的调度线程与asyncio引擎都把键盘宏、鼠标连点等事件流放入同一个优先队列（StreamQueue），
+每次唤醒时把所有到期的事件按确定的顺序合并为一批发送
+"""
+import heapq
+import time
+from collections import deque
+from input_backend import EVENT_PRESS, EVENT_HOLD, EVENT_RELEASE, EVENT_CLICK
+from key_table import KEY_NAMES, MOUSE_BUTTONS
+from module.Program import OP_STEP, OP_REPEAT, OP_NEXT, OP_JUMP, OP_WAIT, OP_CALL, OP_RET
+from scheduler import TimingStats
+
+# 两个按键之间最多连续执行的控制指令数，超过时视为没有按键的死循环并结束运行
+MAX_CONTROL_OPS = 1_000_000
+# 每次唤醒最多处理的到期事件数，避免零延迟的无限循环宏一直占用调度线程
+MAX_BATCH_EVENTS = 256
+
+
+class EventStream:
+    """事件流基类
+    next_due 为下一个事件的计划时间（调度器时钟，秒），为None表示事件流已结束；
+    emit 把到期的事件追加到 events 并推进 next_due，events 为None时表示本次事件被跳过。
+    同一时刻到期时 priority 小的事件流先发送；所有 primary 事件流结束时本次运行结束；
+    skippable 为假的事件流落后时也不会被跳过
+    """
+    name = None
+    priority = 0
+    primary = False
+    skippable = True
+
+    def __init__(self, absolute=True):
+        self.absolute = absolute  # 是否按绝对截止时间推进
+        self.next_due = None
+        self.start_time = 0.0  # 开始运行的时间，随暂停平移，循环时长与速度统计不计入暂停
+        self.stats = TimingStats()
+
+    def start(self, now):
+        """以 now 为起点开始运行"""
+        self.stats.reset()
+        self.start_time = now
+        self.next_due = now
+
+    def shift(self, delta):
+        """整体平移时间轴，用于暂停后恢复"""
+        self.start_time += delta
+        if self.next_due is not None:
+            self.next_due += delta
+
+    def emit(self, events, now):
+        raise NotImplementedError
+
+    def _advance(self, now, delay):
+        """按延迟推进下一事件的计划时间"""
+        base = self.next_due if self.absolute else now
+        self.next_due = base + max(0.0, delay)
+
+
+class ReloadableStream(EventStream):
+    """可在运行中替换宏内容的事件流
+    swap 可在任意线程调用，新内容放入长度为1的队列（只保留最新的一次），
+    由调度线程在下一个循环边界取出替换，循环计数与时间轴保持连续
+    """
+
+    def __init__(self, absolute=True):
+        super().__init__(absolute)
+        self._pending = deque(maxlen=1)
+        self.on_swap = None  # 替换完成时调用 on_swap(事件流, 检测时间, 编译完成时间, 替换时间)
+        self.holds = None  # HoldStream，组合键与按住的步骤在此登记释放时间
+        self.hold_events = None  # 每个按键的 (按下事件, 释放事件)，宏中没有组合键与按住时为None
+
+    def swap(self, macro, detected=None, compiled=None):
+        """请求在下一个循环边界替换宏内容，detected/compiled 为检测到修改与编译完成的时间"""
+        self._pending.append((macro, detected, compiled))
+
+    def _apply_pending(self, now):
+        """在循环边界替换为最新请求的宏内容"""
+        try:
+            macro, detected, compiled = self._pending.pop()
+        except IndexError:
+            return
+        self._replace(macro)
+        if self.on_swap is not None:
+            self.on_swap(self, detected, compiled, now)
+
+    def _replace(self, macro):
+        raise NotImplementedError
+
+    def _set_hold_events(self, timeline):
+        self.hold_events = _hold_events(timeline) if timeline.has_holds else None
+
+    def _press_held(self, events, timeline, i, now):
+        """发送组合键或按住的一步：全部按下事件一起发送，释放事件登记到 holds 按时到期发送"""
+        key_id = timeline.key_ids[i]
+        hold = timeline.holds[i] if timeline.holds is not None else 0.0
+        downs, ups = self.hold_events[key_id]
+        if hold <= 0 and len(downs) == 1:
+            events.append(self.key_events[key_id])
+            return
+        events.extend(downs)
+        if self.holds is None:
+            # 没有释放事件流时立即释放
+            events.extend(ups)
+        else:
+            base = self.next_due if self.absolute else now
+            self.holds.hold(base + hold, ups)
+
+
+class MacroStream(ReloadableStream):
+    """按键宏事件流，按时间轴依次发送按键，支持循环次数与循环时长"""
+    name = 'keyboard'
+    priority = 0
+    primary = True
+
+    def __init__(self, timeline, sampler, absolute=True, loop_count=0, loop_time=0):
+        super().__init__(absolute)
+        self.timeline = timeline
+        self.sampler = sampler  # 随机波动噪声的采样器
+        self.loop_count = loop_count
+        self.loop_time = loop_time
+        self.loops = 0  # 已完成的循环次数
+        self.index = 0  # 下一步在时间轴中的下标
+        self.key_events = _key_events(timeline)
+        self._set_hold_events(timeline)
+        self._noise = sampler.next_block()
+        self._noise_index = 0
+
+    def start(self, now):
+        super().start(now)
+        self.loops = 0
+        self.index = 0
+        if len(self.timeline) == 0:
+            self.next_due = None
+
+    def emit(self, events, now):
+        timeline = self.timeline
+        i = self.index
+        if events is not None:
+            if self.hold_events is None:
+                events.append(self.key_events[timeline.key_ids[i]])
+            else:
+                self._press_held(events, timeline, i, now)
+
+        # 随机波动按块预先生成，这里只做一次乘加
+        offset = timeline.random_offsets[i]
+        if offset > 0:
+            if self._noise_index == len(self._noise):
+                self._noise = self.sampler.next_block()
+                self._noise_index = 0
+            self._advance(now, timeline.delays[i] + offset * self._noise[self._noise_index])
+            self._noise_index += 1
+        else:
+            self._advance(now, timeline.delays[i])
+
+        i += 1
+        if i == len(timeline):
+            i = 0
+            self.loops += 1
+            if self.loop_count and self.loops >= self.loop_count:
+                self.next_due = None
+            elif self.loop_time and now - self.start_time >= self.loop_time:
+                self.next_due = None
+            elif self._pending:
+                self._apply_pending(now)
+        self.index = i
+
+    def _replace(self, timeline):
+        self.timeline = timeline
+        self.key_events = _key_events(timeline)
+        self._set_hold_events(timeline)
+
+
+class SourceStream(ReloadableStream):
+    """流式按键宏事件流
+    source 每次迭代从头产出 (虚拟键码, 延迟, 随机波动)，如 JsonlSource，
+    执行时只保留当前一步，读完一轮后重新迭代开始下一轮。
+    按键无法预先校验，supports 为输入后端的 supports，每个按键第一次读到时检查
+    """
+    name = 'keyboard'
+    priority = 0
+    primary = True
+
+    def __init__(self, source, sampler, absolute=True, loop_count=0, loop_time=0, supports=None):
+        super().__init__(absolute)
+        self.source = source
+        self.sampler = sampler
+        self.supports = supports
+        self.loop_count = loop_count
+        self.loop_time = loop_time
+        self.loops = 0
+        self.index = 0  # 当前一步在本轮中的序号
+        self._events = {}  # 虚拟键码 -> 预先构建的事件
+        self.error = None  # 读取出错时的异常，出错后本次运行结束
+        self._iter = None
+        self._current = None
+        self._noise = sampler.next_block()
+        self._noise_index = 0
+
+    def start(self, now):
+        super().start(now)
+        self.loops = 0
+        self.index = 0
+        self.error = None
+        self._iter = iter(self.source)
+        self._current = self._next_item()
+        if self._current is None:
+            self.next_due = None
+
+    def _next_item(self):
+        """读取下一步，读取出错或遇到输入后端不支持的按键时打印错误并视为结束"""
+        try:
+            item = next(self._iter, None)
+            if item is not None and item[0] not in self._events:
+                vk = item[0]
+                if vk in MOUSE_BUTTONS:
+                    self._events[vk] = (EVENT_CLICK, MOUSE_BUTTONS[vk])
+                elif self.supports is None or self.supports(vk):
+                    self._events[vk] = (EVENT_PRESS, vk)
+                else:
+                    raise ValueError(f"当前输入模式不支持按键: {KEY_NAMES[vk]}")
+            return item
+        except ValueError as e:
+            print(f"读取宏失败: {e}")
+            self.error = e
+            return None
+
+    def emit(self, events, now):
+        vk, delay, offset = self._current
+        if events is not None:
+            events.append(self._events[vk])
+
+        if offset > 0:
+            if self._noise_index == len(self._noise):
+                self._noise = self.sampler.next_block()
+                self._noise_index = 0
+            self._advance(now, delay + offset * self._noise[self._noise_index])
+            self._noise_index += 1
+        else:
+            self._advance(now, delay)
+
+        self.index += 1
+        self._current = self._next_item()
+        if self._current is None:
+            self.index = 0
+            self.loops += 1
+            if self.error is not None:
+                self.next_due = None
+            elif self.loop_count and self.loops >= self.loop_count:
+                self.next_due = None
+            elif self.loop_time and now - self.start_time >= self.loop_time:
+                self.next_due = None
+            else:
+                if self._pending:
+                    self._apply_pending(now)
+                self._iter = iter(self.source)
+                self._current = self._next_item()
+                if self._current is None:
+                    self.next_due = None
+
+
+    def _replace(self, source):
+        self.source = source
+
+
+class ProgramStream(ReloadableStream):
+    """控制流宏事件流，解释执行 MacroProgram 的字节码
+    每次发送一个按键后连续执行控制指令，直到下一个按键步骤，
+    重复计数与返回地址各用一个栈保存，深度不超过宏文件中的嵌套层数
+    """
+    name = 'keyboard'
+    priority = 0
+    primary = True
+
+    def __init__(self, program, sampler, absolute=True, loop_count=0, loop_time=0):
+        super().__init__(absolute)
+        self.program = program
+        self.sampler = sampler
+        self.loop_count = loop_count
+        self.loop_time = loop_time
+        self.pass_start = 0.0  # 本轮开始的计划时间，wait_until 以此为起点
+        self.loops = 0
+        self.index = 0  # 下一步在时间轴中的下标
+        self.error = None  # 出现没有按键的死循环时的错误信息
+        self.key_events = _key_events(program.timeline)
+        self._set_hold_events(program.timeline)
+        self._ops = program.ops
+        self._args = program.args
+        self._pc = 0
+        self._counters = []  # 进行中的重复块剩余次数
+        self._returns = []   # 子程序返回地址
+        self._noise = sampler.next_block()
+        self._noise_index = 0
+
+    def start(self, now):
+        super().start(now)
+        self.pass_start = now
+        self.loops = 0
+        self.error = None
+        self._pc = 0
+        self._counters.clear()
+        self._returns.clear()
+        self._run(now)
+
+    def shift(self, delta):
+        # wait_until 以本轮开始的时间为起点，暂停的时长不计入
+        super().shift(delta)
+        self.pass_start += delta
+
+    def emit(self, events, now):
+        timeline = self.program.timeline
+        i = self.index
+        if events is not None:
+            if self.hold_events is None:
+                events.append(self.key_events[timeline.key_ids[i]])
+            else:
+                self._press_held(events, timeline, i, now)
+
+        offset = timeline.random_offsets[i]
+        if offset > 0:
+            if self._noise_index == len(self._noise):
+                self._noise = self.sampler.next_block()
+                self._noise_index = 0
+            self._advance(now, timeline.delays[i] + offset * self._noise[self._noise_index])
+            self._noise_index += 1
+        else:
+            self._advance(now, timeline.delays[i])
+
+        # 下一条指令就是按键步骤时不进入解释循环
+        pc = self._pc
+        if self._ops[pc] == OP_STEP:
+            self.index = self._args[pc]
+            self._pc = pc + 1
+        else:
+            self._run(now)
+
+    def _run(self, now):
+        """从当前位置执行控制指令，停在下一个按键步骤，或在运行结束时把 next_due 置为None"""
+        program = self.program
+        ops, args = self._ops, self._args
+        counters, returns = self._counters, self._returns
+        pc = self._pc
+        for _ in range(MAX_CONTROL_OPS):
+            op = ops[pc]
+            if op == OP_STEP:
+                self.index = args[pc]
+                self._pc = pc + 1
+                return
+            if op == OP_NEXT:
+                counters[-1] -= 1
+                if counters[-1]:
+                    pc = args[pc]
+                else:
+                    counters.pop()
+                    pc += 1
+            elif op == OP_REPEAT:
+                counters.append(args[pc])
+                pc += 1
+            elif op == OP_JUMP:
+                pc = args[pc]
+            elif op == OP_WAIT:
+                deadline = self.pass_start + program.constants[args[pc]]
+                if deadline > self.next_due:
+                    self.next_due = deadline
+                pc += 1
+            elif op == OP_CALL:
+                returns.append(pc + 1)
+                pc = args[pc]
+            elif op == OP_RET:
+                pc = returns.pop()
+            else:
+                # OP_END：一轮结束
+                self.loops += 1
+                if self.loop_count and self.loops >= self.loop_count:
+                    self.next_due = None
+                    return
+                if self.loop_time and now - self.start_time >= self.loop_time:
+                    self.next_due = None
+                    return
+                if self._pending:
+                    self._apply_pending(now)
+                    program = self.program
+                    ops, args = self._ops, self._args
+                counters.clear()
+                returns.clear()
+                self.pass_start = self.next_due
+                pc = 0
+        self.error = f"连续执行了{MAX_CONTROL_OPS}条控制指令而没有按键，请检查跳转与重复块"
+        print(f"宏执行出错: {self.error}")
+        self.next_due = None
+
+    def _replace(self, program):
+        self.program = program
+        self.key_events = _key_events(program.timeline)
+        self._set_hold_events(program.timeline)
+        self._ops = program.ops
+        self._args = program.args
+
+
+class HoldStream(EventStream):
+    """按住按键的释放事件流
+    按键宏发送按下事件时登记释放时间，到期时发送释放事件；held 记录当前按住的按键及其按住次数，
+    同一按键被重叠按住时最后一次到期才释放。释放不会因落后而跳过，停止时由 release_all 立即全部释放。
+    登记的释放时间早于当前 next_due 时置位 rescheduled，由调度线程重新放入队列
+    """
+    name = 'hold'
+    priority = -1  # 同一时刻先释放再按下，同一按键的按住可以首尾相接
+    skippable = False
+
+    def __init__(self):
+        super().__init__(absolute=True)
+        self.held = {}  # 虚拟键码 -> 按住次数
+        self.rescheduled = False
+        self._releases = []  # (释放时间, 序号, 释放事件)
+        self._seq = 0
+
+    def start(self, now):
+        super().start(now)
+        self.held.clear()
+        self._releases.clear()
+        self.rescheduled = False
+        self.next_due = None
+
+    @property
+    def pending(self):
+        """是否还有未到期的释放"""
+        return bool(self._releases)
+
+    def shift(self, delta):
+        super().shift(delta)
+        self._releases = [(due + delta, seq, ups) for due, seq, ups in self._releases]
+
+    def hold(self, due, ups):
+        """登记一组在 due 时释放的按键"""
+        held = self.held
+        for event in ups:
+            held[event[1]] = held.get(event[1], 0) + 1
+        heapq.heappush(self._releases, (due, self._seq, ups))
+        self._seq += 1
+        if self.next_due is None or due < self.next_due:
+            self.next_due = due
+            self.rescheduled = True
+
+    def emit(self, events, now):
+        due, seq, ups = heapq.heappop(self._releases)
+        held = self.held
+        for event in ups:
+            count = held.get(event[1], 0)
+            if count > 1:
+                held[event[1]] = count - 1
+            elif count:
+                del held[event[1]]
+                events.append(event)
+        self.next_due = self._releases[0][0] if self._releases else None
+
+    def suspend(self):
+        """暂停时调用，返回 (释放当前按住的按键的事件, 恢复时按原顺序重新按下的事件)
+        按住次数与释放时间不变，释放时间随暂停一起平移
+        """
+        ups = [(EVENT_RELEASE, vk) for vk in self.held]
+        downs = [(EVENT_HOLD, vk) for vk in reversed(self.held)]
+        return ups, downs
+
+    def release_all(self):
+        """取消全部未到期的释放，返回释放当前按住的所有按键的事件列表"""
+        events = [(EVENT_RELEASE, vk) for vk in self.held]
+        self.held.clear()
+        self._releases.clear()
+        self.next_due = None
+        return events
+
+
+class ClickStream(EventStream):
+    """鼠标连点事件流，以目标点击速度（次/秒）按绝对截止时间点击
+    jitter 为间隔的随机波动比例（0~1），is_enabled 返回假时跳过点击但保持节奏
+    """
+    name = 'mouse'
+    priority = 1
+
+    def __init__(self, cps=20, button='left', jitter=0.0, sampler=None, is_enabled=None):
+        # 连点速度依赖准确的间隔，始终使用绝对截止时间
+        super().__init__(absolute=True)
+        self.cps = cps
+        self.interval = 1.0 / cps
+        self.button = button
+        self.jitter = jitter
+        self.sampler = sampler  # 间隔随机波动的噪声采样器，jitter 为0时可为None
+        self.is_enabled = is_enabled
+        self.clicks = 0  # 已发送的点击次数
+        self._noise = sampler.next_block() if sampler is not None else None
+        self._noise_index = 0
+
+    def start(self, now):
+        super().start(now)
+        self.clicks = 0
+
+    def achieved_cps(self, now):
+        """从开始到 now 实际达到的点击速度（次/秒）"""
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.clicks / elapsed
+
+    def emit(self, events, now):
+        if events is not None and (self.is_enabled is None or self.is_enabled()):
+            events.append((EVENT_CLICK, self.button))
+            self.clicks += 1
+        if self.jitter > 0 and self._noise is not None:
+            if self._noise_index == len(self._noise):
+                self._noise = self.sampler.next_block()
+                self._noise_index = 0
+            self._advance(now, self.interval * (1.0 + self.jitter * self._noise[self._noise_index]))
+            self._noise_index += 1
+        else:
+            self._advance(now, self.interval)
+
+
+class StreamQueue:
+    """多个事件流共用的优先队列，执行器的调度线程与asyncio引擎共用同一套出队、统计与发送逻辑
+
+    元素为 (计划时间, 优先级, 序号, 事件流)，保证同时到期时顺序确定。
+    collect 取出到期的事件合并为一批，skip_late 为真时落后超过 max_lag 的可跳过事件被丢弃；
+    send 把一批事件交给输入后端，metrics 不为None时记录后端调用耗时，
+    并以后端调用返回后的时间逐事件记录定时误差
+    """
+
+    def __init__(self, streams, backend, clock=time.perf_counter, skip_late=False, max_lag=0.05,
+                 metrics=None):
+        self.streams = streams
+        self.backend = backend
+        self.clock = clock
+        self.skip_late = skip_late
+        self.max_lag = max_lag
+        self.metrics = metrics
+        self.backend_name = backend.name or type(backend).__name__
+        self._handlers = (backend.press, backend.hold, backend.release, backend.click)
+        self.holds = next((stream for stream in streams if isinstance(stream, HoldStream)), None)
+        self._hold_seq = streams.index(self.holds) if self.holds is not None else 0
+        self._has_primary = any(stream.primary for stream in streams)
+        self._primaries = 0  # 剩余的主事件流数量
+        self._queue = []
+        self._events = []
+        self._timed = []  # 本批要记录定时误差的 (事件流名, 按键, 计划时间)，发送后记录
+
+    def start(self, now):
+        """以 now 为起点启动全部事件流并建立队列"""
+        queue = []
+        for seq, stream in enumerate(self.streams):
+            stream.start(now)
+            if stream.next_due is not None:
+                queue.append((stream.next_due, stream.priority, seq, stream))
+        heapq.heapify(queue)
+        self._queue = queue
+        self._primaries = sum(1 for entry in queue if entry[3].primary)
+
+    @property
+    def active(self):
+        """是否还要继续调度：主事件流未全部结束（没有主事件流时一直运行到停止），或仍有按键等待释放"""
+        holds = self.holds
+        return bool(self._queue) and bool(
+            self._primaries or not self._has_primary or (holds is not None and holds.pending))
+
+    @property
+    def next_due(self):
+        """最早到期的计划时间"""
+        return self._queue[0][0]
+
+    def shift(self, delta):
+        """暂停后平移所有计划时间，相对顺序不变，队列仍然有效"""
+        for stream in self.streams:
+            stream.shift(delta)
+        self._queue = [(due + delta, priority, seq, stream)
+                       for due, priority, seq, stream in self._queue]
+
+    def collect(self, now):
+        """取出 now 之前到期的事件，返回本批要发送的事件列表（下次调用时复用）"""
+        queue = self._queue
+        events = self._events
+        events.clear()
+        timed = self._timed
+        timed.clear()
+        metrics = self.metrics
+        skip_late = self.skip_late
+        max_lag = self.max_lag
+        popped = 0
+        while queue and queue[0][0] <= now and popped < MAX_BATCH_EVENTS:
+            popped += 1
+            due, priority, seq, stream = heapq.heappop(queue)
+            if due != stream.next_due:
+                # 事件流的计划时间已提前并重新入队，这一项作废
+                continue
+            error = now - due
+            if skip_late and error > max_lag and stream.skippable:
+                stream.stats.skipped += 1
+                stream.emit(None, now)
+            else:
+                stream.stats.add(error)
+                count = len(events)
+                stream.emit(events, now)
+                if metrics is not None and len(events) > count:
+                    timed.append((stream.name, events[-1][1], due))
+            if stream.next_due is not None:
+                heapq.heappush(queue, (stream.next_due, priority, seq, stream))
+            elif stream.primary:
+                self._primaries -= 1
+        # 本批按下的按键登记了更早的释放时间，下一次唤醒发送，按下与释放各为一批
+        holds = self.holds
+        if holds is not None and holds.rescheduled:
+            holds.rescheduled = False
+            heapq.heappush(queue, (holds.next_due, holds.priority, self._hold_seq, holds))
+        return events
+
+    def send(self, events):
+        """把一批事件交给输入后端，返回发送的事件数"""
+        if not events:
+            return 0
+        metrics = self.metrics
+        if metrics is not None:
+            call_start = self.clock()
+        if len(events) == 1:
+            event_type, arg = events[0]
+            self._handlers[event_type](arg)
+        else:
+            self.backend.batch(events)
+        if metrics is not None:
+            sent = self.clock()
+            metrics.record_call(self.backend_name, sent - call_start, len(events))
+            if events is self._events:
+                # 定时误差按事件实际交给系统的时间计算，包含后端调用本身的耗时
+                for name, key, due in self._timed:
+                    metrics.record_event(name, key, due, sent)
+                self._timed.clear()
+        return len(events)
+
+    def suspend(self):
+        """暂停时调用，返回 (释放当前按住按键的事件, 恢复时重新按下的事件)"""
+        if self.holds is None:
+            return (), ()
+        return self.holds.suspend()
+
+    def release_all(self):
+        """停止或出错时调用，返回立即释放仍按住的按键的事件"""
+        if self.holds is None or not self.holds.held:
+            return []
+        return self.holds.release_all()
+
+
+def reload_latency(detected, compiled, now):
+    """热重载各阶段的耗时：解析、等待循环边界与总计（秒），未提供的时间按 now 计"""
+    compiled = now if compiled is None else compiled
+    detected = compiled if detected is None else detected
+    return {
+        'parse': compiled - detected,
+        'wait': now - compiled,
+        'total': now - detected,
+    }
+
+
+def check_supported(backend, timeline):
+    """确认输入后端支持时间轴中的全部按键，否则抛出ValueError"""
+    unsupported = [name for name, chord in zip(timeline.key_names, timeline.chords)
+                   if any(vk not in MOUSE_BUTTONS and not backend.supports(vk) for vk in chord)]
+    if unsupported:
+        raise ValueError(f"当前输入模式不支持以下按键: {', '.join(unsupported)}")
+
+
+def _hold_events(timeline):
+    """每个按键预先构建 (按下事件, 释放事件)，组合键按书写顺序按下、逆序释放；
+    鼠标按钮不能按住，在按下时点击"""
+    result = []
+    for chord in timeline.chords:
+        downs = tuple((EVENT_CLICK, MOUSE_BUTTONS[vk]) if vk in MOUSE_BUTTONS
+                      else (EVENT_HOLD, vk) for vk in chord)
+        ups = tuple((EVENT_RELEASE, vk) for vk in reversed(chord) if vk not in MOUSE_BUTTONS)
+        result.append((downs, ups))
+    return tuple(result)
+
+
+def _key_events(timeline):
+    """每个按键预先构建好事件，执行时按编号取用；鼠标按钮转为点击事件"""
+    return tuple((EVENT_CLICK, MOUSE_BUTTONS[vk]) if vk in MOUSE_BUTTONS
+                 else (EVENT_PRESS, vk) for vk in timeline.key_codes)
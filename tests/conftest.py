@@ -0,0 +1,45 @@
+"""测试共用的假时钟与假user32，不依赖Windows与真实的时间流逝"""
+import pytest
+from game_input_sendinput import INPUT_MOUSE
+
+
+class FakeClock:
+    """只在睡眠时前进的时钟，每次读取前进 tick 秒，保证调度器的自旋等待能够结束"""
+
+    def __init__(self, tick=1e-5):
+        self.now = 0.0
+        self.tick = tick
+
+    def __call__(self):
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        return False
+
+
+class FakeUser32:
+    """记录每次SendInput调用的 (类型, wVk, wScan, dwFlags) 列表，鼠标事件的 wVk/wScan 为0"""
+
+    def __init__(self):
+        self.calls = []
+
+    def SendInput(self, n_inputs, input_arr, size):
+        self.calls.append([(inp.type, 0, 0, inp.union.mi.dwFlags) if inp.type == INPUT_MOUSE else
+                           (inp.type, inp.union.ki.wVk, inp.union.ki.wScan, inp.union.ki.dwFlags)
+                           for inp in input_arr[:n_inputs]])
+        return n_inputs
+
+    def GetSystemMetrics(self, index):
+        return (1920, 1080)[index]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def user32():
+    return FakeUser32()
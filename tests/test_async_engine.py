@@ -0,0 +1,146 @@
+import threading
+import time
+import pytest
+from async_engine import STATE_FINISHED, STATE_STOPPED, AsyncMacroEngine
+from input_backend import EVENT_HOLD, EVENT_PRESS, EVENT_RELEASE, RecordingBackend
+from key_table import VK_CODE
+from metrics import TimingMetrics
+from module.Step import Step
+from module.Timeline import compile_steps
+from scheduler import LATE_SKIP
+
+
+class SlowBackend(RecordingBackend):
+    """每次按键睡眠 delay 秒的阻塞后端，记录调用所在的线程"""
+    blocking = True
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.threads = set()
+
+    def press(self, key):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        super().press(key)
+
+
+class PartialBackend(RecordingBackend):
+    def supports(self, vk):
+        return vk != VK_CODE['b']
+
+
+def test_runs_macros_concurrently():
+    a = RecordingBackend()
+    b = RecordingBackend()
+    engine = AsyncMacroEngine()
+    first = engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=5), backend=a)
+    second = engine.add_macro(compile_steps([Step('b', 0.01, 0)], loop_count=3), backend=b)
+    engine.run()
+    assert [arg for _, _, arg in a.events] == [VK_CODE['a']] * 5
+    assert [arg for _, _, arg in b.events] == [VK_CODE['b']] * 3
+    assert first.state == second.state == STATE_FINISHED
+
+
+def test_pause_releases_held_keys():
+    backend = RecordingBackend()
+    engine = AsyncMacroEngine(backend=backend)
+    macro = engine.add_macro(compile_steps([Step('shift', 0.05, 0, hold=0.3), Step('a', 1.0, 0)],
+                                           loop_count=1))
+    engine.start()
+    try:
+        time.sleep(0.1)
+        macro.pause()
+        time.sleep(0.1)
+        macro.resume()
+        assert macro.done.wait(5)
+    finally:
+        engine.shutdown()
+    shift, a = VK_CODE['shift'], VK_CODE['a']
+    assert [(event_type, arg) for _, event_type, arg in backend.events] == [
+        (EVENT_HOLD, shift), (EVENT_PRESS, a), (EVENT_RELEASE, shift), (EVENT_HOLD, shift),
+        (EVENT_RELEASE, shift)]
+    times = [t for t, _, _ in backend.events]
+    # 剩余的按住时间在恢复后继续计算
+    assert times[4] - times[0] - (times[3] - times[2]) > 0.29
+
+
+def test_stop_while_paused_releases_once():
+    backend = RecordingBackend()
+    engine = AsyncMacroEngine(backend=backend)
+    macro = engine.add_macro(compile_steps([Step('shift', 0.05, 0, hold=0.3), Step('a', 1.0, 0)]))
+    engine.start()
+    try:
+        time.sleep(0.1)
+        macro.pause()
+        time.sleep(0.05)
+        macro.stop()
+        assert macro.done.wait(5)
+    finally:
+        engine.shutdown()
+    assert [event_type for _, event_type, _ in backend.events] == \
+        [EVENT_HOLD, EVENT_PRESS, EVENT_RELEASE]
+    assert macro.state == STATE_STOPPED
+
+
+def test_blocking_backend_does_not_stall_other_macros():
+    slow = SlowBackend(0.05)
+    fast = RecordingBackend()
+    engine = AsyncMacroEngine()
+    engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=5), backend=slow)
+    second = engine.add_macro(compile_steps([Step('b', 0.01, 0)], loop_count=20), backend=fast)
+    engine.run()
+    assert len(slow.events) == 5 and len(fast.events) == 20
+    assert threading.get_ident() not in slow.threads
+    # 阻塞调用不在事件循环线程中执行，另一个宏的定时不受影响
+    assert second.timing_stats.max < 0.02
+
+
+def test_skip_late_policy():
+    backend = SlowBackend(0.05)
+    engine = AsyncMacroEngine(backend=backend, late_policy=LATE_SKIP, max_lag=0.02)
+    macro = engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=10))
+    engine.run()
+    stats = macro.timing_stats
+    assert stats.skipped > 0
+    assert stats.count + stats.skipped == 10 == len(backend.events) + stats.skipped
+
+
+def test_reload_at_loop_boundary():
+    backend = RecordingBackend()
+    engine = AsyncMacroEngine(backend=backend)
+    macro = engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=3))
+    macro.reload(compile_steps([Step('b', 0.01, 0)]))
+    with pytest.raises(ValueError, match="切换"):
+        macro.reload(object())
+    engine.run()
+    assert [arg for _, _, arg in backend.events] == [VK_CODE['a'], VK_CODE['b'], VK_CODE['b']]
+    assert macro.reloads == 1 and macro.summary()['reloads'] == 1
+
+
+def test_metrics_recorded_per_macro():
+    metrics = TimingMetrics()
+    engine = AsyncMacroEngine(backend=RecordingBackend())
+    engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=3), metrics=metrics)
+    engine.run()
+    assert metrics.errors[('keyboard', VK_CODE['a'])].count == 3
+    assert metrics.backend_events['recording'] == 3
+
+
+def test_unsupported_key_rejected():
+    engine = AsyncMacroEngine(backend=PartialBackend())
+    with pytest.raises(ValueError, match="b"):
+        engine.add_macro(compile_steps([Step('a', 0.01, 0), Step('b', 0.01, 0)]))
+    assert engine.macros == []
+
+
+def test_spins_only_within_spin_threshold():
+    # 模拟Windows的粗粒度定时器：最后一个定时器周期分段睡眠，不占满事件循环线程
+    engine = AsyncMacroEngine(backend=RecordingBackend(), spin_threshold=0.0005,
+                              timer_resolution=0.016)
+    macro = engine.add_macro(compile_steps([Step('a', 0.01, 0)], loop_count=30))
+    wall, cpu = time.perf_counter(), time.thread_time()
+    engine.run()
+    wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+    assert macro.events == 30
+    assert cpu < 0.5 * wall
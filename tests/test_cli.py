@@ -0,0 +1,16 @@
+import json
+import pytest
+from cli import load_settings
+
+
+def test_load_settings_skips_steps(tmp_path):
+    path = tmp_path / 'macro.json'
+    path.write_text(json.dumps({'steps': [], 'seed': 3}), encoding='utf-8')
+    assert load_settings(str(path)) == {'seed': 3}
+
+
+def test_load_settings_rejects_non_object(tmp_path):
+    path = tmp_path / 'macro.json'
+    path.write_text('[]', encoding='utf-8')
+    with pytest.raises(ValueError, match='宏文件必须是JSON对象'):
+        load_settings(str(path))
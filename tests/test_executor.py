@@ -0,0 +1,269 @@
+import math
+import threading
+import time
+import pytest
+from executor import MacroExecutor
+from input_backend import EVENT_HOLD, EVENT_PRESS, EVENT_RELEASE, RecordingBackend
+from key_table import VK_CODE
+from metrics import TimingMetrics
+from module.Humanize import DelaySampler
+from module.MacroFile import JsonlSource, save_macro
+from module.Program import compile_program
+from module.Step import Step
+from module.Timeline import compile_steps
+from scheduler import DeadlineScheduler, WAIT_DISPATCH, WAIT_INTERRUPTED
+
+
+class PauseAt:
+    """注入执行器的睡眠函数：假时钟到达 at 时暂停，由另一线程在假时钟上经过 duration 后恢复"""
+
+    def __init__(self, executor, clock, at, duration, then='resume'):
+        self.executor = executor
+        self.clock = clock
+        self.at = at
+        self.duration = duration
+        self.then = then  # 经过 duration 后调用的控制操作
+        self.done = False
+
+    def __call__(self, seconds):
+        if self.done or self.clock.now + seconds < self.at:
+            return self.clock.sleep(seconds)
+        self.done = True
+        self.clock.now = self.at
+        self.executor.pause()
+        threading.Thread(target=self._resume, daemon=True).start()
+        return True
+
+    def _resume(self):
+        # 调度线程进入暂停后才推进时钟，暂停时长是确定的
+        while 'pause' not in self.executor.control_latency:
+            time.sleep(0.001)
+        self.clock.now += self.duration
+        getattr(self.executor, self.then)()
+
+
+def make_executor(clock, steps, pause_at=None, pause_for=0.0, **loop):
+    executor = MacroExecutor(clock=clock, sleep=clock.sleep)
+    if pause_at is not None:
+        executor.sleep = PauseAt(executor, clock, pause_at, pause_for)
+    backend = RecordingBackend(clock=clock)
+    executor.set_backend(backend)
+    executor.set_precise_timing(True)
+    executor.load_steps(steps, **loop)
+    return executor, backend
+
+
+def run(executor):
+    executor.start()
+    executor.thread.join(5)
+    assert not executor.thread.is_alive()
+
+
+def test_run_follows_timeline(clock):
+    steps = [Step('a', 0.1, 0), Step('b', 0.2, 0)]
+    executor, backend = make_executor(clock, steps, loop_count=2)
+    run(executor)
+    assert [arg for _, _, arg in backend.events] == [VK_CODE['a'], VK_CODE['b']] * 2
+    assert [t for t, _, _ in backend.events] == pytest.approx([0.0, 0.1, 0.3, 0.4], abs=1e-3)
+
+
+def test_finished_run_clears_running(clock):
+    executor, backend = make_executor(clock, [Step('a', 0.1, 0)], loop_count=1)
+    run(executor)
+    assert not executor.running and not executor.paused
+    # 正常结束后可以直接再次启动，而不是被当作暂停
+    run(executor)
+    assert [arg for _, _, arg in backend.events] == [VK_CODE['a']] * 2
+
+
+def test_pause_shifts_timeline(clock):
+    steps = [Step('a', 0.1, 0), Step('b', 0.1, 0), Step('c', 0.1, 0)]
+    executor, backend = make_executor(clock, steps, pause_at=0.15, pause_for=1.0, loop_count=1)
+    run(executor)
+    assert [event_type for _, event_type, _ in backend.events] == [EVENT_PRESS] * 3
+    # 暂停前后的间隔不变，恢复时不补发
+    assert [t for t, _, _ in backend.events] == pytest.approx([0.0, 0.1, 1.2], abs=1e-3)
+    assert executor.timing_stats.max < 1e-3
+
+
+def test_scheduler_wait_interrupted(clock):
+    scheduler = DeadlineScheduler(clock=clock, sleep=lambda seconds: True)
+    scheduler.start()
+    assert scheduler.wait_until(clock.now + 1.0) == WAIT_INTERRUPTED
+
+
+def test_scheduler_wait_spins_to_deadline(clock):
+    scheduler = DeadlineScheduler(clock=clock, sleep=clock.sleep)
+    scheduler.start()
+    deadline = clock.now + 0.5
+    assert scheduler.wait_until(deadline) == WAIT_DISPATCH
+    assert deadline <= clock.now < deadline + 1e-3
+
+
+class PartialBackend(RecordingBackend):
+    """不支持指定按键的记录后端"""
+
+    def __init__(self, clock, unsupported):
+        super().__init__(clock)
+        self.unsupported = unsupported
+
+    def supports(self, vk):
+        return vk != self.unsupported
+
+
+class FailingBackend(RecordingBackend):
+    def press(self, key):
+        raise RuntimeError("backend failed")
+
+
+class SlowBackend(RecordingBackend):
+    """每次按键调用耗时5毫秒的记录后端"""
+
+    def press(self, key):
+        super().press(key)
+        self.clock.now += 0.005
+
+
+def test_timing_error_includes_backend_call(clock):
+    executor, _ = make_executor(clock, [Step('a', 0.1, 0)], loop_count=2)
+    executor.set_backend(SlowBackend(clock=clock))
+    executor.set_metrics(TimingMetrics(clock=clock))
+    run(executor)
+    histogram = executor.metrics.errors[('keyboard', VK_CODE['a'])]
+    # 定时误差按后端调用返回后的时间计算
+    assert histogram.count == 2
+    assert histogram.min >= 0.005
+
+
+def test_source_stops_at_unsupported_key(clock, tmp_path, capsys):
+    path = tmp_path / 'macro.jsonl'
+    save_macro(path, compile_steps([Step('a', 0.1, 0), Step('b', 0.1, 0), Step('a', 0.1, 0)]))
+    executor = MacroExecutor(clock=clock, sleep=clock.sleep)
+    backend = PartialBackend(clock, VK_CODE['b'])
+    executor.set_backend(backend)
+    executor.load_source(JsonlSource(path))
+    run(executor)
+    assert [arg for _, _, arg in backend.events] == [VK_CODE['a']]
+    assert "不支持按键: b" in capsys.readouterr().out
+
+
+def test_start_rejects_unsupported_key(clock):
+    executor = MacroExecutor(clock=clock, sleep=clock.sleep)
+    executor.set_backend(PartialBackend(clock, VK_CODE['b']))
+    executor.load_steps([Step('a', 0.1, 0), Step('b', 0.1, 0)])
+    assert executor.start() is False
+    assert "b" in str(executor.start_error)
+    assert not executor.running and executor.thread is None
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_backend_error_ends_run(clock):
+    executor = MacroExecutor(clock=clock, sleep=clock.sleep)
+    executor.set_backend(FailingBackend(clock))
+    executor.load_steps([Step('a', 0.1, 0)])
+    run(executor)
+    assert not executor.running
+    assert executor.run_end_time is not None
+    assert executor.live_stats()['running'] is False
+
+
+def test_pause_shifts_program_wait(clock):
+    program = compile_program([{'key': 'a', 'delay': 0.1, 'random_offset': 0},
+                               {'key': 'b', 'delay': 0.1, 'random_offset': 0},
+                               {'wait_until': 1.0},
+                               {'key': 'c', 'delay': 0.1, 'random_offset': 0}], loop_count=1)
+    executor = MacroExecutor(clock=clock)
+    executor.sleep = PauseAt(executor, clock, 0.05, 2.0)
+    backend = RecordingBackend(clock=clock)
+    executor.set_backend(backend)
+    executor.set_precise_timing(True)
+    executor.load_program(program)
+    run(executor)
+    # 等待的截止时间随暂停一起推后
+    assert [t for t, _, _ in backend.events] == pytest.approx([0.0, 2.1, 3.0], abs=1e-3)
+
+
+def test_pause_not_counted_in_loop_time_or_click_rate(clock):
+    executor, backend = make_executor(clock, [Step('a', 0.1, 0)], pause_at=0.25, pause_for=1.0,
+                                      loop_time=0.5)
+    executor.mouse_click_double = True
+    executor.set_clicker(cps=10)
+    run(executor)
+    presses = [t for t, event_type, _ in backend.events if event_type == EVENT_PRESS]
+    assert presses == pytest.approx([0.0, 0.1, 0.2, 1.3, 1.4, 1.5], abs=1e-3)
+    assert executor.click_stream.clicks == 6
+    # 6次点击发生在不含暂停的0.5秒内
+    assert executor.achieved_cps() == pytest.approx(6 / 0.5, rel=0.01)
+
+
+def test_click_stream_has_own_sampler(clock):
+    executor, _ = make_executor(clock, [Step('a', 0.1, 0.05)])
+    executor.mouse_click_double = True
+    executor.set_clicker(cps=10, jitter=0.2)
+    executor.set_delay_distribution(executor.delay_distribution, seed=7)
+    executor._create_streams()
+    macro_sampler = executor.macro_stream.sampler
+    click_sampler = executor.click_stream.sampler
+    assert macro_sampler is not click_sampler
+    # 两个采样器都只由运行种子决定，与取用顺序无关
+    assert macro_sampler.seed == 7
+    assert click_sampler.seed == DelaySampler(seed=7).spawn('click').seed
+    assert click_sampler.seed != macro_sampler.seed
+
+
+@pytest.mark.parametrize('delay', [0.001, 0.003, 0.01, 0.015, 0.02, 0.05])
+def test_scheduler_wait_with_coarse_timer(clock, delay):
+    # 模拟Windows上按15.6ms时钟中断唤醒的可打断睡眠
+    tick = 0.0156
+
+    def coarse_sleep(seconds):
+        return clock.sleep(math.ceil(seconds / tick) * tick) if seconds > 0 else False
+
+    scheduler = DeadlineScheduler(clock=clock, sleep=coarse_sleep, timer_resolution=tick,
+                                  fine_sleep=clock.sleep)
+    scheduler.start()
+    deadline = clock.now + delay
+    assert scheduler.wait_until(deadline) == WAIT_DISPATCH
+    assert deadline <= clock.now < deadline + 1e-3
+
+
+def test_control_latency_real_clock():
+    executor = MacroExecutor()
+    executor.set_backend(RecordingBackend())
+    executor.load_steps([Step('a', 0.02, 0)])
+    executor.start()
+    try:
+        for action in (executor.pause, executor.resume, executor.stop):
+            time.sleep(0.05)
+            action()
+        executor.thread.join(5)
+    finally:
+        executor.stop()
+    # 暂停、继续、停止都应打断等待立即生效，不等到下一个截止时间或定时器周期
+    assert set(executor.control_latency) == {'pause', 'resume', 'stop'}
+    assert max(executor.control_latency.values()) < 0.01
+
+
+def test_pause_releases_held_keys(clock):
+    steps = [Step('shift', 0.1, 0, hold=0.5), Step('a', 1.0, 0)]
+    executor, backend = make_executor(clock, steps, pause_at=0.2, pause_for=1.0, loop_count=1)
+    run(executor)
+    shift, a = VK_CODE['shift'], VK_CODE['a']
+    assert [(event_type, arg) for _, event_type, arg in backend.events] == [
+        (EVENT_HOLD, shift), (EVENT_PRESS, a), (EVENT_RELEASE, shift), (EVENT_HOLD, shift),
+        (EVENT_RELEASE, shift)]
+    # 暂停时释放、恢复时重新按下，剩余的按住时间不变
+    assert [t for t, _, _ in backend.events] == pytest.approx([0.0, 0.1, 0.2, 1.2, 1.5], abs=1e-3)
+    assert not executor.hold_stream.held
+
+
+def test_stop_while_paused_releases_once(clock):
+    steps = [Step('ctrl+shift+e', 0.1, 0, hold=0.5), Step('a', 1.0, 0)]
+    executor, backend = make_executor(clock, steps, loop_count=1)
+    executor.sleep = PauseAt(executor, clock, 0.2, 1.0, then='stop')
+    run(executor)
+    ctrl, shift, e = VK_CODE['ctrl'], VK_CODE['shift'], VK_CODE['e']
+    assert [(event_type, arg) for _, event_type, arg in backend.events] == [
+        (EVENT_HOLD, ctrl), (EVENT_HOLD, shift), (EVENT_HOLD, e), (EVENT_PRESS, VK_CODE['a']),
+        (EVENT_RELEASE, e), (EVENT_RELEASE, shift), (EVENT_RELEASE, ctrl)]
+    assert not executor.hold_stream.held
@@ -0,0 +1,69 @@
+import pytest
+from game_input_sendinput import (GameSendInput, INPUT_KEYBOARD, INPUT_MOUSE,
+                                  KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP, KEYEVENTF_SCANCODE,
+                                  MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP, encode_key_event)
+from input_backend import EVENT_CLICK, EVENT_HOLD, EVENT_PRESS, EVENT_RELEASE, SendResult
+from input_backend import SendInputBackend
+from key_table import SCAN_TABLE, VK_CODE
+
+
+def test_encode_virtual_key():
+    assert encode_key_event(VK_CODE['a']) == (VK_CODE['a'], 0, 0)
+    assert encode_key_event(VK_CODE['a'], key_up=True) == (VK_CODE['a'], 0, KEYEVENTF_KEYUP)
+
+
+def test_encode_extended_virtual_key():
+    assert encode_key_event(VK_CODE['up']) == (VK_CODE['up'], 0, KEYEVENTF_EXTENDEDKEY)
+
+
+def test_encode_scan_code():
+    assert encode_key_event(VK_CODE['a'], scan_table=SCAN_TABLE) == (0, 0x1E, KEYEVENTF_SCANCODE)
+    assert encode_key_event(VK_CODE['up'], True, SCAN_TABLE) == \
+        (0, 0x48, KEYEVENTF_SCANCODE | KEYEVENTF_EXTENDEDKEY | KEYEVENTF_KEYUP)
+
+
+def test_encode_scan_code_falls_back_to_virtual_key():
+    # 内置表中没有扫描码的按键按虚拟键码发送
+    vk = VK_CODE['select']
+    assert SCAN_TABLE[vk] == 0
+    assert encode_key_event(vk, scan_table=SCAN_TABLE) == (vk, 0, 0)
+
+
+def test_batch_sends_once(user32):
+    game_input = GameSendInput(settle_delay=0, user32=user32)
+    batch = game_input.batch().press_key('a').key_down('ctrl').key_up('ctrl')
+    assert len(batch) == 4
+    assert batch.send() == SendResult(4, 4)
+    assert len(batch) == 0
+    a, ctrl = VK_CODE['a'], VK_CODE['ctrl']
+    assert user32.calls == [[
+        (INPUT_KEYBOARD, a, 0, 0),
+        (INPUT_KEYBOARD, a, 0, KEYEVENTF_KEYUP),
+        (INPUT_KEYBOARD, ctrl, 0, 0),
+        (INPUT_KEYBOARD, ctrl, 0, KEYEVENTF_KEYUP),
+    ]]
+
+
+def test_batch_mouse_click(user32):
+    game_input = GameSendInput(settle_delay=0, user32=user32)
+    game_input.batch().click(button='right').send()
+    assert [(inp[0], inp[3]) for inp in user32.calls[0]] == \
+        [(INPUT_MOUSE, MOUSEEVENTF_RIGHTDOWN), (INPUT_MOUSE, MOUSEEVENTF_RIGHTUP)]
+
+
+def test_batch_scan_code_mode(user32):
+    game_input = GameSendInput(settle_delay=0, user32=user32, scan_code=True)
+    game_input.batch().press_key('enter').send()
+    assert user32.calls == [[
+        (INPUT_KEYBOARD, 0, 0x1C, KEYEVENTF_SCANCODE),
+        (INPUT_KEYBOARD, 0, 0x1C, KEYEVENTF_SCANCODE | KEYEVENTF_KEYUP),
+    ]]
+
+
+def test_backend_batch_rejects_unknown_button(user32):
+    backend = SendInputBackend(user32=user32)
+    a = VK_CODE['a']
+    with pytest.raises(ValueError, match='side'):
+        backend.batch([(EVENT_HOLD, a), (EVENT_CLICK, 'side'), (EVENT_RELEASE, a),
+                       (EVENT_PRESS, a)])
+    assert user32.calls == []
@@ -0,0 +1,45 @@
+import json
+import pytest
+from executor import MacroExecutor
+from hot_reload import MacroFileWatcher
+from input_backend import RecordingBackend
+from module.MacroFile import load_macro
+
+
+def write(path, config):
+    path.write_text(config if isinstance(config, str) else json.dumps(config), encoding='utf-8')
+
+
+@pytest.mark.parametrize('config', [
+    '{"steps": [',
+    '[1, 2]',
+    {'steps': 5},
+    {'steps': [{'key': 'a'}]},
+    {'steps': [{'key': 'a', 'delay': None}]},
+    {'steps': [{'key': None, 'delay': 0.1}]},
+    {'steps': [{'key': 'a', 'delay': 0.1, 'hold': 'long'}]},
+    {'steps': [{'key': 'a', 'delay': 0.1}], 'loop_count': '3'},
+    {'steps': [{'key': 'a', 'delay': 0.1}], 'loop_time': None},
+    {'steps': [{'repeat': 2, 'steps': 3}]},
+    {'steps': [{'key': 'a', 'delay': 0.1}, 7]},
+])
+def test_invalid_json_macro_raises_value_error(tmp_path, config):
+    path = tmp_path / 'macro.json'
+    write(path, config)
+    with pytest.raises(ValueError):
+        load_macro(path)
+
+
+def test_watcher_keeps_macro_on_invalid_file(tmp_path, capsys):
+    path = tmp_path / 'macro.json'
+    write(path, {'steps': [{'key': 'a', 'delay': 0.1}]})
+    executor = MacroExecutor()
+    executor.set_backend(RecordingBackend())
+    watcher = MacroFileWatcher(executor, path)
+    assert watcher.reload()
+    timeline = executor.timeline
+    write(path, {'steps': [{'key': 'b', 'delay': None}]})
+    assert not watcher.reload()
+    assert watcher.errors == 1
+    assert executor.timeline is timeline
+    assert "第1行: 无效的延迟 None" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+import pytest
+
+from key_table import SCAN_CODE, VK_CODE, resolve_chord, resolve_key
+
+
+def test_f13_to_f24_resolve():
+    assert [resolve_key(f'f{n}') for n in range(13, 25)] == list(range(0x7C, 0x88))
+    assert all(f'f{n}' in SCAN_CODE for n in range(13, 25))
+
+
+def test_names_are_case_insensitive_but_letters_are_not():
+    assert resolve_key('F5') == resolve_key('f5') == 0x74
+    assert resolve_key('a') == 0x41
+    with pytest.raises(ValueError, match='shift\\+a'):
+        resolve_key('A')
+
+
+@pytest.mark.parametrize('symbol, base', [('!', '1'), ('+', '='), ('?', '/'), ('"', "'")])
+def test_shifted_symbols_need_shift(symbol, base):
+    with pytest.raises(ValueError):
+        resolve_key(symbol)
+    assert resolve_chord(symbol) == (VK_CODE['shift'], resolve_key(base))
+
+
+def test_uppercase_letter_becomes_shift_chord():
+    assert resolve_chord('A') == (VK_CODE['shift'], VK_CODE['a'])
+    assert resolve_chord('a') == (VK_CODE['a'],)
+
+
+def test_chord_parts_expand_without_duplicate_shift():
+    shift = VK_CODE['shift']
+    assert resolve_chord('ctrl+A') == (VK_CODE['ctrl'], shift, VK_CODE['a'])
+    assert resolve_chord('shift+A') == (shift, VK_CODE['a'])
+    with pytest.raises(ValueError):
+        resolve_chord('ctrl+')
@@ -0,0 +1,143 @@
+import struct
+import pytest
+from module.MacroFile import (HEADER, HOLD_VERSION, MAGIC, VERSION, JsonlSource, load_binary,
+                              load_macro, save_binary, save_macro)
+from module.Program import MacroProgram
+from module.Step import Step
+from module.Timeline import compile_steps
+
+
+STEPS = [Step('a', 0.5, 0.1), Step('ctrl+shift+e', 0.25, 0.0), Step('mouse_left', 0.125, 0.05),
+         Step('a', 1.0, 0.0)]
+
+
+def test_binary_round_trip(tmp_path):
+    path = tmp_path / 'macro.kpm'
+    save_binary(path, compile_steps(STEPS, loop_count=3, loop_time=12.5))
+    timeline = load_binary(path)
+    assert timeline.to_steps() == STEPS
+    assert timeline.loop_count == 3
+    assert timeline.loop_time == 12.5
+    assert timeline.key_names == ('a', 'ctrl+shift+e', 'mouse_left')
+    assert timeline.chords[1] == (0x11, 0x10, 0x45)
+
+
+def test_binary_hold_round_trip(tmp_path):
+    path = tmp_path / 'macro.kpm'
+    steps = STEPS + [Step('shift', 0.5, 0.0, hold=1.25), Step('ctrl+c', 0.0, 0.0, hold=0.002)]
+    save_binary(path, compile_steps(steps))
+    assert struct.unpack_from('<H', path.read_bytes(), len(MAGIC))[0] == HOLD_VERSION
+    timeline = load_binary(path)
+    assert timeline.to_steps() == steps
+    assert timeline.has_holds
+    # 加载后不再引用文件，可以直接覆盖
+    save_binary(path, compile_steps(STEPS))
+    assert struct.unpack_from('<H', path.read_bytes(), len(MAGIC))[0] == VERSION
+    assert load_binary(path).holds is None
+    assert timeline.to_steps() == steps
+
+
+def test_binary_hold_out_of_range(tmp_path):
+    with pytest.raises(ValueError, match="第1行: 按住时长超出"):
+        save_binary(tmp_path / 'macro.kpm', compile_steps([Step('a', 0.1, 0, hold=20000)]))
+
+
+def test_binary_empty(tmp_path):
+    path = tmp_path / 'empty.kpm'
+    save_binary(path, compile_steps([]))
+    assert len(load_binary(path)) == 0
+
+
+def test_binary_rejects_other_version(tmp_path):
+    path = tmp_path / 'macro.kpm'
+    save_binary(path, compile_steps(STEPS))
+    data = bytearray(path.read_bytes())
+    struct.pack_into('<H', data, len(MAGIC), 99)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="版本"):
+        load_binary(path)
+
+
+def test_binary_rejects_truncated_file(tmp_path):
+    path = tmp_path / 'macro.kpm'
+    save_binary(path, compile_steps(STEPS))
+    path.write_bytes(path.read_bytes()[:HEADER.size + 40])
+    with pytest.raises(ValueError):
+        load_binary(path)
+
+
+@pytest.mark.parametrize('suffix', ['.kpm', '.json', '.jsonl'])
+def test_save_and_load_macro(tmp_path, suffix):
+    steps = STEPS + [Step('b', 0.5, 0.0, hold=0.75)]
+    if suffix == '.jsonl':
+        steps = [step for step in steps if '+' not in step.key and not step.hold]
+    path = tmp_path / f'macro{suffix}'
+    save_macro(path, compile_steps(steps, loop_count=2))
+    timeline = load_macro(path)
+    assert timeline.to_steps() == steps
+    assert timeline.loop_count == 2
+
+
+def test_json_program_round_trip(tmp_path):
+    path = tmp_path / 'program.json'
+    program = MacroProgram(None, None, None, None, loop_count=4,
+                           entries=[{'repeat': 3, 'steps': [{'key': 'a', 'delay': 0.1}]}])
+    save_macro(path, program)
+    loaded = load_macro(path)
+    assert isinstance(loaded, MacroProgram)
+    assert loaded.entries == program.entries
+    assert loaded.loop_count == 4
+    with pytest.raises(ValueError):
+        save_macro(tmp_path / 'program.kpm', loaded)
+
+
+def test_jsonl_source_streams_key_codes(tmp_path):
+    path = tmp_path / 'macro.jsonl'
+    save_macro(path, compile_steps([Step('a', 0.5, 0.0), Step('b', 0.25)], loop_time=3))
+    source = JsonlSource(path)
+    assert source.loop_time == 3
+    assert list(source) == [(0x41, 0.5, 0.0), (0x42, 0.25, 0.1)]
+    assert source.steps == 2
+
+
+@pytest.mark.parametrize('line, message', [
+    ('{"key": "a", "delay": 0.1', "第2行: 无效的JSON"),
+    ('5', "第2行: 步骤必须是JSON对象"),
+    ('{"delay": 0.1}', "第2行: 缺少按键"),
+    ('{"key": 5, "delay": 0.1}', "第2行: 无效的按键"),
+    ('{"key": "a"}', "第2行: 缺少延迟"),
+    ('{"key": "a", "delay": null}', "第2行: 无效的延迟 None"),
+    ('{"key": "a", "delay": "0.1"}', "第2行: 无效的延迟"),
+    ('{"key": "a", "delay": -1}', "第2行: 无效的延迟"),
+    ('{"key": "a", "delay": 0.1, "random_offset": true}', "第2行: 无效的随机波动"),
+    ('{"key": "nosuchkey", "delay": 0.1}', "行: 无法识别的按键"),
+])
+def test_jsonl_invalid_line(tmp_path, line, message):
+    path = tmp_path / 'macro.jsonl'
+    path.write_text('{"loop_count": 1}\n' + line + '\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        list(JsonlSource(path))
+    with pytest.raises(ValueError, match=message):
+        load_macro(path)
+
+
+def test_jsonl_invalid_header(tmp_path):
+    path = tmp_path / 'macro.jsonl'
+    path.write_text('[1]\n{"key": "a", "delay": 0.1}\n', encoding='utf-8')
+    with pytest.raises(ValueError, match="第1行"):
+        JsonlSource(path)
+
+
+@pytest.mark.parametrize('header, message', [
+    ('{"loop_count": "3"}', "无效的循环次数 '3'"),
+    ('{"loop_count": -1}', "无效的循环次数"),
+    ('{"loop_time": "x"}', "无效的循环时长 'x'"),
+    ('{"loop_time": NaN}', "无效的循环时长"),
+])
+def test_jsonl_invalid_loop_params(tmp_path, header, message):
+    path = tmp_path / 'macro.jsonl'
+    path.write_text(header + '\n{"key": "a", "delay": 0.1}\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        JsonlSource(path)
+    with pytest.raises(ValueError, match=message):
+        load_macro(path)
@@ -0,0 +1,47 @@
+import sys
+import threading
+import time
+from metrics import TimingMetrics
+
+
+def test_record_and_export():
+    metrics = TimingMetrics()
+    metrics.record_event('keyboard', 0x41, 1.0, 1.0005)
+    metrics.record_event('keyboard', 0x42, 2.0, 2.002)
+    metrics.record_call('recording', 0.0001, 2)
+    assert metrics.events == {'keyboard': 2}
+    assert metrics.stream_error('keyboard').count == 2
+    csv = metrics.to_csv().splitlines()
+    assert len(csv) == 4
+    assert 'keypress_events_total{stream="keyboard"} 2' in metrics.to_prometheus()
+
+
+def test_export_while_recording(capsys):
+    # 调度线程不断新增标签时，其它线程导出与汇总不会因字典大小变化而出错
+    metrics = TimingMetrics()
+    stop = threading.Event()
+
+    def record():
+        n = 0
+        while not stop.is_set():
+            metrics.record_event(f'stream{n % 20}', n % 400, 0.0, 0.001)
+            metrics.record_call(f'backend{n % 20}', 0.0001)
+            n += 1
+
+    thread = threading.Thread(target=record)
+    interval = sys.getswitchinterval()
+    # 频繁切换线程，让新增标签发生在遍历的中途
+    sys.setswitchinterval(1e-6)
+    thread.start()
+    try:
+        deadline = time.perf_counter() + 0.5
+        while time.perf_counter() < deadline:
+            metrics.to_prometheus()
+            metrics.to_csv()
+            metrics.print_summary()
+            metrics.throughput()
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    capsys.readouterr()
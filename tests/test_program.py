@@ -0,0 +1,101 @@
+import pytest
+from input_backend import EVENT_PRESS
+from key_table import VK_CODE
+from module.Humanize import DelaySampler
+from module.Program import (OP_CALL, OP_END, OP_JUMP, OP_NEXT, OP_REPEAT, OP_RET, OP_STEP,
+                            OP_WAIT, compile_program, has_control_flow)
+from streams import ProgramStream
+
+
+def key(name, delay=0.1):
+    return {'key': name, 'delay': delay, 'random_offset': 0}
+
+
+def run(program, limit=100):
+    """以计划时间为当前时间逐个发送，返回 [(计划时间, 按键名)]"""
+    stream = ProgramStream(program, DelaySampler(seed=1), loop_count=program.loop_count)
+    stream.start(0.0)
+    sent = []
+    while stream.next_due is not None and len(sent) < limit:
+        due = stream.next_due
+        events = []
+        stream.emit(events, due)
+        for event_type, vk in events:
+            assert event_type == EVENT_PRESS
+            sent.append((round(due, 6), next(name for name, code in VK_CODE.items()
+                                              if code == vk)))
+    return sent, stream
+
+
+def test_has_control_flow():
+    assert not has_control_flow([key('a'), key('b')])
+    assert has_control_flow([key('a'), {'repeat': 2, 'steps': [key('b')]}])
+
+
+def test_compile_repeat_shares_steps():
+    program = compile_program([{'repeat': 1000, 'steps': [key('a'), key('b')]}])
+    assert len(program.timeline) == 2
+    assert list(program.ops) == [OP_REPEAT, OP_STEP, OP_STEP, OP_NEXT, OP_END]
+    assert list(program.args) == [1000, 0, 1, 1, 0]
+
+
+def test_compile_sub_and_call():
+    program = compile_program([{'call': 'combo'}, key('c'),
+                               {'sub': 'combo', 'steps': [key('a'), key('b')]}])
+    assert list(program.ops) == [OP_CALL, OP_STEP, OP_END, OP_STEP, OP_STEP, OP_RET]
+    assert program.args[0] == 3
+
+
+@pytest.mark.parametrize('entries, message', [
+    ([key('a'), {'goto': 'nowhere'}], "找不到同一层的标签 'nowhere'"),
+    ([{'repeat': 2, 'steps': [{'label': 'x'}]}, {'goto': 'x'}, key('a')], "找不到同一层的标签"),
+    ([{'call': 'f'}, {'sub': 'f', 'steps': [{'call': 'f'}]}], "递归调用"),
+    ([{'repeat': -1, 'steps': [key('a')]}], "无效的重复次数"),
+    ([{'repeat': 2, 'steps': []}], "没有按键步骤"),
+    ([key('a'), {'repeat': 2, 'steps': [key('nosuchkey')]}], "第2项的重复块中第1项"),
+    ([key('a'), {'wait_until': 'soon'}], "无效的等待时间"),
+    ([key('a'), {'wait_until': float('inf')}], "无效的等待时间"),
+    ([{'key': 'a'}], "第1项: 缺少延迟"),
+    ([key('a', -5)], "第1项: 无效的延迟 -5"),
+    ([key('a', float('nan'))], "无效的延迟 nan"),
+    ([key('a', 'nan')], "无效的延迟 'nan'"),
+    ([{'key': 'a', 'delay': 0.1, 'hold': -1}], "无效的按住时长"),
+    ([{'key': 'a', 'delay': 0.1, 'random_offset': float('inf')}], "无效的随机波动"),
+])
+def test_compile_errors(entries, message):
+    with pytest.raises(ValueError, match=message):
+        compile_program(entries)
+
+
+def test_interpret_nested_repeat_and_call():
+    program = compile_program([
+        {'repeat': 2, 'steps': [key('a'), {'repeat': 2, 'steps': [{'call': 'f'}]}]},
+        {'sub': 'f', 'steps': [key('b')]},
+    ], loop_count=1)
+    sent, stream = run(program)
+    assert [name for _, name in sent] == ['a', 'b', 'b', 'a', 'b', 'b']
+    assert [due for due, _ in sent] == [0.0, 0.1, 0.2, 0.3, 0.4, 0.5]
+    assert stream.loops == 1
+
+
+def test_interpret_goto_loops_until_limit():
+    program = compile_program([{'label': 'top'}, key('a'), {'goto': 'top'}])
+    sent, stream = run(program, limit=5)
+    assert [name for _, name in sent] == ['a'] * 5
+    assert stream.loops == 0
+
+
+def test_interpret_wait_until_is_relative_to_pass_start():
+    program = compile_program([key('a'), {'wait_until': 1.0}, key('b'), {'wait_until': 0.05}],
+                              loop_count=2)
+    sent, _ = run(program)
+    # 第二轮从第一轮的 b 之后开始，已超过的等待不生效
+    assert sent == [(0.0, 'a'), (1.0, 'b'), (1.1, 'a'), (2.1, 'b')]
+
+
+def test_interpret_infinite_control_loop_stops():
+    program = compile_program([key('a'), {'label': 'x'}, {'goto': 'x'}])
+    sent, stream = run(program)
+    assert sent == [(0.0, 'a')]
+    assert stream.next_due is None
+    assert "控制指令" in stream.error
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from collections import Counter
+import pytest
+from module.Humanize import create_distribution
+from recorder import MacroRecorder
+
+
+def record(tmp_path, events, end, **stop):
+    path = tmp_path / 'record.json'
+    recorder = MacroRecorder(stop_hotkey='Alt+F9', clock=lambda: end, flush_interval=0.001)
+    recorder.start(path, hooks=False)
+    for key, down, t in events:
+        recorder.push(key, down, t)
+    recorder.stop(**stop)
+    with open(path, encoding='utf-8') as f:
+        return [(step['key'], step['delay']) for step in json.load(f)['steps']]
+
+
+def test_stop_hotkey_dropped_but_its_keys_recorded(tmp_path):
+    events = [('alt', True, 0.0), ('alt', False, 0.1),
+              ('f9', True, 0.3), ('f9', False, 0.4),
+              ('a', True, 0.5), ('a', False, 0.6),
+              ('alt', True, 1.0), ('f9', True, 1.1)]
+    steps = record(tmp_path, events, end=1.2)
+    # 单独按下的 alt 与 f9 保留，末尾的停止组合键丢弃，最后一步的延迟到按下组合键为止
+    assert [key for key, _ in steps] == ['alt', 'f9', 'a']
+    assert [delay for _, delay in steps] == pytest.approx([0.3, 0.2, 0.5])
+
+
+def test_trailing_keys_kept_when_not_stop_hotkey(tmp_path):
+    events = [('a', True, 0.0), ('alt', True, 0.2), ('b', True, 0.3)]
+    steps = record(tmp_path, events, end=0.5)
+    assert steps == [('a', pytest.approx(0.2)), ('alt', pytest.approx(0.1)), ('b', pytest.approx(0.2))]
+
+
+def test_drop_last_from_button(tmp_path):
+    events = [('a', True, 0.0), ('b', True, 0.2), ('mouse_left', True, 0.7)]
+    steps = record(tmp_path, events, end=0.8, drop_last=True)
+    assert steps == [('a', pytest.approx(0.2)), ('b', pytest.approx(0.5))]
+
+
+def test_recorded_delays_saved_as_empirical_distribution(tmp_path):
+    path = tmp_path / 'record.json'
+    recorder = MacroRecorder(clock=lambda: 0.6, flush_interval=0.001)
+    recorder.start(path, hooks=False)
+    for key, t in (('a', 0.0), ('b', 0.1), ('c', 0.4)):
+        recorder.push(key, True, t)
+    recorder.stop()
+    with open(path, encoding='utf-8') as f:
+        distribution = create_distribution(json.load(f)['distribution'])
+    # 延迟 0.1、0.3、0.2 以中位数0.2为中心，按最大偏差0.1归一化
+    assert distribution.samples == pytest.approx([-1.0, 0.0, 1.0])
+
+
+class YieldingList(list):
+    """写入后让出线程的列表，在写入位置与增加计数之间制造线程切换"""
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        time.sleep(0)
+
+
+def test_push_from_two_hook_threads():
+    # 键盘与鼠标钩子在不同线程写入同一个缓冲区
+    count = 2000
+    recorder = MacroRecorder(capacity=1 << 13)
+    recorder._times = YieldingList(recorder._times)
+
+    def push(key):
+        for i in range(count):
+            recorder.push(key, True, float(i))
+
+    threads = [threading.Thread(target=push, args=(key,)) for key in ('a', 'mouse_left')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert recorder._head == 2 * count
+    assert Counter(recorder._keys[:2 * count]) == {'a': count, 'mouse_left': count}
@@ -0,0 +1,28 @@
+import pytest
+from step_model import COLUMN_DELAY, COLUMN_HOLD, COLUMN_RANDOM, StepTableModel
+
+
+@pytest.mark.parametrize('column', [COLUMN_DELAY, COLUMN_RANDOM, COLUMN_HOLD])
+@pytest.mark.parametrize('text', ['nan', 'inf', '-1', '-0.5'])
+def test_edit_rejects_out_of_range_number(column, text):
+    model = StepTableModel()
+    model.set_rows([('a', '0.1', '0.1', '0')])
+    index = model.index(0, column)
+    before = model.data(index)
+    assert model.setData(index, text) is False
+    assert model.data(index) == before
+    assert model.error_count == 0
+
+
+def test_edit_marks_non_number():
+    model = StepTableModel()
+    model.set_rows([('a', '0.1', '0.1', '0')])
+    assert model.setData(model.index(0, COLUMN_DELAY), 'abc') is True
+    assert model.error_count == 1
+
+
+def test_loaded_out_of_range_number_marked_invalid():
+    model = StepTableModel()
+    model.set_rows([('a', 'nan', '-1', 'inf'), ('b', '0.2', '0', '0')])
+    assert model.error_count == 3
+    assert list(model.delays) == [0.0, 0.2]